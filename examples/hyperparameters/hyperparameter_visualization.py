@@ -61,7 +61,7 @@ def main():
 
 
     # Create preference gp and optimize given training data
-    gp = lop.PreferenceGP(lop.RBF_kern(0.5, 0.7))
+    gp = lop.PreferenceGP(lop.RBF_kern(0.5, 0.7), hyperparam_only_probit=False)
     gp.cov_func.set_param(np.array([0.5, 1.0]))
     gp.probits[0].set_sigma(0.5)
     gp.add(X_train, pairs)
@@ -78,31 +78,18 @@ def main():
     rbf_sigmas = np.arange(0.001, 2.0, 0.05)
     rbf_lengths = np.arange(0.01,3.0, 0.05)
 
-    liklihoods = np.zeros((rbf_sigmas.shape[0], rbf_lengths.shape[0]))
+    # the hyperparameters are ordered (probit sigma, rbf sigma, rbf length)
+    # the grid evaluates the (negative log liklihood) objective for all settings at once.
+    grid = lop.HyperparameterGrid(gp)
 
     # perform exhastive search of kernel parameters
-    for i, rbf_sigma in enumerate(rbf_sigmas):
-        for j, rbf_length in enumerate(rbf_lengths):
-            gp.cov_func.set_param(np.array([rbf_sigma, rbf_length]))
-
-            likli = gp.loss_func(gp.F)
-
-            liklihoods[i,j] = likli
+    liklihoods = -grid.evaluate_grid([None, rbf_sigmas, rbf_lengths])
 
 
     probit_sigmas = np.arange(0.001, 2.0, 0.05)
 
-    liklihoods_pro = np.zeros((rbf_sigmas.shape[0], rbf_lengths.shape[0]))
-
     # perform exhastive search of kernel lengthscale + probit parameter
-    for i, pro_sigma in enumerate(probit_sigmas):
-        for j, rbf_length in enumerate(rbf_lengths):
-            gp.cov_func.set_param(np.array([0.5, rbf_length]))
-            gp.probits[0].set_sigma(pro_sigma)
-
-            likli = gp.loss_func(gp.F)
-
-            liklihoods_pro[i,j] = likli
+    liklihoods_pro = -grid.evaluate_grid([probit_sigmas, 0.5, rbf_lengths])
 
 
 
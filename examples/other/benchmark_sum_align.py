@@ -0,0 +1,76 @@
+# benchmark_sum_align.py
+# Written Ian Rankin - October 2026
+#
+# Benchmarks the matrix multiply versions of quick_calculation_sum_align_q and
+# fast_sum_Q used by AcquisitionSelection and AbsAcquisition against the previous
+# numba loops over every pair of samples.
+
+import numpy as np
+import time
+
+from numba import jit
+
+from lop.active_learning.AcquisitionSelection import quick_calculation_sum_align_q
+from lop.active_learning.AbsAcquisition import fast_sum_Q
+
+
+@jit(nopython=True)
+def loop_sum_align_q(f, p_q):
+    sum_align_q = np.zeros((p_q.shape[1], p_q.shape[1]))
+
+    for i in range(f.shape[0]):
+        for j in range(f.shape[1]):
+            sum_align_q += f[i,j] * p_q[i] * p_q[j]
+
+    return sum_align_q
+
+@jit(nopython=True)
+def loop_sum_Q(p_q_w, p_q, f, M):
+    sum_Q = np.zeros(p_q_w.shape[1])
+
+    for i in range(M):
+        for j in range(M):
+            sum_Q += f[i,j] * p_q_w[i,:] * p_q_w[j,:] / p_q
+
+    return sum_Q / (M * M)
+
+
+def time_func(func, *args, repeats=3):
+    func(*args)
+    t_start = time.time()
+    for i in range(repeats):
+        out = func(*args)
+    return (time.time() - t_start) / repeats, out
+
+
+def main():
+    rng = np.random.default_rng(0)
+
+    print('select_pair: sum_ij f[i,j] p_q[i] p_q[j]')
+    for M, N in [(100, 20), (300, 60), (300, 120)]:
+        f = rng.random((M, M))
+        p_q = rng.random((M, N, N))
+
+        t_loop, out_loop = time_func(loop_sum_align_q, f, p_q)
+        t_blas, out_blas = time_func(quick_calculation_sum_align_q, f, p_q)
+        err = np.max(np.abs(out_loop - out_blas)) / np.max(np.abs(out_loop))
+
+        print('M={} N={}: loop {:.4f}s, matmul {:.4f}s, speedup {:.1f}x, rel err {:.1e}'.format(
+                M, N, t_loop, t_blas, t_loop / t_blas, err))
+
+    print('AbsAcquisition: fast_sum_Q')
+    for M, N in [(300, 20), (1000, 60)]:
+        f = rng.random((M, M))
+        p_q_w = rng.random((M, N))
+        p_q = np.mean(p_q_w, axis=0)
+
+        t_loop, out_loop = time_func(loop_sum_Q, p_q_w, p_q, f, M)
+        t_blas, out_blas = time_func(fast_sum_Q, p_q_w, p_q, f, M)
+        err = np.max(np.abs(out_loop - out_blas)) / np.max(np.abs(out_loop))
+
+        print('M={} N={}: loop {:.4f}s, matmul {:.4f}s, speedup {:.1f}x, rel err {:.1e}'.format(
+                M, N, t_loop, t_blas, t_loop / t_blas, err))
+
+
+if __name__ == '__main__':
+    main()
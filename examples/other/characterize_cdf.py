@@ -61,11 +61,11 @@ def main():
     mu = np.array([0, -0.5, 0.2])
 
 
-    methods = ['full', 'switch', 'independent', 'mvn']
+    methods = ['genz', 'full', 'switch', 'independent', 'mvn']
 
     for method in methods:
         print(method)
-        p = lop.calc_cdf(mu, cov)
+        p = lop.calc_cdf(mu, cov, method=method)
 
         
         print(p)
@@ -18,7 +18,8 @@ def record_gp_state(model, fake_f, bounds=[(0,0),(2.0,2.0)], folder='./', \
         x = np.linspace(bounds[0][0], bounds[0][1], num_side)
         y = np.linspace(bounds[1][0], bounds[1][1], num_side)
 
-        X, Y = np.meshgrid(x,y)
+        # ij ordering matches the grid points used by predict_grid
+        X, Y = np.meshgrid(x,y, indexing='ij')
         pts = np.vstack([X.ravel(), Y.ravel()]).transpose()
 
 
@@ -26,7 +27,11 @@ def record_gp_state(model, fake_f, bounds=[(0,0),(2.0,2.0)], folder='./', \
         max_fake = np.linalg.norm(fake_ut, ord=np.inf)
         fake_ut = fake_ut / max_fake
 
-        pred_ut, pred_sigma = model.predict_large(pts)
+        # structured grid prediction if the model and kernel support it
+        try:
+            pred_ut, pred_sigma = model.predict_grid([x, y])
+        except (AttributeError, ValueError):
+            pred_ut, pred_sigma = model.predict_large(pts)
 
 
         # save useful data
@@ -29,8 +29,7 @@ import math
 import copy
 from scipy.integrate import quad_vec
 from scipy.stats import beta
-
-from numba import jit
+from scipy.special import betaln
 
 from lop.active_learning import AcquisitionBase
 from lop.models import PreferenceGP, GP, PreferenceLinear
@@ -55,15 +54,31 @@ def pq_integrand(q, aa, bb, f):
     return integr
 
 
-@jit(nopython=True)
+## fast_sum_Q
+# Calculates sum_ij f[i,j] * p_q_w[i] * p_q_w[j] / p_q / M^2 over the samples i, j.
+# Computed as the bilinear form p_q_w^T (f p_q_w) with a (multithreaded) matrix multiply.
+# @param p_q_w - the probability of each rating for each sample [w, Q]
+# @param p_q - the mean probability of each rating over the samples [Q]
+# @param f - the alignment between each pair of samples [w, w']
+# @param M - the number of samples
+#
+# @return the expected alignment [Q]
 def fast_sum_Q(p_q_w, p_q, f, M):
-    sum_Q = np.zeros(p_q_w.shape[1])
+    sum_Q = np.einsum('ij,ij->j', p_q_w, f @ p_q_w)
 
-    for i in range(M):
-        for j in range(M):
-            sum_Q += f[i,j] * p_q_w[i,:] * p_q_w[j,:] / p_q
+    return sum_Q / p_q / (M * M)
 
-    return sum_Q / (M * M)
+
+## gauss_legendre_01
+# The nodes and weights of Gauss-Legendre quadrature mapped to the interval (a, b)
+# @param num_nodes - the number of nodes (exact for polynomials of degree 2*num_nodes-1)
+# @param a - the lower limit of the integral
+# @param b - the upper limit of the integral
+#
+# @return nodes, weights (num_nodes,)
+def gauss_legendre_01(num_nodes, a=0.0, b=1.0):
+    x, w = np.polynomial.legendre.leggauss(num_nodes)
+    return a + (b - a) * (x + 1) / 2, w * (b - a) / 2
 
 
 class AbsAcquisition(AcquisitionBase):
@@ -76,10 +91,14 @@ class AbsAcquisition(AcquisitionBase):
     #               prefering pareto optimal choices when selecting points, if not particulary told not to
     # @param alaways_select_best - [opt default=False] sets whether the select function should append the
     #               the top solution to the front of the solution set every time.
+    # @param quadrature - [opt default='gauss'] the method to integrate over the rating q
+    #               'gauss' fixed order Gauss-Legendre, 'adaptive' scipy's quad_vec
+    # @param num_nodes - [opt default=100] the number of Gauss-Legendre nodes (accuracy of 'gauss')
     def __init__(self, M=300, 
                  rep_Q_method = 'sampled', rep_Q_data = {'num_pts': 10, 'num_Q': 20},
                  alignment_f = 'rho',
-                 default_to_pareto=False, always_select_best=False):
+                 default_to_pareto=False, always_select_best=False,
+                 quadrature='gauss', num_nodes=100):
         super(AbsAcquisition, self).__init__(rep_Q_method=rep_Q_method,
                                                     rep_Q_data=rep_Q_data,
                                                     alignment_f=alignment_f,
@@ -89,6 +108,9 @@ class AbsAcquisition(AcquisitionBase):
         self.M = M
         self.max_num_alts = 1
 
+        self.quadrature = quadrature
+        self.quad_nodes, self.quad_weights = gauss_legendre_01(num_nodes, 0.0001, 0.9999)
+
 
     
 
@@ -136,10 +158,11 @@ class AbsAcquisition(AcquisitionBase):
 
         ########## values post summation
 
-        integ_p_q, err = quad_vec(pq_integrand, 0.0001, 0.9999, epsrel=0.001, 
-                                    workers=-1, limit=150, args=(aa, bb, f))
-
-        print('err = ' + str(err))
+        if self.quadrature == 'adaptive':
+            integ_p_q, err = quad_vec(pq_integrand, 0.0001, 0.9999, epsrel=0.001, 
+                                        workers=-1, limit=150, args=(aa, bb, f))
+        else:
+            integ_p_q = self.integrate_p_q_fixed(aa, bb, f)
 
         align_Q = integ_p_q
 
@@ -147,4 +170,33 @@ class AbsAcquisition(AcquisitionBase):
         self.sel_metric = align_Q[best_idx]
         return indicies[best_idx]
 
-
+    ## integrate_p_q_fixed
+    # Integrates pq_integrand over the rating q with the fixed Gauss-Legendre nodes.
+    # The beta densities of all nodes are computed in one pass, and the alignment
+    # sums of all nodes with a single matrix multiply, in chunks of nodes so at most
+    # max_batch_elements are used at a time.
+    # @param aa - the alpha of the beta distribution of each sample and query [w, Q]
+    # @param bb - the beta of the beta distribution of each sample and query [w, Q]
+    # @param f - the alignment between each pair of samples [w, w']
+    #
+    # @return the integral for each query [Q]
+    def integrate_p_q_fixed(self, aa, bb, f):
+        M, num_Q = aa.shape
+        log_B = betaln(aa, bb)
+        chunk = max(1, self.max_batch_elements // (M * num_Q))
+
+        integ = np.zeros(num_Q)
+        for start in range(0, len(self.quad_nodes), chunk):
+            q = self.quad_nodes[start:start+chunk][:,np.newaxis,np.newaxis]
+            # beta pdf [node, w, Q]
+            p_q_w = np.exp((aa-1)*np.log(q) + (bb-1)*np.log1p(-q) - log_B)
+            p_q = np.mean(p_q_w, axis=1)
+
+            # sum_ij f[i,j] p_q_w[i] p_q_w[j] for every node and query
+            p_q_w_flat = np.moveaxis(p_q_w, 1, 0).reshape(M, -1)
+            sum_Q = np.einsum('ij,ij->j', p_q_w_flat, f @ p_q_w_flat).reshape(-1, num_Q)
+
+            integrand = sum_Q / p_q / (M * M)
+            integ += self.quad_weights[start:start+chunk] @ integrand
+
+        return integ
@@ -30,20 +30,11 @@ class AbsBayesInfo(ActiveLearner):
             if isinstance(self.model, PreferenceGP):
                 # Get the probabilities of which candidate_pts is the best.
                 p_B = self.p_B_pref_gp(candidate_pts, mu)
-                
-                cov = self.model.cov
-
-                all_Q = np.random.multivariate_normal(mu, cov, size=self.M)
             elif isinstance(self.model, PreferenceLinear):
-                w_samples = metropolis_hastings(self.model.loss_func, self.M, dim=candidate_pts.shape[1])
-
-                #w_norm = np.linalg.norm(w_samples, axis=1)
-                #w_samples = w_samples / np.tile(w_norm, (2,1)).T
-                # generate possible outputs from weighted samples
-                all_Q = (candidate_pts @ w_samples.T).T
-
                 # Get the probabilities of which candidate_pts is the best.
                 p_B = self.p_B_pref_linear(candidate_pts, mu)
+
+            all_Q = self.sample_posterior(candidate_pts, self.M)
             self.p_B = p_B
             self.all_Q = all_Q
             self.first_call_greedy = False
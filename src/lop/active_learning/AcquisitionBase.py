@@ -35,7 +35,7 @@ from lop.active_learning import ActiveLearner
 from lop.models import PreferenceGP, GP, PreferenceLinear
 import scipy.stats as st
 
-from lop.utilities import metropolis_hastings, sample_unique_sets
+from lop.utilities import metropolis_hastings, sample_unique_sets, array_fingerprint
 from itertools import combinations
 
 import pdb
@@ -82,6 +82,15 @@ class AcquisitionBase(ActiveLearner):
             # sample data points from previous model data
             if self.model.X_train is None:
                 return None, None
+
+            # the representative queries are shared by the greedy steps of a selection
+            # so the samples from get_samples_from_model can be reused.
+            key = ('representative_Q', None if candidate_pts is None else array_fingerprint(candidate_pts),
+                    N, num_Q, num_alts)
+            cached = self.model.sample_cache.get(self.model.sample_version(), key)
+            if cached is not None:
+                return cached
+
             X_train = self.model.X_train
             num_X_train = len(self.model.X_train)
             
@@ -97,7 +106,7 @@ class AcquisitionBase(ActiveLearner):
             Q = sample_unique_sets(N, num_Q, num_alts)
             
 
-            return X_pts, Q
+            return self.model.sample_cache.put(self.model.sample_version(), key, (X_pts, Q))
 
         elif self.rep_Q_method == 'stable':
             X_pts = np.load(self.rep_Q_data['filename'])
@@ -144,7 +153,7 @@ class AcquisitionBase(ActiveLearner):
             if all_rep.shape[1] < 2:
                 return np.ones((all_rep.shape[0], all_rep.shape[0]))
 
-            probit_mat = np.array([self.model.probits[0].likelihood_all_pairs(w) for w in all_rep])
+            probit_mat = self.model.probits[0].likelihood_all_pairs_batch(all_rep)
             
 
             q_best_w = np.argmax(all_rep[:,Q_rep], axis=2)
@@ -272,20 +281,15 @@ class AcquisitionBase(ActiveLearner):
 
         ## get sampled possible output of latent functions
         if isinstance(self.model, (PreferenceGP, GP)):
-            cov = self.model.cov
-
             x_both = np.append(candidate_pts, x_rep, axis=0)
 
             # need to sample both representive and query samples at the same time.
-            mu_both, simga_both = self.model.predict(x_both)
-            cov_both = self.model.cov
-
             # sample M possible parameters w (reward values of the GP)
-            all_samples = np.random.multivariate_normal(mu_both, cov_both, size=self.M)
+            all_samples = self.sample_posterior(x_both, self.M)
             all_Q = all_samples[:, :N]
             all_rep = all_samples[:, N:]
         elif isinstance(self.model, PreferenceLinear):
-            w_samples = metropolis_hastings(self.model.loss_func, self.M, dim=candidate_pts.shape[1])
+            w_samples = self.sample_linear_weights(candidate_pts.shape[1], self.M)
 
             #w_norm = np.linalg.norm(w_samples, axis=1)
             #w_samples = w_samples / np.tile(w_norm, (candidate_pts.shape[1],1)).T
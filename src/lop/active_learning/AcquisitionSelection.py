@@ -37,22 +37,24 @@ from lop.models import PreferenceGP, GP, PreferenceLinear
 from lop.utilities import metropolis_hastings, sample_unique_sets
 
 
-from numba import jit
-
 import pdb
 
 
 
 
-@jit(nopython=True)
+## quick_calculation_sum_align_q
+# Calculates sum_ij f[i,j] * p_q[i] * p_q[j] over the samples i, j.
+# This is the bilinear form p_q^T (f p_q), so it is computed with a single (multithreaded)
+# matrix multiply over the flattened p_q and a reduction over the samples.
+# @param f - the alignment between each pair of samples [w, w']
+# @param p_q - the probability of each selection for each sample [w, ...]
+#
+# @return the summed alignment [...]
 def quick_calculation_sum_align_q(f, p_q):
-    sum_align_q = np.zeros((p_q.shape[1], p_q.shape[1]))
-
-    for i in range(f.shape[0]):
-        for j in range(f.shape[1]):
-            sum_align_q += f[i,j] * p_q[i] * p_q[j]
+    p_q_flat = p_q.reshape(p_q.shape[0], -1)
+    f_p_q = f @ p_q_flat
 
-    return sum_align_q
+    return np.einsum('ij,ij->j', p_q_flat, f_p_q).reshape(p_q.shape[1:])
 
 
 
@@ -114,7 +116,7 @@ class AcquisitionSelection(AcquisitionBase):
         
         
         # precalculate the probit between each candidate_pts
-        probit_mat_Q = np.array([self.model.probits[0].likelihood_all_pairs(w) for w in all_Q])
+        probit_mat_Q = self.model.probits[0].likelihood_all_pairs_batch(all_Q)
         #probit_mat_rep = np.array([self.model.probits[0].likelihood_all_pairs(w) for w in all_rep])
 
 
@@ -148,16 +150,13 @@ class AcquisitionSelection(AcquisitionBase):
         
 
         ###### calculate alignment function
+        # [w, w']
         f = self.alignment(all_rep, Q_rep)
-        # [w,w', q, Q_new]
-        f_expand = np.repeat(np.repeat(f[:,:,np.newaxis], p_q.shape[1],axis=2)[:,:,:,np.newaxis], p_q.shape[2], axis=3)
 
         ##### calculate expected alignment
         # equation (10)
-        p_q_w0 = np.repeat(p_q[np.newaxis, :,:,:], self.M, axis=0)
-        p_q_w1 = np.repeat(p_q[:, np.newaxis,:,:], self.M, axis=1)
-        align_expand = p_q_w0 * p_q_w1 * f_expand
-        E_align_q = np.sum(align_expand, axis=(0,1)) / (self.M * self.M)
+        # [q, Q_new] computed without forming the [w,w',q,Q_new] tensor
+        E_align_q = quick_calculation_sum_align_q(f, p_q) / (self.M * self.M)
         E_p_q = np.mean(p_q, axis=0)
 
         align_Q = E_align_q / E_p_q
@@ -185,7 +184,7 @@ class AcquisitionSelection(AcquisitionBase):
         
 
         # precalculate the probit between each candidate_pts
-        probit_mat_Q = np.array([self.model.probits[0].likelihood_all_pairs(w) for w in all_Q])
+        probit_mat_Q = self.model.probits[0].likelihood_all_pairs_batch(all_Q)
 
         # nothing needs to happen the p_q is already the probit mat since it is pairwise
         # p_q[k,i,j] = p(q=i | Q=(i,j)) for sample k or rather p_q[k, 0,1] = p(F_k(0) > F_k(1))
@@ -202,24 +201,8 @@ class AcquisitionSelection(AcquisitionBase):
         ##### calculate expected alignment
         # equation (10)
 
-        if self.M * self.M * p_q.shape[1] * p_q.shape[1] > 1000:
-            sum_align_q = quick_calculation_sum_align_q(f, p_q)
-
-            E_align_q = sum_align_q / (self.M * self.M)
-        else:
-
-            # [w,w', Q, Q]
-            f_expand = np.repeat(np.repeat(f[:,:,np.newaxis], p_q.shape[1],axis=2)[:,:,:,np.newaxis], p_q.shape[2], axis=3)
-
-
-            # [w, w', Q, Q]
-            p_q_w0 = np.repeat(p_q[np.newaxis, :,:,:], self.M, axis=0)
-            # [w', w, Q,Q]
-            p_q_w1 = np.repeat(p_q[:, np.newaxis,:,:], self.M, axis=1)
-
-            align_expand = p_q_w0 * p_q_w1 * f_expand
-            # [Q, Q]
-            E_align_q = np.sum(align_expand, axis=(0,1)) / (self.M * self.M)
+        # [Q, Q]
+        E_align_q = quick_calculation_sum_align_q(f, p_q) / (self.M * self.M)
         
         E_p_q = np.mean(p_q, axis=0)
 
@@ -23,8 +23,9 @@
 
 import numpy as np
 
-from lop.utilities import get_pareto, calc_cdf
-from lop.utilities import metropolis_hastings
+from lop.utilities import get_pareto, calc_cdf_batch
+from lop.utilities import metropolis_hastings, array_fingerprint
+from lop.models import PreferenceLinear
 
 import pdb
 
@@ -45,6 +46,12 @@ class ActiveLearner:
         self.always_select_best = always_select_best
         self.first_call_greedy = True
         self.sel_metric = None
+        # method used by p_B_pref_gp to calculate the probability each candidate is best
+        self.p_B_method = 'auto'
+        # number of posterior samples used when p_B_method is 'sampled'
+        self.p_B_num_samples = 2000
+        # the maximum number of elements of batched tensors used at once
+        self.max_batch_elements = 2**22
 
     ## set_model
     # sets the model being used by the active learning framework.
@@ -52,6 +59,50 @@ class ActiveLearner:
     def set_model(self, model):
         self.model = model
 
+    ## sample_posterior
+    # Draws M samples of the latent function at candidate_pts from the model posterior.
+    # The samples are cached on the model keyed by (model sample_version, candidate_pts, M), so
+    # the greedy steps of a selection and other learners of the same model share them.
+    # @param candidate_pts - a numpy array of points (nxk), n = number points, k = number of dimmensions
+    # @param M - the number of samples
+    #
+    # @return numpy array of samples (M, n) (read only)
+    def sample_posterior(self, candidate_pts, M):
+        key = ('posterior', array_fingerprint(candidate_pts), M)
+        all_w = self.model.sample_cache.get(self.model.sample_version(), key)
+        if all_w is not None:
+            return all_w
+
+        if isinstance(self.model, PreferenceLinear):
+            w_samples = self.sample_linear_weights(candidate_pts.shape[1], M)
+            # generate possible outputs from weighted samples
+            all_w = (candidate_pts @ w_samples.T).T
+        else:
+            mu, _ = self.model.predict(candidate_pts)
+            if self.model.cov_factor is not None:
+                # low rank covariance from a feature map, linear in the number of points
+                cov_factor = self.model.cov_factor
+                all_w = mu + np.random.normal(size=(M, cov_factor.shape[1])) @ cov_factor.T
+            else:
+                all_w = np.random.multivariate_normal(mu, self.model.cov, size=M)
+
+        return self.model.sample_cache.put(self.model.sample_version(), key, all_w)
+
+    ## sample_linear_weights
+    # Draws M samples of the weights of a linear model using MCMC.
+    # The samples are cached on the model keyed by (model sample_version, dim, M).
+    # @param dim - the dimension of the weights
+    # @param M - the number of samples
+    #
+    # @return numpy array of weight samples (M, dim) (read only)
+    def sample_linear_weights(self, dim, M):
+        key = ('linear_weights', dim, M)
+        w_samples = self.model.sample_cache.get(self.model.sample_version(), key)
+        if w_samples is None:
+            w_samples = metropolis_hastings(self.model.loss_func, M, dim=dim)
+            w_samples = self.model.sample_cache.put(self.model.sample_version(), key, w_samples)
+        return w_samples
+
     ## select
     # Selects the given points
     # @param candidate_pts - a numpy array of points (nxk), n = number points, k = number of dimmensions
@@ -302,71 +353,90 @@ class ActiveLearner:
 
     ################### Functions to calculate probability of each candidate being the best
 
-    ## p_B_pref_gp
-    # Calculates the probability of each pt in the given matrix as being the being the best path
-    # but only does it for preference GPs
-    # @param candidate_pts - a numpy array of points (nxk), n = number points, k = number of dimmensions
-    # @param mu - a numpy array of mu values outputed from predict. numpy (n)
-    def p_B_pref_gp(self, candidate_pts, mu, cdf_method='auto'):
-        K = self.model.cov
+    ## best_difference_dists
+    # Calculates the distribution of the differences f_j - f_i for j != i of each candidate i.
+    # Candidate i is the best when all of its differences are below 0.
+    # K*_i = K_ii + K_jk - K_ij - K_ik, computed for all i at once with broadcasting.
+    # @param mu - a numpy array of mu values outputed from predict. numpy (N)
+    # @param K - the covariance matrix of the candidates (N,N)
+    # @param idxs - [opt default all] the indicies of the candidates i to calculate.
+    #
+    # @return mu_star (n, N-1), K_star (n, N-1, N-1)
+    def best_difference_dists(self, mu, K, idxs=None):
+        N = len(mu)
+        if idxs is None:
+            idxs = np.arange(N)
+        idxs = np.asarray(idxs)
 
-        p = np.empty(len(candidate_pts))
+        # the indicies of every candidate except i for each i
+        others = np.arange(N-1)[np.newaxis,:]
+        others = others + (others >= idxs[:,np.newaxis])
 
-        # calculate the combined covariance matrix for if point i is the largest point.
-        for i in range(len(candidate_pts)):
-            K_star_i = np.zeros((len(p)-1, len(p)-1))
+        K_i = K[idxs[:,np.newaxis], others]
+        K_star = K[others[:,:,np.newaxis], others[:,np.newaxis,:]] \
+                    + K[idxs, idxs][:,np.newaxis,np.newaxis] \
+                    - K_i[:,:,np.newaxis] - K_i[:,np.newaxis,:]
 
-            idx_i = list(range(len(p)))
-            idx_i.remove(i)
+        mu_star = mu[others] - mu[idxs][:,np.newaxis]
 
-            
+        return mu_star, K_star
 
-            for j in range(len(K_star_i)):
-                for k in range(len(K_star_i)):
-                    K_star_i[j,k] = K[i, i] + K[idx_i[j], idx_i[k]] - K[i, idx_i[j]] - K[i, idx_i[k]]
+    ## p_B_pref_gp
+    # Calculates the probability of each pt in the given matrix as being the being the best path
+    # but only does it for preference GPs
+    # The orthant probabilities are calculated for blocks of candidates at a time so
+    # at most max_batch_elements of the difference covariances are used at once.
+    # @param candidate_pts - a numpy array of points (nxk), n = number points, k = number of dimmensions
+    # @param mu - a numpy array of mu values outputed from predict. numpy (n)
+    # @param cdf_method - [opt default p_B_method] the method to calculate the cdf
+    #               [auto, full, independent, switch, mvn] or 'sampled' to use p_B_sampled
+    def p_B_pref_gp(self, candidate_pts, mu, cdf_method=None):
+        if cdf_method is None:
+            cdf_method = self.p_B_method
+        if cdf_method == 'sampled':
+            return self.p_B_sampled(candidate_pts, self.p_B_num_samples)
 
-            
-            sig = self.model.probits[0].sigma
-            #K_star_i += np.diag(np.ones(len(idx_i)) * 2 * sig * sig)
-            #K_star_i += np.ones((len(K_star_i), len(K_star_i))) * 2 * sig
+        K = self.model.cov
+        N = len(candidate_pts)
 
-            mu_star = mu[idx_i] - mu[i]
-            #mu_star = mu[i] - mu[idx_i]
+        p = np.empty(N)
+        block = max(1, self.max_batch_elements // max((N-1) * (N-1), 1))
 
+        for start in range(0, N, block):
+            idxs = np.arange(start, min(start+block, N))
+            mu_star, K_star = self.best_difference_dists(mu, K, idxs)
 
-            p[i] = calc_cdf(mu_star, K_star_i, method=cdf_method)
+            p[idxs] = calc_cdf_batch(mu_star, K_star, method=cdf_method)
 
         #print('p_sum = ' + str(np.sum(p)))
         p = p / np.sum(p)
         return p
 
-    ## p_B_pref_gp
-    # Calculates the probability of each pt in the given matrix as being the being the best path
-    # but only does it for preference GPs
+    ## p_B_sampled
+    # Estimates the probability of each pt in the given matrix as being the best path
+    # by the frequency each is the largest in samples from the posterior.
+    # Uses the cached samples of sample_posterior.
     # @param candidate_pts - a numpy array of points (nxk), n = number points, k = number of dimmensions
-    # @param mu - a numpy array of mu values outputed from predict. numpy (n)
-    def p_B_pref_linear(self, candidate_pts, mu):
-        p = np.zeros(len(candidate_pts))
-
-        #p = np.sum(np.log(probit_mat), axis=1) - np.log(probit_mat[0,0]) # * 2 multiplies the diagonal element (always 0.5)
-        #p = np.exp(p)
-
-        # sampling weights from linear model
-        w_samples = metropolis_hastings(self.model.loss_func, 2000, dim=candidate_pts.shape[1])
-
-        #w_norm = np.linalg.norm(w_samples, axis=1)
-        #w_samples = w_samples / np.tile(w_norm, (2,1)).T
-        # generate possible outputs from weighted samples
-        all_w = (candidate_pts @ w_samples.T).T
+    # @param M - the number of samples
+    #
+    # @return numpy array of probabilities (n)
+    def p_B_sampled(self, candidate_pts, M):
+        all_w = self.sample_posterior(candidate_pts, M)
 
         # frequentist approach from bayesian samples (not sure that's the correct term)
         largest_sample = np.argmax(all_w, axis=1)
-        for s in largest_sample:
-            p[s] += 1
+        p = np.bincount(largest_sample, minlength=len(candidate_pts)).astype(float)
 
-        #print('p_sum = ' + str(np.sum(p)))
         p = p / np.sum(p)
         return p
 
+    ## p_B_pref_linear
+    # Calculates the probability of each pt in the given matrix as being the being the best path
+    # but only does it for preference linear models
+    # @param candidate_pts - a numpy array of points (nxk), n = number points, k = number of dimmensions
+    # @param mu - a numpy array of mu values outputed from predict. numpy (n)
+    def p_B_pref_linear(self, candidate_pts, mu):
+        return self.p_B_sampled(candidate_pts, 2000)
+
 
 
@@ -25,71 +25,136 @@ class BayesInfoGain(ActiveLearner):
     #                    ['probit', '999', '99']
     def __init__(self, default_to_pareto=False, always_select_best=False, p_q_B_method='probit'):
         super(BayesInfoGain, self).__init__(default_to_pareto, always_select_best)
-        # this just forces the object to fail if approxcdf is not installed
-        import approxcdf
         self.p_q_B_method = p_q_B_method
 
     ## calc_H_B_Q
     # Calculate the expected entropy of B given Q.
     # H(B|Y,Q)
+    # @param Q - the indicies of the query (n,)
+    # @param p_B - the probability of each candidate being the best (N,)
+    # @param probit_mat - the pairwise probability between each candidate (N,N)
+    #
+    # @return H(B|Y,Q)
     def calc_H_B_Q(self, Q, p_B, probit_mat, debug=False):
+        return self.calc_H_B_Q_batch(np.asarray(Q)[np.newaxis], p_B, probit_mat, debug)[0]
+
+    ## calc_H_B_Q_batch
+    # Calculate the expected entropy of B given Q for a batch of queries of the same size.
+    # p(q|Y,Q), p(q|Y,B,Q) and H(B|Y,q) are computed as [Q, q, B] tensors, in chunks of
+    # queries so at most max_batch_elements are used at a time.
+    # @param Qs - the indicies of each query (num_Q, n)
+    # @param p_B - the probability of each candidate being the best (N,)
+    # @param probit_mat - the pairwise probability between each candidate (N,N)
+    #
+    # @return H(B|Y,Q) for each query (num_Q,)
+    def calc_H_B_Q_batch(self, Qs, p_B, probit_mat, debug=False):
         N = len(p_B)
+        num_Q, n = Qs.shape
+        chunk = max(1, self.max_batch_elements // (n * N))
+
+        H_B_Q = np.empty(num_Q)
+        for start in range(0, num_Q, chunk):
+            Q = Qs[start:start+chunk]
+            diag = np.arange(n)
+
+            # calculate p_q given Y [Q, q] as the product over the rest of the query
+            sub_probit = probit_mat[Q[:,:,np.newaxis], Q[:,np.newaxis,:]]
+            sub_probit[:, diag, diag] = 1.0
+            p_q = np.prod(sub_probit, axis=2)
+
+            # p_q given Y and B [Q, q, B]
+            if self.p_q_B_method == '999' or self.p_q_B_method == '99':
+                p_best = 0.999 if self.p_q_B_method == '999' else 0.99
+                is_B = Q[:,:,np.newaxis] == np.arange(N)[np.newaxis,np.newaxis,:]
+                p_q_B = np.where(is_B, p_best ** (n-1), p_q[:,:,np.newaxis])
+            else:
+                # p(q|Y,B) = p(q|Y) for every B, so Bayes rule gives p(B|Y,q) = p(B|Y)
+                # and H(B|Y,Q) = H(B|Y) exactly (rather than up to rounding).
+                H_B_Q[start:start+chunk] = -np.sum(np.where(p_B < MIN_LOG_VALUE, 0, p_B * np.log(p_B)))
+                continue
+
+            p_q = p_q / np.sum(p_q, axis=1)[:,np.newaxis]
+            p_q_B = p_q_B / np.sum(p_q_B, axis=1)[:,np.newaxis,:]
+            if debug:
+                print('\tp_q = ' + str(p_q))
+                print('\tp_q_B = ')
+                print(p_q_B)
 
-        # calculate p_q given Y
-        p_q = np.ones(len(Q))
-        # p_q given Y and B
-        p_q_B = np.ones((len(Q), N)) # [q, B_i]
-        for i, q_i in enumerate(Q):
-            Q_subi = np.copy(Q)
-            Q_subi = np.delete(Q_subi, i)
-            sub_probit = probit_mat[q_i, Q_subi]
-            p_q[i] = np.prod(sub_probit)
-
-            # Calculate p_q_B for each B
-            for B_i in range(N):
-                if B_i not in Q:
-                    p_q_B[i, B_i] = p_q[i]#np.prod(probit_mat[q_i, Q_subi])
-                else:
-                    # Set what p_q_B is
-                    if self.p_q_B_method == 'probit':
-                        sub_probit = probit_mat[q_i, Q_subi]
-                        sub_probit_w = np.where(q_i == B_i, np.fmax(sub_probit, 1-sub_probit), sub_probit)
-                        p_q_B[i, B_i] = np.prod(sub_probit)
-                    elif self.p_q_B_method == '999': 
-                        p_q_B[i, B_i] = np.prod(np.where(q_i == B_i, 0.999, sub_probit))
-                    elif self.p_q_B_method == '99':
-                        p_q_B[i, B_i] = np.prod(np.where(q_i == B_i, 0.99, sub_probit))
-
-        p_q = p_q / np.sum(p_q)
-        p_q_B = p_q_B / np.sum(p_q_B, axis=0)
-        if debug:
-            print('\tp_q = ' + str(p_q))
-            print('\tp_q_B = ')
-            print(p_q_B)
+            # calculate probability of B given Y and each q using Bayes rule
+            p_B_q = p_q_B * p_B / p_q[:,:,np.newaxis]
+            p_B_q = p_B_q / np.sum(p_B_q, axis=2)[:,:,np.newaxis]
 
+            if debug:
+                print('\tp_B_q = ' + str(p_B_q))
 
+            # Calculate the predicted post entropy
+            H_B_q = -np.sum(np.where(p_B_q < MIN_LOG_VALUE, 0, p_B_q * np.log(np.fmax(p_B_q, MIN_LOG_VALUE))), axis=2)
 
-        # calculate probability of B given Y and each q using Bayes rule
-        p_B_q = p_q_B * p_B / np.repeat(p_q[:,np.newaxis], N, axis=1)
-        p_B_q = p_B_q / np.repeat(np.sum(p_B_q, axis=1)[:, np.newaxis], N, axis=1) 
+            if debug:
+                print('\tH(B|Y, q) = ' + str(H_B_q))
+
+            H_B_Q[start:start+chunk] = np.sum(p_q * H_B_q, axis=1)
 
         if debug:
-            print('\tp_B_q = ' + str(p_B_q))
+            print('\tE_q[H(B|Y, q)] = H(B|Y,Q) = ' + str(H_B_Q))
         
+        return H_B_Q
 
-        # Calculate the predicted post entropy
-        H_B_q = -np.sum(np.where(p_B_q < MIN_LOG_VALUE, 0, p_B_q * np.log(p_B_q)), axis=1)
 
-        if debug:
-            print('\tH(B|Y, q) = ' + str(H_B_q))
+    ## calc_H_B_q_pairs
+    # Calculates the entropy of B given Y and the choice of i from the pair query (i,j)
+    # H(B|Y,q=i,Q=(i,j)) for every pair of candidates.
+    # The [i, j, B] tensors are computed over blocks of i, so at most
+    # max_batch_elements are used at a time.
+    # @param p_B - the probability of each candidate being the best (N,)
+    # @param p_q - the pairwise probability between each candidate (N,N)
+    #
+    # @return H_B_q (N,N)
+    def calc_H_B_q_pairs(self, p_B, p_q, debug=False):
+        N = len(p_B)
+        chunk = max(1, self.max_batch_elements // (N * N))
+        all_idx = np.arange(N)
+
+        H_B_q = np.empty((N, N))
+        for start in range(0, N, chunk):
+            rows = np.arange(start, min(N, start+chunk))
+            blk = np.arange(len(rows))
+            p_q_blk = p_q[rows]
+
+            # define p_q_B [i, j, B]
+            # This probably needs to be significantly updated
+            p_q_B = np.repeat(p_q_blk[:,:,np.newaxis], N, axis=2)
+            if self.p_q_B_method == 'probit':
+                p_hi = np.fmax(p_q_blk, p_q[:, rows].T)
+                p_lo = np.fmin(p_q_blk, p_q[:, rows].T)
+            elif self.p_q_B_method == '999':
+                p_hi, p_lo = 0.999, 0.001
+            elif self.p_q_B_method == '99':
+                p_hi, p_lo = 0.99, 0.01
+            if self.p_q_B_method in ('probit', '999', '99'):
+                # B = i
+                p_q_B[blk[:,np.newaxis], all_idx[np.newaxis,:], rows[:,np.newaxis]] = p_hi
+                # B = j
+                p_q_B[blk[:,np.newaxis], all_idx[np.newaxis,:], all_idx[np.newaxis,:]] = p_lo
 
-        H_B_Q = np.sum(p_q * H_B_q)
+            # Same query is always going to be probability of 0.5
+            p_q_B[blk, rows, :] = 0.5
 
-        if debug:
-            print('\tE_q[H(B|Y, q)] = H(B|Y,Q) = ' + str(H_B_Q))
-        
-        return H_B_Q
+            if debug:
+                print('\tp_q_B:')
+                print(p_q_B)
 
+            p_B_q = p_q_B * p_B / p_q_blk[:,:,np.newaxis]
+            p_B_q = p_B_q / np.sum(p_B_q, axis=2)[:,:,np.newaxis]
+
+            if debug:
+                print('\tp_B_q:')
+                print(p_B_q)
+
+            # Calculate the predicted post entropy
+            H_B_q[rows] = -np.sum(np.where(p_B_q < MIN_LOG_VALUE, 0, p_B_q * np.log(np.fmax(p_B_q, MIN_LOG_VALUE))), axis=2)
+
+        return H_B_q
 
     def get_p_B_probit(self, candidate_pts, mu):
         if self.first_call_greedy:
@@ -147,22 +212,21 @@ class BayesInfoGain(ActiveLearner):
         if debug:
             print('\tH(B|Y) = ' + str(H_B))
 
-        info_gain = np.zeros(len(indicies))
+        if len(prev_selection) < 1:
+            # THIS IS PROBABLY NOT THE RIGHT WAY TO HANDLE THIS
+            return np.random.choice(indicies)
+            #return np.argmax(p_B)
 
-        # Calculate the info gain for each sample
-        for idx, Q_i in enumerate(indicies):
-            Q = np.array(list(prev_selection) + [Q_i])
-            if debug:
-                print('Q_i: ' + str(Q_i) + ' Q: ' + str(Q))
-
-            if len(Q) < 2:
-                # THIS IS PROBABLY NOT THE RIGHT WAY TO HANDLE THIS
-                return np.random.choice(indicies)
-                #return np.argmax(p_B)
+        # Calculate the info gain for each sample, Q = prev_selection + [Q_i]
+        Qs = np.empty((len(indicies), len(prev_selection)+1), dtype=int)
+        Qs[:, :-1] = list(prev_selection)
+        Qs[:, -1] = indicies
+        if debug:
+            print('Q: ' + str(Qs))
 
-            H_B_Q = self.calc_H_B_Q(Q, p_B, probit_mat, debug)
+        H_B_Q = self.calc_H_B_Q_batch(Qs, p_B, probit_mat, debug)
 
-            info_gain[idx] = H_B - H_B_Q
+        info_gain = H_B - H_B_Q
 
         if debug:
             print('Info gain = ' + str(info_gain))
@@ -195,55 +259,15 @@ class BayesInfoGain(ActiveLearner):
             print(p_q)
 
 
-        # define p_q_B
-        # This probably needs to be significantly updated
-        p_q_B = np.repeat(p_q[:,:,np.newaxis], N, axis=2)
-        for i in range(N):
-            if self.p_q_B_method == 'probit':
-                p_q_B[i,:,i] = np.fmax(p_q[i,:], p_q[:,i])
-                p_q_B[:,i,i] = np.fmin(p_q[i,:], p_q[:,i])
-            elif self.p_q_B_method == '999':
-                p_q_B[i,:,i] = 0.999
-                p_q_B[:,i,i] = 0.001
-            elif self.p_q_B_method == '99':
-                p_q_B[i,:,i] = 0.99
-                p_q_B[:,i,i] = 0.01
-
-            #p_q_B[i,i,i] = 0.99
-
-            # Same query is always going to be probability of 0.5
-            p_q_B[i,i,:] = 0.5
-    
-        if debug:
-            print('\tp_q_B:')
-            for i in range(N):
-                print(p_q_B[:,:,i])
-            
-
-        p_B_rep = np.repeat(np.repeat(p_B[np.newaxis,np.newaxis, :], N, axis=0), N, axis=1)
-        p_q_rep = np.repeat(p_q[:,:,np.newaxis], N, axis=2)
-        p_B_q = p_q_B * p_B_rep / p_q_rep
-
-
-        p_B_q = p_B_q / np.repeat(np.sum(p_B_q, axis=2)[:,:,np.newaxis], N, axis=2)
-
-        if debug:
-            print('\tp_B_q:')
-            for i in range(N):
-                print(p_B_q[:,:,i])
-
-
-        # Calculate the predicted post entropy
-        H_B_q = -np.sum(np.where(p_B_q < MIN_LOG_VALUE, 0, p_B_q * np.log(p_B_q)), axis=2)
+        H_B_q = self.calc_H_B_q_pairs(p_B, p_q, debug)
 
         if debug:
             print('\t H_B_q: ')
             print(H_B_q)
 
-        H_B_Q = np.zeros((N,N))
-        for i in range(N):
-            for j in range(N):
-                H_B_Q[i,j] = p_q[i,j] * H_B_q[i,j] + p_q[j,i] * H_B_q[j,i]
+        # H(B|Y,Q=(i,j)) = p(i|Q) H(B|Y,i) + p(j|Q) H(B|Y,j)
+        H_B_Q = p_q * H_B_q
+        H_B_Q = H_B_Q + H_B_Q.T
 
         if debug:
             print('\t H_B_Q: ')
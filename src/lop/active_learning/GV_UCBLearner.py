@@ -23,6 +23,7 @@
 # to select the next value.
 
 import numpy as np
+from scipy.linalg import solve_triangular
 
 from lop.active_learning import UCBLearner
 from lop.models import PreferenceGP, GP, PreferenceLinear
@@ -46,12 +47,7 @@ class GV_UCBLearner(UCBLearner):
             variance = data
             cov = self.model.cov
         elif isinstance(self.model, PreferenceLinear):
-            w_samples = metropolis_hastings(self.model.loss_func, 200, dim=candidate_pts.shape[1])
-
-            #w_norm = np.linalg.norm(w_samples, axis=1)
-            #w_samples = w_samples / np.tile(w_norm, (2,1)).T
-            # generate possible outputs from weighted samples
-            all_w = (candidate_pts @ w_samples.T).T
+            all_w = self.sample_posterior(candidate_pts, 200)
 
             cov = np.cov(all_w.T)
             variance = np.diagonal(cov)
@@ -62,13 +58,38 @@ class GV_UCBLearner(UCBLearner):
 
         # calculate the Standardized general variance
         # The matrix covariance equivelant to the standard deviation
-        SGV = [np.linalg.det(cov[np.ix_(prev_selection+[idx], prev_selection+[idx])]) ** exp_v for idx in indicies]
+        SGV = self.generalized_variance(cov, prev_selection, indicies) ** exp_v
 
-        selected_GV_UCB = mu[indicies] + self.alpha*np.array(SGV)
+        selected_GV_UCB = mu[indicies] + self.alpha*SGV
 
         best_idx = np.argmax(selected_GV_UCB)
         self.sel_metric = selected_GV_UCB[best_idx]
         return indicies[best_idx]
         
 
+    ## generalized_variance
+    # Calculates the determinant of the covariance of the previous selection plus each
+    # candidate, det(S) * (c - k^T S^-1 k) by the Schur complement, using a single
+    # cholesky factorization of the previously selected block S.
+    # @param cov - the covariance matrix of the candidate points (n,n)
+    # @param prev_selection - a list of indicies of previously selected points
+    # @param indicies - a list of indicies of the candidates to score.
+    #
+    # @return numpy array of the generalized variance of each candidate (len(indicies),)
+    def generalized_variance(self, cov, prev_selection, indicies):
+        c = cov[indicies, indicies]
+        if len(prev_selection) == 0:
+            return c
+
+        try:
+            L = np.linalg.cholesky(cov[np.ix_(prev_selection, prev_selection)])
+        except np.linalg.LinAlgError:
+            # singular previous selection, fall back to each determinant
+            return np.array([np.linalg.det(cov[np.ix_(prev_selection+[idx], prev_selection+[idx])]) \
+                                for idx in indicies])
+
+        det_S = np.prod(np.diagonal(L))**2
+        V = solve_triangular(L, cov[np.ix_(prev_selection, indicies)], lower=True)
+        schur = np.maximum(c - np.sum(V*V, axis=0), 0)
 
+        return det_S * schur
@@ -119,6 +119,7 @@ class AlignmentDecision(RateChooseLearner):
 
         ## Generate samples using only preference data
         self.model.y_train[2] = None
+        self.model.increment_version()
         self.model.optimize()
         mu_pref, sig_pref = self.model.predict(x_rep)
         pref_cov = self.model.cov
@@ -129,6 +130,7 @@ class AlignmentDecision(RateChooseLearner):
         ## Generate samples using only rating data
         self.model.y_train[0] = None
         self.model.y_train[2] = rating_data
+        self.model.increment_version()
         
 
         self.model.optimize()
@@ -142,6 +144,7 @@ class AlignmentDecision(RateChooseLearner):
         ## Reset model and start evaluating samples
         self.model.y_train[0] = pref_data
         self.model.y_train[2] = rating_data
+        self.model.increment_version()
 
         ## Evaluate samples
         align_pref_f = self.pairwise_l.alignment_between(pref_rep, all_rep)
@@ -29,11 +29,12 @@
 # by sampling from the distribution of potential weights. 
 
 import numpy as np
+from scipy.special import logsumexp
 
 from lop.active_learning import ActiveLearner
 from lop.models import PreferenceGP, GP, PreferenceLinear
 
-from lop.utilities import p_human_choice, metropolis_hastings
+from lop.utilities import metropolis_hastings
 
 class MutualInfoLearner(ActiveLearner):
     ## Constructor
@@ -63,29 +64,19 @@ class MutualInfoLearner(ActiveLearner):
     def select_greedy(self, candidate_pts, mu, data, indicies, prev_selection):
         indicies = list(indicies)
         prev_selection = list(prev_selection)
-        if isinstance(self.model, (PreferenceGP, GP)):
-            variance = data
-            cov = self.model.cov
-
-            # sample M possible parameters w (reward values of the GP)
-            all_w = np.random.multivariate_normal(mu, cov, size=self.M)
-        elif isinstance(self.model, PreferenceLinear):
-            w_samples = metropolis_hastings(self.model.loss_func, self.M, dim=candidate_pts.shape[1])
-
-            #w_norm = np.linalg.norm(w_samples, axis=1)
-            #w_samples = w_samples / np.tile(w_norm, (2,1)).T
-            # generate possible outputs from weighted samples
-            all_w = (candidate_pts @ w_samples.T).T
-            
+        # sample M possible parameters w (reward values of the model)
+        all_w = self.sample_posterior(candidate_pts, self.M)
+
         if self.fake_func is not None:
             fake_f_mean = np.mean(self.fake_func(candidate_pts))
             samp_mean = np.mean(all_w)
-
-            print('Scaling using fake function: ' + str(fake_f_mean / samp_mean))
             all_w = all_w * (fake_f_mean / samp_mean)
 
 
-        info_gain = [self.calc_info_gain(prev_selection + [idx], all_w) for idx in indicies]
+        Qs = np.empty((len(indicies), len(prev_selection)+1), dtype=int)
+        Qs[:, :-1] = prev_selection
+        Qs[:, -1] = indicies
+        info_gain = self.calc_info_gain_batch(Qs, all_w)
 
         best_idx = np.argmax(info_gain)
         self.sel_metric = info_gain[best_idx]
@@ -103,14 +94,35 @@ class MutualInfoLearner(ActiveLearner):
     #                   N - dimension of candidate points.
     #
     def calc_info_gain(self, Q, all_w):
-        # Find the probabilities of human selecting a query given the possible reward values
-        p = p_human_choice(all_w[:,Q], self.peakiness)
-        # find the sum of the probabilities of w
-        sum_p_over_w = np.sum(p, axis=0)
-
-        # Find the information gain using the sample equation (4) in [1]
-        info_gain = np.sum(p * np.log2(self.M * p / sum_p_over_w)) / self.M
+        return self.calc_info_gain_batch(np.asarray(Q)[np.newaxis], all_w)[0]
+
+    ## calc_info_gain_batch
+    # calculate the info gain for a batch of queries of the same size given the sampled
+    # parameters / reward W. The human choice probabilities are computed as [M, Q, q]
+    # tensors with a log-sum-exp softmax, in chunks of queries so at most
+    # max_batch_elements are used at a time.
+    # @param Qs - the indicies of each query (num_Q, k)
+    # @param all_w - a matrix of possible rewards for sample set of parameters [M,N]
+    #
+    # @return the info gain of each query (num_Q,)
+    def calc_info_gain_batch(self, Qs, all_w):
+        M = all_w.shape[0]
+        num_Q, k = Qs.shape
+        chunk = max(1, self.max_batch_elements // (M * k))
+
+        info_gain = np.empty(num_Q)
+        for start in range(0, num_Q, chunk):
+            r = self.peakiness * all_w[:, Qs[start:start+chunk]]
+
+            # Find the probabilities of human selecting a query given the possible reward values
+            log_p = r - logsumexp(r, axis=2, keepdims=True)
+            p = np.exp(log_p)
+            # find the sum of the probabilities of w
+            log_sum_p_over_w = logsumexp(log_p, axis=0)
+
+            # Find the information gain using the sample equation (4) in [1]
+            # choices with p = 0 add nothing (0 log 0 = 0)
+            terms = np.where(p > 0, p * (np.log(M) + log_p - log_sum_p_over_w), 0.0)
+            info_gain[start:start+chunk] = np.sum(terms, axis=(0,2)) / (M * np.log(2))
 
         return info_gain
-        
-
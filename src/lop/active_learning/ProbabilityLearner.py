@@ -26,7 +26,7 @@ import numpy as np
 
 from lop.active_learning import ActiveLearner
 from lop.models import PreferenceGP, GP, PreferenceLinear
-from lop.utilities import metropolis_hastings
+from lop.utilities import metropolis_hastings, calc_cdf_batch
 
 from scipy.stats import multivariate_normal
 
@@ -46,40 +46,8 @@ class ProbabilityLearner(ActiveLearner):
     # @return the index of the greedy selection.
     def select_greedy(self, candidate_pts, mu, data, indicies, prev_selection):
         if isinstance(self.model, PreferenceGP):
-            K = self.model.cov
-
-            p = np.empty(len(candidate_pts))
-
-            # calculate the combined covariance matrix for if point i is the largest point.
-            for i in range(len(candidate_pts)):
-                K_star_i = np.zeros((len(p)-1, len(p)-1))
-
-                idx_i = list(range(len(p)))
-                idx_i.remove(i)
-
-                
-
-                for j in range(len(K_star_i)):
-                    for k in range(len(K_star_i)):
-                        K_star_i[j,k] = K[i, i] + K[idx_i[j], idx_i[k]] - K[i, idx_i[j]] - K[i, idx_i[k]]
-
-                
-                sig = self.model.probits[0].sigma
-                #K_star_i += np.diag(np.ones(len(idx_i)) * 2 * sig * sig)
-                #K_star_i += np.ones((len(K_star_i), len(K_star_i))) * 2 * sig * sig
-
-                mu_star = mu[idx_i] - mu[i]
-                #mu_star = mu[i] - mu[idx_i]
-
-                rv = multivariate_normal(mean=mu_star, cov=K_star_i)
-
-                x, y = np.mgrid[-1:1:.01, -1:1:.01]
-                pos = np.dstack((x, y))
-                #plt.figure()
-                #plt.contourf(x,y,rv.pdf(pos))
-                
-                zero_vector = np.zeros(len(candidate_pts)-1)
-                p[i] = rv.cdf(zero_vector)
+            mu_star, K_star = self.best_difference_dists(mu, self.model.cov)
+            p = calc_cdf_batch(mu_star, K_star, method='full')
 
         #p = p / np.sum(p)
 
@@ -35,7 +35,8 @@ else:
 ## Base kernel function class
 class KernelFunc:
     def __init__(self):
-        pass
+        # the kernel only depends on the difference of the samples k(u,v) = k(u-v)
+        self.stationary = False
 
     ## get covariance matrix
     # calculate the covariance matrix between the samples given in X
@@ -53,21 +54,71 @@ class KernelFunc:
                 cov[i,j] = cov_ij
         return cov
 
+    ## get the diagonal of the covariance matrix
+    # calculates only the diagonal of cov(X, X), the variance of each sample.
+    # @param X - samples (n,k) array where n is the number of samples,
+    #        and k is the dimension of the samples
+    #
+    # @return the variance of each sample (n,)
+    def cov_diag(self, X):
+        return np.array([self.__call__(x, x) for x in X])
+
     ## get gradient of the covariance matrix
-    # calculate the covariance matrix between the samples given in X
+    # calculate the gradient of the covariance matrix between the samples given in X
     # @param X - samples (n1,k) array where n is the number of samples,
     #        and k is the dimension of the samples
     # @param Y - samples (n2, k)
     #
-    # @return the covariance gradient tensor of the samples. [n1, n2, k]
+    # @return the covariance gradient tensor of the samples. [p, n1, n2]
+    #           where p is the number of parameters of the kernel (len(self))
     def cov_gradient(self, X, Y):
-        cov = np.empty((len(X), len(Y), len(self)))
+        return self.cov_and_grad(X, Y)[1]
+
+    ## get the covariance matrix and the gradient of the covariance matrix
+    # calculates both in a single pass so kernels can share the intermediate
+    # values (distances, exponentials) between the covariance and gradient.
+    # @param X - samples (n1,k) array where n is the number of samples,
+    #        and k is the dimension of the samples
+    # @param Y - samples (n2, k)
+    #
+    # @return cov, grad
+    #       cov - the covariance matrix of the samples [n1, n2]
+    #       grad - the covariance gradient tensor of the samples. [p, n1, n2]
+    def cov_and_grad(self, X, Y):
+        cov = np.empty((len(X), len(Y)))
+        grad = np.empty((len(self), len(X), len(Y)))
 
         for i,x1 in enumerate(X):
             for j,x2 in enumerate(Y):
-                cov_ij = self.gradient(x1, x2)
-                cov[i,j, :] = cov_ij
-        return cov
+                cov[i,j] = self.__call__(x1, x2)
+                grad[:, i,j] = self.gradient(x1, x2)
+        return cov, grad
+
+    ## features
+    # explicit (approximate) feature map of the kernel such that
+    # cov(X, Y) ~= features(X) @ features(Y).T
+    # Kernels without a finite feature map return None.
+    # @param X - samples (n,k) array where n is the number of samples,
+    #        and k is the dimension of the samples
+    #
+    # @return feature matrix (n, D) or None if the kernel does not have a feature map
+    def features(self, X):
+        return None
+
+    ## cov_sqdist
+    # the covariance matrices for a batch of parameter settings at once, given the
+    # precomputed squared distances between the samples (for fast hyperparameter sweeps).
+    # Kernels that are not a function of the squared distance return None.
+    # @param sqdist - the squared distances between samples (n1, n2)
+    # @param theta - the parameter settings (S, len(get_param()))
+    # @param same - whether sqdist is between a set of samples and itself (adds noise)
+    # @param X - [opt default None] the samples of the rows (n1,k), for kernels that
+    #           are not only a function of the squared distance.
+    # @param Y - [opt default None] the samples of the columns (n2,k)
+    #
+    # @return the covariance matrices (S, n1, n2) or None if not supported
+    def cov_sqdist(self, sqdist, theta, same=False, X=None, Y=None):
+        return None
 
     ## set_param
     # update the parameters
@@ -137,6 +188,7 @@ class DualKern(KernelFunc):
         super(DualKern, self).__init__()
         self.a = kern_1
         self.b = kern_2
+        self.stationary = kern_1.stationary and kern_2.stationary
 
         self.operator = operator
 
@@ -198,6 +250,23 @@ class DualKern(KernelFunc):
         else:
             raise NotImplementedError('DualKern does not have operator `'+self.operator+'` implemented')
 
+    ## get the diagonal of the covariance matrix
+    # calculates only the diagonal of cov(X, X), the variance of each sample.
+    # @param X - samples (n,k) array where n is the number of samples,
+    #        and k is the dimension of the samples
+    #
+    # @return the variance of each sample (n,)
+    def cov_diag(self, X):
+        a_f = self.a.cov_diag(X)
+        b_f = self.b.cov_diag(X)
+
+        if self.operator == '+':
+            return a_f + b_f
+        elif self.operator == '*':
+            return a_f * b_f
+        else:
+            raise NotImplementedError('DualKern does not have operator `'+self.operator+'` implemented')
+
     # get_param
     # get a vector of the parameters for the kernel function (used for hyper-parameter optimization)
     def get_param(self):
@@ -218,26 +287,73 @@ class DualKern(KernelFunc):
 
         return np.append(a_grad, b_grad, axis=0)
 
-    ## get gradient of the covariance matrix
-    # calculate the covariance matrix between the samples given in X
+    ## get the covariance matrix and the gradient of the covariance matrix
+    # Each child kernel is only evaluated once, the gradients are combined
+    # using the covariance matrices returned with them.
     # @param X - samples (n1,k) array where n is the number of samples,
     #        and k is the dimension of the samples
     # @param Y - samples (n2, k)
     #
-    # @return the covariance gradient tensor of the samples. [n1, n2, k]
-    def cov_gradient(self, X, Y):
+    # @return cov, grad
+    #       cov - the covariance matrix of the samples [n1, n2]
+    #       grad - the covariance gradient tensor of the samples. [p, n1, n2]
+    def cov_and_grad(self, X, Y):
+        a_f, a_grad = self.a.cov_and_grad(X,Y)
+        b_f, b_grad = self.b.cov_and_grad(X,Y)
+
         if self.operator == '+':
-            a_grad = self.a.cov_gradient(X,Y)
-            b_grad = self.b.cov_gradient(X,Y)
+            cov = a_f + b_f
         elif self.operator == '*':
-            a_grad = self.a.cov_gradient(X,Y) * self.b.cov(X,Y)
-            b_grad = self.b.cov_gradient(X,Y) * self.a.cov(X,Y)
+            cov = a_f * b_f
+            a_grad = a_grad * b_f
+            b_grad = b_grad * a_f
         else:
             raise NotImplementedError('DualKern does not have operator `'+self.operator+'` implemented')
 
-        return a_grad + b_grad
+        return cov, np.append(a_grad, b_grad, axis=0)
+
 
 
+    ## features
+    # The sum of two kernels with feature maps has the concatenated feature map.
+    # Products of kernels do not have a (small) feature map and return None.
+    # @param X - samples (n,k) array where n is the number of samples,
+    #        and k is the dimension of the samples
+    #
+    # @return feature matrix (n, D) or None if the kernel does not have a feature map
+    def features(self, X):
+        if self.operator != '+':
+            return None
+
+        a_phi = self.a.features(X)
+        b_phi = self.b.features(X)
+        if a_phi is None or b_phi is None:
+            return None
+        return np.append(a_phi, b_phi, axis=1)
+
+    ## cov_sqdist
+    # the covariance matrices for a batch of parameter settings at once, given the
+    # precomputed squared distances between the samples.
+    # @param sqdist - the squared distances between samples (n1, n2)
+    # @param theta - the parameter settings (S, len(get_param()))
+    # @param same - whether sqdist is between a set of samples and itself (adds noise)
+    # @param X - [opt default None] the samples of the rows (n1,k)
+    # @param Y - [opt default None] the samples of the columns (n2,k)
+    #
+    # @return the covariance matrices (S, n1, n2) or None if not supported
+    def cov_sqdist(self, sqdist, theta, same=False, X=None, Y=None):
+        a_len = len(self.a.get_param())
+        a_cov = self.a.cov_sqdist(sqdist, theta[:,:a_len], same, X, Y)
+        b_cov = self.b.cov_sqdist(sqdist, theta[:,a_len:], same, X, Y)
+        if a_cov is None or b_cov is None:
+            return None
+
+        if self.operator == '+':
+            return a_cov + b_cov
+        elif self.operator == '*':
+            return a_cov * b_cov
+        else:
+            raise NotImplementedError('DualKern does not have operator `'+self.operator+'` implemented')
 
     def __call__(self, u, v):
         a_f = self.a(u,v)
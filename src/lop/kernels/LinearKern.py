@@ -122,31 +122,47 @@ class LinearKern(KernelFunc):
         cov = (self.sigma_b**2) + ((self.sigma**2) * tmp)
         return cov
 
-    # get gradient of the covariance matrix
-    # calculate the covariance matrix between the samples given in X
+    ## get the diagonal of the covariance matrix
+    # calculates only the diagonal of cov(X, X), the variance of each sample.
+    # @param X - samples (n,k) array where n is the number of samples,
+    #        and k is the dimension of the samples
+    #
+    # @return the variance of each sample (n,)
+    def cov_diag(self, X):
+        if len(X.shape) == 1:
+            X = X[:,np.newaxis]
+
+        X_c = X - self.c
+        return (self.sigma_b**2) + ((self.sigma**2) * np.sum(X_c * X_c, axis=1))
+
+    ## get the covariance matrix and the gradient of the covariance matrix
+    # The gradient reuses the centered inner products of the covariance.
     # @param X - samples (n1,k) array where n is the number of samples,
     #        and k is the dimension of the samples
     # @param Y - samples (n2, k)
     #
-    # @return the covariance gradient tensor of the samples. [n1, n2, k]
-    def cov_gradient(self, X, Y):
-        N = X.shape[0]
-        M = Y.shape[0]
-
+    # @return cov, grad
+    #       cov - the covariance matrix of the samples [n1, n2]
+    #       grad - the covariance gradient tensor of the samples. [3, n1, n2]
+    #               ordered as (sigma, sigma_b, c)
+    def cov_and_grad(self, X, Y):
         if len(X.shape) == 1:
             X = X[:,np.newaxis]
         if len(Y.shape) == 1:
             Y = Y[:,np.newaxis]
 
+        X_c = X - self.c
+        Y_c = Y - self.c
+        tmp = X_c @ Y_c.T
 
-        X_expanded = np.repeat(X[:,np.newaxis,:], M, axis=1)
-        Y_expanded = np.repeat(Y[np.newaxis,:,:], N, axis=0)
+        cov = (self.sigma_b**2) + ((self.sigma**2) * tmp)
 
-        dSigma = 2 * self.sigma * np.sum((X_expanded - self.c) * (Y_expanded - self.c), axis=2)
-        dSigma_b = 2 * self.sigma_b * np.ones((N, M))
-        dc = dc = self.sigma*self.sigma*np.sum(2*self.c - X_expanded - Y_expanded, axis=2)
+        grad = np.empty((3,) + cov.shape)
+        grad[0] = 2 * self.sigma * tmp
+        grad[1] = 2 * self.sigma_b
+        grad[2] = -self.sigma*self.sigma*(np.sum(X_c, axis=1)[:,np.newaxis] + np.sum(Y_c, axis=1)[np.newaxis,:])
 
-        return dSigma, dSigma_b, dc
+        return cov, grad
 
 
     def gradient(self, u, v):
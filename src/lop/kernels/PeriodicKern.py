@@ -45,6 +45,7 @@ class PeriodicKern(KernelFunc):
     # @param - p, the periodicity of the periodic kernel
     def __init__(self, sigma, l, p):
         super(PeriodicKern, self).__init__()
+        self.stationary = True
 
         self.sigma = sigma
         self.l = l
@@ -128,41 +129,45 @@ class PeriodicKern(KernelFunc):
                 d_log_pdf_gamma(self.l, self.l_k, self.l_theta),
                 d_log_pdf_gamma(self.p, self.p_k, self.p_theta)])
 
-    # get gradient of the covariance matrix
-    # calculate the covariance matrix between the samples given in X
+    ## get the diagonal of the covariance matrix
+    # calculates only the diagonal of cov(X, X), the variance of each sample.
+    # @param X - samples (n,k) array where n is the number of samples,
+    #        and k is the dimension of the samples
+    #
+    # @return the variance of each sample (n,)
+    def cov_diag(self, X):
+        return np.full(X.shape[0], self.sigma * self.sigma)
+
+    ## get the covariance matrix and the gradient of the covariance matrix
+    # The gradient reuses the distances, sine and exponential of the covariance.
     # @param X - samples (n1,k) array where n is the number of samples,
     #        and k is the dimension of the samples
     # @param Y - samples (n2, k)
     #
-    # @return the covariance gradient tensor of the samples. [n1, n2, k]
-    def cov_gradient(self, X, Y):
-        N = X.shape[0]
-        M = Y.shape[0]
-
+    # @return cov, grad
+    #       cov - the covariance matrix of the samples [n1, n2]
+    #       grad - the covariance gradient tensor of the samples. [3, n1, n2]
+    #               ordered as (sigma, l, p)
+    def cov_and_grad(self, X, Y):
         if len(X.shape) == 1:
             X = X[:,np.newaxis]
         if len(Y.shape) == 1:
             Y = Y[:,np.newaxis]
 
+        diff = X[:,np.newaxis,:] - Y[np.newaxis,:,:]
+        uv_norm = np.sum(np.abs(diff), axis=2)
 
-        X_expanded = np.repeat(X[:,np.newaxis,:], M, axis=1)
-        Y_expanded = np.repeat(Y[np.newaxis,:,:], N, axis=0)
-        diff = X_expanded - Y_expanded
-        top = np.sum(diff*diff, axis=2)
-
-        exp_x = np.exp(-top / (2 * self.l*self.l))
+        angle = np.pi*uv_norm / self.p
+        sin_tmp = np.sin(angle)
+        exp_x = np.exp(-2 * sin_tmp * sin_tmp / (self.l * self.l))
+        cov = self.sigma * self.sigma * exp_x
 
-        diff = X_expanded - Y_expanded
-        uv_norm = np.sum(np.abs(diff), axis=2)
-        
-        cos_tmp = np.cos(np.pi*uv_norm / self.p)
-        
-        dSigma = 2 * self.sigma * exp_x
-        dl = -2 * self.sigma*self.sigma * exp_x * uv_norm / (self.l*self.l*self.l)
-        dp = 2 * np.pi * self.sigma * self.sigma * uv_norm * exp_x * \
-            cos_tmp / (self.l*self.l * self.p*self.p)
+        grad = np.empty((3,) + cov.shape)
+        grad[0] = 2 * self.sigma * exp_x
+        grad[1] = 4 * cov * sin_tmp * sin_tmp / (self.l*self.l*self.l)
+        grad[2] = 4 * cov * angle * sin_tmp * np.cos(angle) / (self.l*self.l * self.p)
 
-        return dSigma, dl, dp
+        return cov, grad
 
 
     def gradient(self, u, v):
@@ -173,9 +178,9 @@ class PeriodicKern(KernelFunc):
 
         dSigma = 2 * self.sigma * exp_x
 
-        dl = -2 * self.sigma*self.sigma * exp_x * uv_norm / (self.l*self.l*self.l)
+        dl = 4 * self.sigma*self.sigma * exp_x * sin_tmp * sin_tmp / (self.l*self.l*self.l)
 
-        dp = 2 * np.pi * self.sigma * self.sigma * uv_norm * exp_x * \
+        dp = 4 * np.pi * self.sigma * self.sigma * uv_norm * exp_x * sin_tmp * \
             np.cos(np.pi * uv_norm / self.p) / (self.l*self.l * self.p*self.p)
 
         return np.array([dSigma, dl, dp])
@@ -43,6 +43,7 @@ class RBF_kern(KernelFunc):
     # @param l - the lengthscale for the rbf_kernel
     def __init__(self, sigma, l, sigma_noise=0.01):
         super(RBF_kern, self).__init__()
+        self.stationary = True
 
         self.sigma = sigma
         self.l = l
@@ -101,18 +102,13 @@ class RBF_kern(KernelFunc):
     #
     # @return the covariance matrix of the samples.
     def cov(self, X, Y):
-        N = X.shape[0]
-        M = Y.shape[0]
-
         if len(X.shape) == 1:
             X = X[:,np.newaxis]
         if len(Y.shape) == 1:
             Y = Y[:,np.newaxis]
 
 
-        X_expanded = np.repeat(X[:,np.newaxis,:], M, axis=1)
-        Y_expanded = np.repeat(Y[np.newaxis,:,:], N, axis=0)
-        diff = X_expanded - Y_expanded
+        diff = X[:,np.newaxis,:] - Y[np.newaxis,:,:]
         top = np.sum(diff*diff, axis=2)
 
         cov = self.sigma * self.sigma * np.exp(-top / (2 * self.l*self.l))
@@ -120,38 +116,63 @@ class RBF_kern(KernelFunc):
             cov += np.eye(cov.shape[0])*self.sigma_noise
         return cov
 
-    # get gradient of the covariance matrix
-    # calculate the covariance matrix between the samples given in X
+    ## cov_sqdist
+    # the covariance matrices for a batch of parameter settings at once, given the
+    # precomputed squared distances between the samples.
+    # @param sqdist - the squared distances between samples (n1, n2)
+    # @param theta - the parameter settings (S, 2) ordered as (sigma, l)
+    # @param same - whether sqdist is between a set of samples and itself (adds noise)
+    # @param X - [opt default None] the samples of the rows (unused)
+    # @param Y - [opt default None] the samples of the columns (unused)
+    #
+    # @return the covariance matrices (S, n1, n2)
+    def cov_sqdist(self, sqdist, theta, same=False, X=None, Y=None):
+        sigma = theta[:,0,np.newaxis,np.newaxis]
+        l = theta[:,1,np.newaxis,np.newaxis]
+
+        cov = sigma * sigma * np.exp(-sqdist[np.newaxis] / (2 * l * l))
+        if same:
+            cov += np.eye(sqdist.shape[0])*self.sigma_noise
+        return cov
+
+    ## get the diagonal of the covariance matrix
+    # calculates only the diagonal of cov(X, X), the variance of each sample.
+    # @param X - samples (n,k) array where n is the number of samples,
+    #        and k is the dimension of the samples
+    #
+    # @return the variance of each sample (n,)
+    def cov_diag(self, X):
+        return np.full(X.shape[0], self.sigma * self.sigma + self.sigma_noise)
+
+    ## get the covariance matrix and the gradient of the covariance matrix
+    # The gradient reuses the squared distances and exponential of the covariance.
     # @param X - samples (n1,k) array where n is the number of samples,
     #        and k is the dimension of the samples
     # @param Y - samples (n2, k)
     #
-    # @return the covariance gradient tensor of the samples. [n1, n2, k]
-    def cov_gradient(self, X, Y):
-        N = X.shape[0]
-        M = Y.shape[0]
-
+    # @return cov, grad
+    #       cov - the covariance matrix of the samples [n1, n2]
+    #       grad - the covariance gradient tensor of the samples. [2, n1, n2]
+    #               ordered as (sigma, l)
+    def cov_and_grad(self, X, Y):
         if len(X.shape) == 1:
             X = X[:,np.newaxis]
         if len(Y.shape) == 1:
             Y = Y[:,np.newaxis]
 
-
-        X_expanded = np.repeat(X[:,np.newaxis,:], M, axis=1)
-        Y_expanded = np.repeat(Y[np.newaxis,:,:], N, axis=0)
-        diff = X_expanded - Y_expanded
+        diff = X[:,np.newaxis,:] - Y[np.newaxis,:,:]
         top = np.sum(diff*diff, axis=2)
 
         exp_x = np.exp(-top / (2 * self.l*self.l))
+        cov = self.sigma * self.sigma * exp_x
 
-        dSigma = 2 * self.sigma * exp_x
-        dl = 2 * self.sigma * self.sigma * top * exp_x / (self.l*self.l*self.l)
-        # if N == N:
-        #     dSigma_noise = np.eye(N)
-        # else:
-        #     dSigma_noise = np.zeros((N, M))
+        grad = np.empty((2,) + cov.shape)
+        grad[0] = 2 * self.sigma * exp_x
+        grad[1] = cov * top / (self.l*self.l*self.l)
 
-        return dSigma, dl
+        if cov.shape[0] == cov.shape[1] and (X[0] == Y[0]).all():
+            cov += np.eye(cov.shape[0])*self.sigma_noise
+        return cov, grad
 
 
     def gradient(self, u, v):
@@ -161,7 +182,7 @@ class RBF_kern(KernelFunc):
         exp_x = np.exp(-top / (2 * self.l*self.l))
 
         dSigma = 2 * self.sigma * exp_x
-        dl = 2 * self.sigma * self.sigma * top * exp_x / (self.l*self.l*self.l)
+        dl = self.sigma * self.sigma * top * exp_x / (self.l*self.l*self.l)
 
         return np.array([dSigma, dl])
 
@@ -0,0 +1,159 @@
+# Copyright 2026 Ian Rankin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE
+# FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+# RBF_kern_rff.py
+# Written Ian Rankin - October 2026
+#
+# Random Fourier feature approximation of the Radius Basis Function GP kernel.
+# Random Features for Large-Scale Kernel Machines (2007)
+# Ali Rahimi, Benjamin Recht
+
+import numpy as np
+
+from lop.kernels import RBF_kern
+
+## RBF_kern_rff
+# An RBF kernel approximated with an explicit random Fourier feature map
+# phi(x) = sigma / sqrt(D) * [cos(x w / l), sin(x w / l)], w ~ N(0, I)
+# so cov(X, Y) = phi(X) @ phi(Y).T.
+# The frequencies are drawn once (lazily given the input dimension) and kept
+# fixed when the parameters change, so the kernel is a smooth function of (sigma, l).
+# Used by the PreferenceGP to predict and sample in time linear in the number of
+# test points.
+class RBF_kern_rff(RBF_kern):
+
+    ## constructor
+    # @param sigma - the sigma for the rbf kernel
+    # @param l - the lengthscale for the rbf_kernel
+    # @param num_features - [opt default 500] the number of features (D) of the approximation.
+    #                   uses num_features // 2 frequencies each with a cos and sin feature.
+    # @param sigma_noise [opt default 0.01] sets the amount of noise on sigma
+    # @param seed - [opt default None] the seed used to draw the frequencies.
+    def __init__(self, sigma, l, num_features=500, sigma_noise=0.01, seed=None):
+        super(RBF_kern_rff, self).__init__(sigma, l, sigma_noise=sigma_noise)
+
+        self.num_features = num_features
+        self.seed = seed
+        self.omega = None
+
+    ## lazy_omega_init
+    # draw the random frequencies once the dimension of the input is known.
+    # @param dim - the dimension of the samples
+    def lazy_omega_init(self, dim):
+        if self.omega is None or self.omega.shape[0] != dim:
+            rng = np.random.default_rng(self.seed)
+            self.omega = rng.standard_normal((dim, max(self.num_features // 2, 1)))
+
+    ## features
+    # the random Fourier feature map of the kernel
+    # @param X - samples (n,k) array where n is the number of samples,
+    #        and k is the dimension of the samples
+    #
+    # @return feature matrix (n, D)
+    def features(self, X):
+        if len(X.shape) == 1:
+            X = X[:,np.newaxis]
+        self.lazy_omega_init(X.shape[1])
+
+        Z = X @ self.omega / self.l
+        scale = self.sigma / np.sqrt(self.omega.shape[1])
+
+        return scale * np.append(np.cos(Z), np.sin(Z), axis=1)
+
+    ## get covariance matrix
+    # calculate the covariance matrix between the samples given in X
+    # @param X - samples (n1,k) numpy array where n is the number of samples,
+    #        and k is the dimension of the samples
+    # @param Y - samples (n2, k) numpy array
+    #
+    # @return the covariance matrix of the samples.
+    def cov(self, X, Y):
+        if len(X.shape) == 1:
+            X = X[:,np.newaxis]
+        if len(Y.shape) == 1:
+            Y = Y[:,np.newaxis]
+
+        cov = self.features(X) @ self.features(Y).T
+        if cov.shape[0] == cov.shape[1] and (X[0] == Y[0]).all():
+            cov += np.eye(cov.shape[0])*self.sigma_noise
+        return cov
+
+    ## cov_sqdist
+    # The random feature approximation is not a function of the squared distance only.
+    # @return None
+    def cov_sqdist(self, sqdist, theta, same=False, X=None, Y=None):
+        return None
+
+    ## get the diagonal of the covariance matrix
+    # calculates only the diagonal of cov(X, X), the variance of each sample.
+    # @param X - samples (n,k) array where n is the number of samples,
+    #        and k is the dimension of the samples
+    #
+    # @return the variance of each sample (n,)
+    def cov_diag(self, X):
+        phi = self.features(X)
+        return np.sum(phi * phi, axis=1) + self.sigma_noise
+
+    ## get the covariance matrix and the gradient of the covariance matrix
+    # @param X - samples (n1,k) array where n is the number of samples,
+    #        and k is the dimension of the samples
+    # @param Y - samples (n2, k)
+    #
+    # @return cov, grad
+    #       cov - the covariance matrix of the samples [n1, n2]
+    #       grad - the covariance gradient tensor of the samples. [2, n1, n2]
+    #               ordered as (sigma, l)
+    def cov_and_grad(self, X, Y):
+        if len(X.shape) == 1:
+            X = X[:,np.newaxis]
+        if len(Y.shape) == 1:
+            Y = Y[:,np.newaxis]
+        self.lazy_omega_init(X.shape[1])
+
+        scale = self.sigma / np.sqrt(self.omega.shape[1])
+
+        Z_x = X @ self.omega / self.l
+        Z_y = Y @ self.omega / self.l
+        phi_x = scale * np.append(np.cos(Z_x), np.sin(Z_x), axis=1)
+        phi_y = scale * np.append(np.cos(Z_y), np.sin(Z_y), axis=1)
+
+        # d phi / dl, using dZ/dl = -Z / l
+        dphi_x = scale * np.append(np.sin(Z_x) * Z_x, -np.cos(Z_x) * Z_x, axis=1) / self.l
+        dphi_y = scale * np.append(np.sin(Z_y) * Z_y, -np.cos(Z_y) * Z_y, axis=1) / self.l
+
+        cov = phi_x @ phi_y.T
+
+        grad = np.empty((2,) + cov.shape)
+        grad[0] = 2 * cov / self.sigma
+        grad[1] = dphi_x @ phi_y.T + phi_x @ dphi_y.T
+
+        if cov.shape[0] == cov.shape[1] and (X[0] == Y[0]).all():
+            cov += np.eye(cov.shape[0])*self.sigma_noise
+        return cov, grad
+
+    def gradient(self, u, v):
+        u = np.reshape(u, (1,-1))
+        v = np.reshape(v, (1,-1))
+
+        return self.cov_and_grad(u, v)[1][:,0,0]
+
+    def __call__(self, u, v):
+        u = np.reshape(u, (1,-1))
+        v = np.reshape(v, (1,-1))
+
+        return (self.features(u) @ self.features(v).T)[0,0]
@@ -26,6 +26,7 @@
 import numpy as np
 
 from lop.kernels import RBF_kern
+from lop.utilities import array_fingerprint
 import pdb
 
 ## RBF_kern_zeroed
@@ -44,6 +45,12 @@ class RBF_kern_zeroed(RBF_kern):
         super(RBF_kern_zeroed, self).__init__(sigma, l, sigma_noise=sigma_noise)
 
         self.zero_pt = zero_pt
+        self.stationary = False
+
+        # cache of zero point terms [(fingerprint of X, zero_pt, l, top, exp), ...]
+        # for the last inputs given
+        self.zero_cache = []
+        self.zero_cache_size = 2
 
 
     def lazy_zero_pt_init(self, u):
@@ -53,6 +60,36 @@ class RBF_kern_zeroed(RBF_kern):
             else:
                 self.zero_pt = np.array([0])
 
+    ## zero_terms
+    # calculates the per sample terms to the zero point, such that
+    # cov(x, zero_pt) = sigma^2 * exp_zero (without noise).
+    # The terms for the last few inputs (normally the training inputs) are cached,
+    # keyed on the content of the input so modified arrays are never reused.
+    # @param X - samples (n,k) numpy array where n is the number of samples,
+    #        and k is the dimension of the samples
+    #
+    # @return top, exp_zero
+    #       top - squared distance of each sample to the zero point (n,)
+    #       exp_zero - exp(-top / (2 l^2)) (n,)
+    def zero_terms(self, X):
+        key = array_fingerprint(X)
+        for key_c, zero_c, l_c, top, exp_zero in self.zero_cache:
+            if key_c == key and l_c == self.l and np.array_equal(zero_c, self.zero_pt):
+                return top, exp_zero
+
+        if len(X.shape) == 1:
+            X = X[:,np.newaxis]
+
+        diff = X - self.zero_pt[np.newaxis,:]
+        top = np.sum(diff*diff, axis=1)
+        exp_zero = np.exp(-top / (2 * self.l*self.l))
+
+        self.zero_cache.insert(0, (key, np.copy(self.zero_pt), self.l, top, exp_zero))
+        if len(self.zero_cache) > self.zero_cache_size:
+            self.zero_cache.pop()
+
+        return top, exp_zero
+
     ## get covariance matrix
     # calculate the covariance matrix between the samples given in X
     # overiding the kernel_func get covariance matrix in order to vectorize
@@ -65,63 +102,88 @@ class RBF_kern_zeroed(RBF_kern):
     def cov(self, X, Y):
         self.lazy_zero_pt_init(X[0])
 
-       
         cov = super().cov(X, Y)
 
-        #print(cov)
+        return cov - self.zero_cov(X, Y)
+
+    ## cov_sqdist
+    # the covariance matrices for a batch of parameter settings at once, given the
+    # precomputed squared distances between the samples. The zeroed kernel also
+    # depends on the distance of each sample to the zero point, so the samples are needed.
+    # @param sqdist - the squared distances between samples (n1, n2)
+    # @param theta - the parameter settings (S, 2) ordered as (sigma, l)
+    # @param same - whether sqdist is between a set of samples and itself (adds noise)
+    # @param X - [opt default None] the samples of the rows (n1,k)
+    # @param Y - [opt default None] the samples of the columns (n2,k)
+    #
+    # @return the covariance matrices (S, n1, n2) or None if X or Y are not given
+    def cov_sqdist(self, sqdist, theta, same=False, X=None, Y=None):
+        if X is None or Y is None:
+            return None
+        self.lazy_zero_pt_init(X[0])
 
-        cov_zero = self.zero_cov(X, Y)
+        cov = super().cov_sqdist(sqdist, theta, same)
 
-        #print(cov - cov_zero)
-        
-        #pdb.set_trace()
+        sigma = theta[:,0,np.newaxis,np.newaxis]
+        l = theta[:,1,np.newaxis,np.newaxis]
+        top_x, _ = self.zero_terms(X)
+        top_y, _ = self.zero_terms(Y)
 
-        return cov - cov_zero
+        # zero correction sigma^2 e_x e_y^T for each setting
+        top_xy = top_x[:,np.newaxis] + top_y[np.newaxis,:]
+        return cov - sigma * sigma * np.exp(-top_xy[np.newaxis] / (2 * l * l))
 
-    def zero_cov(self, X, Y):
-        N = X.shape[0]
-        M = Y.shape[0]
+    ## get the diagonal of the covariance matrix
+    # calculates only the diagonal of cov(X, X), the variance of each sample.
+    # @param X - samples (n,k) array where n is the number of samples,
+    #        and k is the dimension of the samples
+    #
+    # @return the variance of each sample (n,)
+    def cov_diag(self, X):
+        self.lazy_zero_pt_init(X[0])
 
-        cov_x = super().cov(X, self.zero_pt[np.newaxis,:])
-        cov_y = super().cov(self.zero_pt[np.newaxis,:], Y)
+        _, exp_x = self.zero_terms(X)
 
-        X_expanded = np.repeat(cov_x, M, axis=1)
-        Y_expanded = np.repeat(cov_y, N, axis=0)
+        return super().cov_diag(X) - self.sigma * self.sigma * exp_x * exp_x
 
-        
+    ## zero_cov
+    # the rank one correction cov(X, zero_pt) cov(zero_pt, Y) / sigma^2
+    # @param X - samples (n1,k) numpy array
+    # @param Y - samples (n2,k) numpy array
+    #
+    # @return the (n1, n2) correction matrix
+    def zero_cov(self, X, Y):
+        _, exp_x = self.zero_terms(X)
+        _, exp_y = self.zero_terms(Y)
 
-        return X_expanded * Y_expanded / (self.sigma * self.sigma)
+        return np.outer(self.sigma * self.sigma * exp_x, exp_y)
 
 
-    # get gradient of the covariance matrix
-    # calculate the covariance matrix between the samples given in X
+    ## get the covariance matrix and the gradient of the covariance matrix
     # @param X - samples (n1,k) array where n is the number of samples,
     #        and k is the dimension of the samples
     # @param Y - samples (n2, k)
     #
-    # @return the covariance gradient tensor of the samples. [n1, n2, k]
-    def cov_gradient(self, X, Y):
+    # @return cov, grad
+    #       cov - the covariance matrix of the samples [n1, n2]
+    #       grad - the covariance gradient tensor of the samples. [2, n1, n2]
+    #               ordered as (sigma, l)
+    def cov_and_grad(self, X, Y):
         self.lazy_zero_pt_init(X[0])
 
-        dSigma, dl = super().cov_gradient(X,Y)
-
-        N = X.shape[0]
-        M = Y.shape[0]
+        cov, grad = super().cov_and_grad(X, Y)
 
-        cov_x = super().cov(X, self.zero_pt[np.newaxis,:])
-        cov_y = super().cov(self.zero_pt[np.newaxis,:], Y)
+        top_x, exp_x = self.zero_terms(X)
+        top_y, exp_y = self.zero_terms(Y)
 
-        X_expanded = np.repeat(cov_x, M, axis=1)
-        Y_expanded = np.repeat(cov_y, N, axis=0)
+        # zero correction sigma^2 e_x e_y^T and its gradient
+        exp_xy = np.outer(exp_x, exp_y)
+        cov_zero = self.sigma * self.sigma * exp_xy
 
-        x_sig, x_l = super().cov_gradient(X, self.zero_pt[np.newaxis,:])
-        y_sig, y_l = super().cov_gradient(self.zero_pt[np.newaxis,:], Y)
+        grad[0] -= 2 * self.sigma * exp_xy
+        grad[1] -= cov_zero * (top_x[:,np.newaxis] + top_y[np.newaxis,:]) / (self.l*self.l*self.l)
 
-        # f(x)g'(x) + f'(x)g(x)
-        zero_sigma = x_sig * Y_expanded + X_expanded * y_sig
-        zero_l =     x_l * Y_expanded + X_expanded * y_l
-
-        return dSigma-zero_sigma, dl-zero_l
+        return cov - cov_zero, grad
 
 
     def gradient(self, u, v):
@@ -129,11 +191,12 @@ class RBF_kern_zeroed(RBF_kern):
 
         grad = super().gradient(u, v)
 
-        grad_zero_u = super().gradient(u, self.zero_pt)
-        grad_zero_v = super().gradient(v, self.zero_pt)
+        top_u = np.sum((u - self.zero_pt) * (u - self.zero_pt))
+        top_v = np.sum((v - self.zero_pt) * (v - self.zero_pt))
+        exp_uv = np.exp(-top_u / (2 * self.l*self.l)) * np.exp(-top_v / (2 * self.l*self.l))
 
-        # f(x)g'(x) + f'(x)g(x)
-        grad_zero = super()(u, self.zero_pt) * grad_zero_v +  grad_zero_u * super()(v, self.zero_pt)
+        grad_zero = np.array([2 * self.sigma * exp_uv,
+                    self.sigma * self.sigma * exp_uv * (top_u + top_v) / (self.l*self.l*self.l)])
 
         return grad - grad_zero
 
@@ -141,6 +204,9 @@ class RBF_kern_zeroed(RBF_kern):
         self.lazy_zero_pt_init(u)
         
         cov = super().__call__(u,v)
-        cov_0 = super().__call__(u, self.zero_pt)*super().__call__(v, self.zero_pt)
+
+        top_u = np.sum((u - self.zero_pt) * (u - self.zero_pt))
+        top_v = np.sum((v - self.zero_pt) * (v - self.zero_pt))
+        cov_0 = self.sigma * self.sigma * np.exp(-top_u / (2 * self.l*self.l)) * np.exp(-top_v / (2 * self.l*self.l))
 
         return cov - cov_0
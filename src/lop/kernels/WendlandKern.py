@@ -0,0 +1,224 @@
+# Copyright 2026 Ian Rankin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE
+# FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+# WendlandKern.py
+# Written Ian Rankin - October 2026
+#
+# The compactly supported Wendland kernel functions for GPs.
+# The covariance is exactly zero for points further apart than the support
+# radius, so the Gram matrix is returned as a scipy.sparse matrix.
+# Piecewise polynomial, positive definite radial functions of minimal degree (1995)
+# Holger Wendland
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.spatial import cKDTree
+
+from lop.kernels import KernelFunc
+from lop.utilities import log_pdf_gamma, d_log_pdf_gamma
+
+
+## WendlandKern
+# A compactly supported kernel for gaussian processes
+# k(u,v) = sigma^2 phi_{d,k}(|u-v| / l), where phi_{d,k} is the Wendland function
+# of smoothness k (C^2k) that is positive definite in d dimensions.
+# Only pairs of points within the support radius l are evaluated, found using a KD-tree.
+class WendlandKern(KernelFunc):
+
+    ## Constructor
+    # @param sigma - the sigma for the wendland kernel
+    # @param l - the support radius of the kernel (covariance is 0 further than l)
+    # @param k - [opt default 1] the smoothness of the kernel [0, 1, 2] (C^0, C^2, C^4)
+    # @param sigma_noise - [opt default 0.01] sets the amount of noise on sigma
+    # @param sparse - [opt default True] return the covariance matrix as a scipy.sparse
+    #                   matrix. Set to False to use with models needing dense matrices.
+    def __init__(self, sigma, l, k=1, sigma_noise=0.01, sparse=True):
+        super(WendlandKern, self).__init__()
+        self.stationary = True
+
+        if k not in (0, 1, 2):
+            raise ValueError('WendlandKern only supports k of 0, 1, or 2 not ' + str(k))
+
+        self.sigma = sigma
+        self.l = l
+        self.k = k
+        self.sigma_noise = sigma_noise
+        self.sparse = sparse
+
+        # prior on hyper-parameters
+        self.sigma_k = 10
+        self.sigma_theta = 0.1
+        self.l_k = 3.0
+        self.l_theta = 0.8
+
+    # update the parameters
+    # @param theta - vector of parameters to update
+    def set_param(self, theta):
+        self.sigma = theta[0]
+        self.l = theta[1]
+
+    # get_param
+    # get a vector of the parameters for the kernel function (used for hyper-parameter optimization)
+    def get_param(self):
+        theta = np.array([self.sigma, self.l])
+        return theta
+
+    ## param_likli
+    # log liklihood of the parameter (prior)
+    def param_likli(self):
+        return log_pdf_gamma(self.sigma, self.sigma_k, self.sigma_theta) + \
+                log_pdf_gamma(self.l, self.l_k, self.l_theta)
+
+    ## grad_param_likli
+    # gradient of the log liklihood of the parameter (prior)
+    # @return numpy array of gradient of each parameter
+    def grad_param_likli(self):
+        return np.array([d_log_pdf_gamma(self.sigma, self.sigma_k, self.sigma_theta),
+                d_log_pdf_gamma(self.l, self.l_k, self.l_theta)])
+
+    ## Performs random sampling using the same liklihood function used by the param
+    # liklihood function
+    # @return numpy array of independent samples.
+    def randomize_hyper(self):
+        return np.array([
+            np.random.gamma(self.sigma_k, self.sigma_theta),
+            np.random.gamma(self.l_k, self.l_theta)])
+
+    ## phi
+    # the Wendland function and its derivative for scaled distances r = |u-v| / l
+    # @param r - the scaled distances (numpy array)
+    # @param dim - the dimension of the samples
+    #
+    # @return phi(r), dphi/dr(r)
+    def phi(self, r, dim):
+        j = dim // 2 + self.k + 1
+        one_r = np.maximum(1 - r, 0)
+
+        if self.k == 0:
+            phi = one_r**j
+            d_phi = -j * one_r**(j-1)
+        elif self.k == 1:
+            phi = one_r**(j+1) * ((j+1)*r + 1)
+            d_phi = -(j+1)*(j+2) * r * one_r**j
+        else:
+            a = j*j + 4*j + 3
+            b = 3*j + 6
+            poly = a*r*r + b*r + 3
+            phi = one_r**(j+2) * poly / 3
+            d_phi = one_r**(j+1) * (-(j+2)*poly + one_r*(2*a*r + b)) / 3
+
+        return phi, d_phi
+
+    ## neighbors
+    # finds all pairs of points within the support radius using KD-trees
+    # @param X - samples (n1,k) numpy array
+    # @param Y - samples (n2,k) numpy array
+    #
+    # @return i, j, r - the row, column and scaled distance of each pair
+    def neighbors(self, X, Y):
+        tree_x = cKDTree(X)
+        tree_y = cKDTree(Y)
+        pairs = tree_x.sparse_distance_matrix(tree_y, self.l, output_type='ndarray')
+
+        return pairs['i'], pairs['j'], pairs['v'] / self.l
+
+    ## get covariance matrix
+    # calculate the covariance matrix between the samples given in X
+    # Only evaluated for pairs of points within the support radius.
+    # @param X - samples (n1,k) numpy array where n is the number of samples,
+    #        and k is the dimension of the samples
+    # @param Y - samples (n2, k) numpy array
+    #
+    # @return the covariance matrix of the samples (scipy.sparse.csr_matrix if sparse)
+    def cov(self, X, Y):
+        if len(X.shape) == 1:
+            X = X[:,np.newaxis]
+        if len(Y.shape) == 1:
+            Y = Y[:,np.newaxis]
+
+        i, j, r = self.neighbors(X, Y)
+        phi, _ = self.phi(r, X.shape[1])
+
+        cov = sp.csr_matrix((self.sigma * self.sigma * phi, (i, j)), shape=(X.shape[0], Y.shape[0]))
+        if cov.shape[0] == cov.shape[1] and (X[0] == Y[0]).all():
+            cov = cov + sp.identity(cov.shape[0], format='csr')*self.sigma_noise
+
+        if not self.sparse:
+            return cov.toarray()
+        return cov
+
+    ## get the diagonal of the covariance matrix
+    # calculates only the diagonal of cov(X, X), the variance of each sample.
+    # @param X - samples (n,k) array where n is the number of samples,
+    #        and k is the dimension of the samples
+    #
+    # @return the variance of each sample (n,)
+    def cov_diag(self, X):
+        return np.full(X.shape[0], self.sigma * self.sigma + self.sigma_noise)
+
+    ## get the covariance matrix and the gradient of the covariance matrix
+    # The gradient tensor is always returned as a dense array.
+    # @param X - samples (n1,k) array where n is the number of samples,
+    #        and k is the dimension of the samples
+    # @param Y - samples (n2, k)
+    #
+    # @return cov, grad
+    #       cov - the covariance matrix of the samples [n1, n2] (dense)
+    #       grad - the covariance gradient tensor of the samples. [2, n1, n2]
+    #               ordered as (sigma, l)
+    def cov_and_grad(self, X, Y):
+        if len(X.shape) == 1:
+            X = X[:,np.newaxis]
+        if len(Y.shape) == 1:
+            Y = Y[:,np.newaxis]
+
+        i, j, r = self.neighbors(X, Y)
+        phi, d_phi = self.phi(r, X.shape[1])
+
+        cov = np.zeros((X.shape[0], Y.shape[0]))
+        cov[i, j] = self.sigma * self.sigma * phi
+
+        grad = np.zeros((2,) + cov.shape)
+        grad[0, i, j] = 2 * self.sigma * phi
+        # dr/dl = -r / l
+        grad[1, i, j] = -self.sigma * self.sigma * d_phi * r / self.l
+
+        if cov.shape[0] == cov.shape[1] and (X[0] == Y[0]).all():
+            cov += np.eye(cov.shape[0])*self.sigma_noise
+        return cov, grad
+
+    def gradient(self, u, v):
+        u = np.reshape(u, (1,-1))
+        v = np.reshape(v, (1,-1))
+
+        r = np.sqrt(np.sum((u-v)*(u-v))) / self.l
+        phi, d_phi = self.phi(r, u.shape[1])
+
+        return np.array([2 * self.sigma * phi, -self.sigma * self.sigma * d_phi * r / self.l])
+
+    def __call__(self, u, v):
+        u = np.reshape(u, (1,-1))
+        v = np.reshape(v, (1,-1))
+
+        r = np.sqrt(np.sum((u-v)*(u-v))) / self.l
+        phi, _ = self.phi(r, u.shape[1])
+
+        return self.sigma * self.sigma * phi
+
+    def __len__(self):
+        return 2
@@ -5,3 +5,5 @@ from .RBF_kern import RBF_kern
 from .RBF_kern_zeroed import RBF_kern_zeroed
 from .PeriodicKern import PeriodicKern
 from .LinearKern import LinearKern
+from .RBF_kern_rff import RBF_kern_rff
+from .WendlandKern import WendlandKern
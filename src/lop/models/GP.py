@@ -23,7 +23,7 @@
 # Useful for testing out various active learning algorithms and ensuring code is working.
 
 import numpy as np
-from scipy.linalg import cho_solve
+from scipy.linalg import cho_solve, solve_triangular
 import sys
 if sys.version_info[0] >= 3 and sys.version_info[1] >= 3:
     from collections.abc import Sequence
@@ -31,6 +31,7 @@ else:
     from collections import Sequence
 
 from lop.models import Model
+from lop.utilities import StructuredGrid
 
 class GP(Model):
 
@@ -76,13 +77,21 @@ class GP(Model):
             self.X_train = np.append(self.X_train, X, axis=0)
             self.y_train = np.append(self.y_train, y, axis=0)
             self.training_sigma = np.append(self.training_sigma, training_sigma, axis=0)
+        self.increment_version()
 
 
+    ## param_state
+    # the parameters of the covariance function (see Model.param_state)
+    # @return numpy array of the parameters
+    def param_state(self):
+        return self.cov_func.get_param()
+
     ## clear_training
     # clears all training data from the GP
     def reset(self):
         self.X_train = None
         self.y_train = None
+        self.increment_version()
 
 
     ## Predicts the output of the GP at new locations
@@ -91,15 +100,14 @@ class GP(Model):
     # @return an array of output values (n)
     def predict(self, X):
         if self.X_train is None:
-            self.cov = self.cov_func.cov(X,X)
-            sigma = np.diagonal(self.cov)
+            sigma = self.cov_func.cov_diag(X)
+            self.set_lazy_cov(self.prior_cov_func(X))
             # just in case do to numerical instability a negative variance shows up
             sigma = np.maximum(0, sigma)
             return np.zeros(len(X)), sigma
 
         #### This function treats Y as the training data
         Y = self.X_train
-        covXX = self.cov_func.cov(X,X) # covMatrix(X, X, self.cov_func)
         covXY = self.cov_func.cov(X,Y) #covMatrix(X, Y, self.cov_func)
         covYX = np.transpose(covXY)
 
@@ -115,9 +123,51 @@ class GP(Model):
         muX_Y = np.matmul(covXY, cho_solve((L, True), self.y_train))
         # stored as an instance variable in case it is needed for some reason
         #self.cov = covXX -  np.matmul(np.matmul(covXY, covYYinv), covYX)
-        self.cov = covXX - (covXY @ v)
+        # only the diagonal is needed for the variance, the full covariance
+        # is computed if self.cov is used.
+        prior_cov = self.prior_cov_func(X)
+        self.set_lazy_cov(lambda: prior_cov() - (covXY @ v))
+
+        sigmaX_Y = self.cov_func.cov_diag(X) - np.sum(covXY * v.T, axis=1)
+        # just in case do to numerical instability a negative variance shows up
+        sigmaX_Y = np.maximum(0, sigmaX_Y)
+
+        return muX_Y + self.mean_func(X), sigmaX_Y
+
+    ## predict_grid
+    # Predicts the output of the GP over a regular grid using structured kernel
+    # interpolation (KISS-GP). The cross covariance to the training samples is
+    # interpolated from the grid, so the posterior mean and variance over the grid
+    # cost O(M log M) FFTs (per training sample) rather than O(M^3).
+    # Requires a stationary covariance function.
+    # @param axes - list of evenly spaced 1D arrays, the grid is their cartesian product
+    #               ordered as np.meshgrid(*axes, indexing='ij') flattened.
+    #
+    # @return an array of output values (M), the variance of each output (M)
+    def predict_grid(self, axes):
+        grid = StructuredGrid(self.cov_func, axes)
+        X = grid.points[:,0] if grid.points.shape[1] == 1 else grid.points
+
+        if self.X_train is None:
+            return self.predict(X)
+
+        Y = self.X_train
+        error = np.zeros((len(Y), len(Y)))
+        np.fill_diagonal(error, self.training_sigma)
+        covYY = self.cov_func.cov(Y, Y) + error
+
+        L = np.linalg.cholesky(covYY)
+        alpha = cho_solve((L, True), self.y_train)
+        # covYY^-1 = L^-T L^-1
+        L_inv_T = solve_triangular(L, np.identity(len(Y)), lower=True).T
+
+        muX_Y = grid.cross_cov_matmul(Y, alpha)
+        V = grid.cross_cov_matmul(Y, L_inv_T)
+
+        prior_cov = self.prior_cov_func(X)
+        self.set_lazy_cov(lambda: prior_cov() - (V @ V.T))
 
-        sigmaX_Y = np.diagonal(self.cov)
+        sigmaX_Y = self.cov_func.cov_diag(X) - np.sum(V * V, axis=1)
         # just in case do to numerical instability a negative variance shows up
         sigmaX_Y = np.maximum(0, sigmaX_Y)
 
@@ -0,0 +1,266 @@
+# Copyright 2026 Ian Rankin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE
+# FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+# HyperparameterGrid.py
+# Written Ian Rankin - October 2026
+#
+# Evaluates the hyperparameter objective of a PreferenceGP over a grid (or batch)
+# of hyperparameter settings, for sensitivity sweeps and visualization.
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.linalg import cho_solve
+import copy
+from concurrent.futures import ProcessPoolExecutor
+
+
+## _hyperparameter_obj_batch
+# evaluates the hyperparameter objective of the model for a batch of settings.
+# (module level so it can be run by worker processes)
+# @param model - the PreferenceGP
+# @param thetas - the hyperparameter settings (S, P)
+# @param args - the arguments of hyperparameter_obj after the hyperparameters
+# @param kern_thetas - [opt default None] kernel parameters (S, K) set for each setting
+#                   when they are not part of the hyperparameters of the model.
+#
+# @return the objective of each setting (S,)
+def _hyperparameter_obj_batch(model, thetas, args, kern_thetas=None):
+    obj = np.empty(len(thetas))
+    for i, theta in enumerate(thetas):
+        if kern_thetas is not None:
+            model.cov_func.set_param(kern_thetas[i])
+        obj[i] = model.hyperparameter_obj(theta, *args)
+    return obj
+
+
+## HyperparameterGrid
+# Evaluates PreferenceGP.hyperparameter_obj (negative Laplace approximated log
+# liklihood of the validation data minus the hyperparameter prior) for many
+# hyperparameter settings.
+# The squared distances between the samples are computed once and the kernel
+# matrices for a whole batch of settings are built from them (KernelFunc.cov_sqdist),
+# with the linear algebra batched over the settings. Kernels without cov_sqdist are
+# evaluated setting by setting, optionally split over worker processes.
+class HyperparameterGrid:
+
+    ## constructor
+    # @param model - the (optimized) PreferenceGP
+    # @param X_train - [opt default model.X_train] the training samples
+    # @param y_train - [opt default model.y_train] the training labels
+    # @param X_valid - [opt default X_train] the validation samples
+    # @param y_valid - [opt default y_train] the validation labels
+    # @param F - [opt default model.F] the mode of the model at X_train
+    # @param max_batch_size - [opt default 4e6] the max number of elements of the
+    #                   stacked kernel matrices evaluated at once
+    def __init__(self, model, X_train=None, y_train=None, X_valid=None, y_valid=None, F=None,
+                    max_batch_size=4e6):
+        self.model = model
+        if not model.optimized:
+            model.optimize()
+
+        self.X_train = model.X_train if X_train is None else X_train
+        self.y_train = model.y_train if y_train is None else y_train
+        self.X_valid = self.X_train if X_valid is None else X_valid
+        self.y_valid = self.y_train if y_valid is None else y_valid
+        self.F = model.F if F is None else F
+        self.max_batch_size = max_batch_size
+
+        X_t = self.X_train[:,np.newaxis] if len(self.X_train.shape) == 1 else self.X_train
+        X_v = self.X_valid[:,np.newaxis] if len(self.X_valid.shape) == 1 else self.X_valid
+        self.X_t = X_t
+        self.X_v = X_v
+
+        ##### squared distances computed once for every setting
+        self.sqdist_vt = self.sqdist(X_v, X_t)
+        if X_v is X_t or (X_v.shape == X_t.shape and (X_v == X_t).all()):
+            self.sqdist_vv = self.sqdist_vt
+        else:
+            self.sqdist_vv = self.sqdist(X_v, X_v)
+        # the kernels add noise to the validation to training covariance the same way
+        # as they do in cov (square and the same first sample).
+        self.same_vt = X_v.shape[0] == X_t.shape[0] and (X_v[0] == X_t[0]).all()
+
+        # the predicted mean at the validation samples is K_vt @ alpha for every setting,
+        # where alpha uses the covariance the model was fit with (as in predict).
+        K = model.K.toarray() if sp.issparse(model.K) else model.K
+        self.alpha = cho_solve((np.linalg.cholesky(K), True), self.F)
+
+    ## sqdist
+    # the squared distances between each of the samples
+    # @param X - samples (n1,k) numpy array
+    # @param Y - samples (n2,k) numpy array
+    #
+    # @return squared distances (n1, n2)
+    def sqdist(self, X, Y):
+        diff = X[:,np.newaxis,:] - Y[np.newaxis,:,:]
+        return np.sum(diff*diff, axis=2)
+
+    ## kernel_params
+    # the kernel parameters of each hyperparameter setting
+    # @param thetas - the hyperparameter settings (S, P) ordered as model.get_hyper()
+    # @param kern_thetas - [opt default None] the kernel parameters of each setting
+    #                   (S, len(cov_func.get_param())), only when the model optimizes
+    #                   only the probits (so they are not part of thetas).
+    #
+    # @return the kernel parameters (S, len(cov_func.get_param()))
+    def kernel_params(self, thetas, kern_thetas=None):
+        if kern_thetas is not None:
+            if not self.model.hyperparam_only_probit:
+                raise ValueError('HyperparameterGrid given kernel parameters that are already ' + \
+                                    'part of the hyperparameters of the model')
+            kern_thetas = np.atleast_2d(np.asarray(kern_thetas, dtype=float))
+            if kern_thetas.shape != (thetas.shape[0], len(self.model.cov_func.get_param())):
+                raise ValueError('HyperparameterGrid given kernel parameters of shape ' + \
+                                    str(kern_thetas.shape) + ' for ' + str(thetas.shape[0]) + ' settings')
+            return kern_thetas
+
+        if self.model.hyperparam_only_probit:
+            return np.tile(self.model.cov_func.get_param(), (thetas.shape[0], 1))
+
+        num_probit_p = thetas.shape[1] - len(self.model.cov_func.get_param())
+        return thetas[:,num_probit_p:]
+
+    ## evaluate
+    # evaluates the hyperparameter objective for each of the given settings.
+    # The hyperparameters of the model are restored afterwards.
+    # @param thetas - the hyperparameter settings (S, P) ordered as model.get_hyper()
+    # @param workers - [opt default 1] the number of processes to use for kernels
+    #                   that can not be batched using the squared distances.
+    # @param kern_thetas - [opt default None] the kernel parameters of each setting (S, K)
+    #                   for models that optimize only the probits (hyperparam_only_probit)
+    #                   defaults to the current parameters of the covariance function.
+    #
+    # @return the objective of each setting (S,), the same as model.hyperparameter_obj
+    #           (with cov_func.set_param(kern_thetas[i]) for each setting if given)
+    def evaluate(self, thetas, workers=1, kern_thetas=None):
+        thetas = np.atleast_2d(np.asarray(thetas, dtype=float))
+        kern_theta = self.kernel_params(thetas, kern_thetas)
+
+        cov_func = self.model.cov_func
+        if cov_func.cov_sqdist(self.sqdist_vv[:1,:1], kern_theta[:1], False,
+                                self.X_v[:1], self.X_v[:1]) is None:
+            return self.evaluate_each(thetas, workers, None if kern_thetas is None else kern_theta)
+
+        x_orig = self.model.get_hyper()
+        n_v = self.sqdist_vv.shape[0]
+        batch = max(1, int(self.max_batch_size // (n_v * max(n_v, self.sqdist_vt.shape[1]))))
+
+        obj = np.empty(thetas.shape[0])
+        try:
+            for start in range(0, thetas.shape[0], batch):
+                stop = min(thetas.shape[0], start + batch)
+
+                K_vt = cov_func.cov_sqdist(self.sqdist_vt, kern_theta[start:stop], self.same_vt,
+                                            self.X_v, self.X_t)
+                K_vv = cov_func.cov_sqdist(self.sqdist_vv, kern_theta[start:stop], True,
+                                            self.X_v, self.X_v)
+                F_valid = K_vt @ self.alpha
+
+                # the probits are evaluated for each setting
+                W = np.empty(K_vv.shape)
+                log_py_f = np.empty(stop - start)
+                prior = np.empty(stop - start)
+                for i, theta in enumerate(thetas[start:stop]):
+                    self.model.set_hyper(theta)
+                    W[i], _, log_py_f[i] = self.model.derivatives(self.y_valid, F_valid[i])
+                    prior[i] = self.model.hyper_liklihood()
+
+                # equation (25) of likli_f_hyper batched over the settings
+                term1 = 0.5 * np.sum(F_valid * np.linalg.solve(K_vv, F_valid[:,:,np.newaxis])[:,:,0], axis=1)
+                term2 = 0.5 * np.linalg.slogdet(np.eye(n_v) + K_vv @ W)[1]
+
+                obj[start:stop] = -(log_py_f - term1 - term2) - prior
+        finally:
+            self.model.set_hyper(x_orig)
+        return obj
+
+    ## evaluate_each
+    # evaluates the hyperparameter objective by calling model.hyperparameter_obj for
+    # each setting, on a deep copy of the model (the covariance function and probits
+    # are not shared, so the model is left untouched) split over worker processes.
+    # @param thetas - the hyperparameter settings (S, P) ordered as model.get_hyper()
+    # @param workers - [opt default 1] the number of processes to use.
+    # @param kern_thetas - [opt default None] the kernel parameters of each setting (S, K)
+    #                   for models that optimize only the probits.
+    #
+    # @return the objective of each setting (S,)
+    def evaluate_each(self, thetas, workers=1, kern_thetas=None):
+        # the active learner is not needed, so it is not copied
+        model = copy.deepcopy(self.model, {id(self.model.active_learner): None})
+        model.F = self.F
+        model.set_lazy_cov(None)
+        args = (self.X_train, self.y_train, self.X_valid, self.y_valid, None)
+
+        if workers <= 1:
+            return _hyperparameter_obj_batch(model, thetas, args, kern_thetas)
+
+        num_splits = min(len(thetas), workers * 4)
+        splits = np.array_split(thetas, num_splits)
+        kern_splits = [None]*num_splits if kern_thetas is None else \
+                        np.array_split(kern_thetas, num_splits)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(_hyperparameter_obj_batch,
+                                    [model]*num_splits, splits, [args]*num_splits, kern_splits)
+            return np.concatenate(list(results))
+
+    ## evaluate_grid
+    # evaluates the hyperparameter objective over the cartesian product of the
+    # given values of each hyperparameter.
+    # @param axes - list with an entry for each hyperparameter (ordered as model.get_hyper())
+    #               either a 1D array of values, a scalar, or None to keep the current value.
+    # @param workers - [opt default 1] the number of processes to use for kernels
+    #                   that can not be batched using the squared distances.
+    # @param kern_axes - [opt default None] for models that optimize only the probits
+    #               (hyperparam_only_probit), a list with an entry for each kernel parameter
+    #               (ordered as cov_func.get_param()) in the same form as axes.
+    #
+    # @return the objective over the grid, with a dimension for each 1D array in axes
+    #           followed by each 1D array in kern_axes.
+    def evaluate_grid(self, axes, workers=1, kern_axes=None):
+        x0 = self.model.get_hyper()
+        if len(axes) != len(x0):
+            raise ValueError('HyperparameterGrid evaluate_grid given ' + str(len(axes)) + \
+                                ' axes for ' + str(len(x0)) + ' hyperparameters')
+
+        all_axes = list(axes)
+        all_x0 = list(x0)
+        if kern_axes is not None:
+            kern_x0 = self.model.cov_func.get_param()
+            if len(kern_axes) != len(kern_x0):
+                raise ValueError('HyperparameterGrid evaluate_grid given ' + str(len(kern_axes)) + \
+                                    ' kernel axes for ' + str(len(kern_x0)) + ' kernel parameters')
+            all_axes += list(kern_axes)
+            all_x0 += list(kern_x0)
+
+        values = []
+        shape = []
+        for i, ax in enumerate(all_axes):
+            if ax is None:
+                values.append(np.array([all_x0[i]]))
+            else:
+                values.append(np.atleast_1d(ax))
+                if np.ndim(ax) > 0:
+                    shape.append(len(ax))
+
+        thetas = np.stack([g.ravel() for g in np.meshgrid(*values, indexing='ij')], axis=1)
+        kern_thetas = None
+        if kern_axes is not None:
+            kern_thetas = thetas[:,len(x0):]
+            thetas = thetas[:,:len(x0)]
+
+        return np.reshape(self.evaluate(thetas, workers, kern_thetas), shape)
@@ -24,6 +24,10 @@
 # Designed to handle active learning for each model type
 
 import numpy as np
+import scipy.sparse as sp
+import copy
+
+from lop.utilities import PosteriorSampleCache, array_fingerprint
 
 class Model():
 
@@ -34,6 +38,76 @@ class Model():
         if self.active_learner is not None:
             self.active_learner.set_model(self)
 
+        self._cov = None
+        self._lazy_cov = None
+        self.cov_factor = None
+
+        # posterior samples shared by the active learners, valid for one version of the model
+        self.version = 0
+        self.sample_cache = PosteriorSampleCache()
+
+    ## increment_version
+    # marks that the model has changed (training data or hyperparameters), so
+    # cached posterior samples of the previous model are not reused.
+    def increment_version(self):
+        self.version += 1
+
+    ## param_state
+    # all the parameters the predictions of the model depend on (kernel and probits).
+    # @return numpy array of the parameters
+    def param_state(self):
+        return np.empty(0)
+
+    ## sample_version
+    # the version cached posterior samples are valid for. Includes a fingerprint of
+    # param_state, so parameters set directly on the covariance function or probits
+    # (without set_hyper) also invalidate the cached samples.
+    #
+    # @return (version, fingerprint of the parameters)
+    def sample_version(self):
+        return (self.version, array_fingerprint(np.asarray(self.param_state(), dtype=float)))
+
+    ## cov
+    # the covariance of the last predicted points.
+    # Models can store how to compute the covariance with set_lazy_cov, so the
+    # full (n,n) matrix is only computed if it is actually used.
+    @property
+    def cov(self):
+        if self._cov is None and self._lazy_cov is not None:
+            self._cov = self._lazy_cov()
+            self._lazy_cov = None
+            if sp.issparse(self._cov):
+                self._cov = self._cov.toarray()
+        return self._cov
+
+    @cov.setter
+    def cov(self, cov):
+        self._cov = cov
+        self._lazy_cov = None
+        self.cov_factor = None
+
+    ## set_lazy_cov
+    # sets the covariance of the last prediction to be computed when first accessed
+    # @param lazy_cov - function with no arguments that returns the covariance matrix
+    # @param cov_factor - [opt] a low rank factor of the covariance (n, D) where
+    #                   cov = cov_factor @ cov_factor.T
+    def set_lazy_cov(self, lazy_cov, cov_factor=None):
+        self._cov = None
+        self._lazy_cov = lazy_cov
+        self.cov_factor = cov_factor
+
+    ## prior_cov_func
+    # a function computing the prior covariance cov_func.cov(X, X) when called.
+    # Uses copies of the covariance function and X at the time of the prediction,
+    # so a lazy covariance doesn't change if the hyperparameters change afterwards.
+    # @param X - the input test samples (n,k).
+    #
+    # @return function with no arguments that returns cov_func.cov(X, X)
+    def prior_cov_func(self, X):
+        cov_func = copy.deepcopy(self.cov_func)
+        X = np.array(X)
+        return lambda: cov_func.cov(X, X)
+
 
     def reset(self):
         raise(NotImplementedError("Model reset is not implemented"))
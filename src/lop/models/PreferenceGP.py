@@ -29,6 +29,8 @@
 
 import numpy as np
 import scipy.optimize as opt
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
 from scipy.linalg import cho_solve
 import sys
 if sys.version_info[0] >= 3 and sys.version_info[1] >= 3:
@@ -36,8 +38,8 @@ if sys.version_info[0] >= 3 and sys.version_info[1] >= 3:
 else:
     from collections import Sequence
 
-from lop.models import PreferenceModel
-from lop.utilities import k_fold_x_y, get_y_with_idx
+from lop.models import PreferenceModel, HyperparameterGrid
+from lop.utilities import k_fold_x_y, get_y_with_idx, SparseCholesky, pcg_solve, StructuredGrid
 
 import math
 from types import SimpleNamespace
@@ -67,10 +69,12 @@ class PreferenceGP(PreferenceModel):
     # @param use_hyper_optimization - [opt] sets whether optimizatiion should attempt to
     #                   do hyperparameter optimization
     # @param active_learner - defines if there is an active learner for this model
+    # @param merge_duplicate_pairs - [opt] merges repeated pairs into weighted pairs when added
     def __init__(self, cov_func, normalize_gp=False, pareto_pairs=False, \
                 normalize_positive=False, other_probits={}, mat_inv=np.linalg.pinv, \
-                use_hyper_optimization=False, active_learner=None, hyperparam_only_probit=True):
-        super(PreferenceGP, self).__init__(pareto_pairs, other_probits, active_learner)
+                use_hyper_optimization=False, active_learner=None, hyperparam_only_probit=True, \
+                merge_duplicate_pairs=False):
+        super(PreferenceGP, self).__init__(pareto_pairs, other_probits, active_learner, merge_duplicate_pairs)
 
         self.cov_func = cov_func
         self.invert_function = mat_inv
@@ -86,6 +90,12 @@ class PreferenceGP(PreferenceModel):
 
         self.delta_f = 0.0002 # set the convergence to stop
         self.maxloops = 100
+        self.debug_print = False
+
+        # factors of a sparse K, and of I + B K B^T, cached from find_mode for predict_sparse
+        self.K_factor = None
+        self.W_terms = None
+        self.S_factor = None
         
 
 
@@ -95,12 +105,15 @@ class PreferenceGP(PreferenceModel):
     #
     # @return an array of output values (n)
     def predict(self, X, X_train=None,F=None, W=None):
+        phi_test = self.cov_func.features(X)
+        if phi_test is not None:
+            return self.predict_features(X, phi_test, X_train, F, W)
+
         if self.X_train is None:
-            cov = self.cov_func.cov(X,X)
-            sigma = np.diagonal(cov)
+            sigma = self.cov_func.cov_diag(X)
             # just in case do to numerical instability a negative variance shows up
             sigma = np.maximum(0, sigma)
-            self.cov = cov
+            self.set_lazy_cov(self.prior_cov_func(X))
             return np.zeros(len(X)), sigma
 
         # lazy optimization of GP
@@ -115,10 +128,11 @@ class PreferenceGP(PreferenceModel):
         if W is None:
             W = self.W
         K = self.K
-        
+
+        if sp.issparse(K):
+            return self.predict_sparse(X_test, X_train, F, W)
 
         covXX_test = self.cov_func.cov(X_test, X_train)
-        covTestTest = self.cov_func.cov(X_test, X_test)
 
         covX_testX = np.transpose(covXX_test)
 
@@ -142,9 +156,161 @@ class PreferenceGP(PreferenceModel):
         tmp2 = np.matmul(covXX_test, tmp)
         tmp3 = np.matmul(W, covX_testX)
 
-        self.cov = covTestTest - np.matmul(tmp2, tmp3)
-        sigma = np.diagonal(self.cov)
+        # only the diagonal is needed for the variance, the full covariance
+        # is computed if self.cov is used.
+        sigma = self.cov_func.cov_diag(X_test) - np.sum(tmp2 * tmp3.T, axis=1)
+        sigma = np.maximum(0, sigma)
+        prior_cov = self.prior_cov_func(X_test)
+        self.set_lazy_cov(lambda: prior_cov() - np.matmul(tmp2, tmp3))
+
+        return mu, sigma
+
+    ## predict_grid
+    # Predicts the output of the GP over a regular grid using structured kernel
+    # interpolation (KISS-GP). The cross covariance to the training samples is
+    # interpolated from the grid, so the posterior mean and variance over the grid
+    # cost O(M log M) FFTs (per training sample) rather than O(M^3).
+    # Useful for visualizing the GP over dense 1D/2D grids.
+    # Requires a stationary covariance function.
+    # @param axes - list of evenly spaced 1D arrays, the grid is their cartesian product
+    #               ordered as np.meshgrid(*axes, indexing='ij') flattened.
+    #
+    # @return an array of output values (M), the variance of each output (M)
+    def predict_grid(self, axes):
+        grid = StructuredGrid(self.cov_func, axes)
+        X_test = grid.points[:,0] if grid.points.shape[1] == 1 else grid.points
+
+        if self.X_train is None:
+            return self.predict(X_test)
+
+        # lazy optimization of GP
+        if not self.optimized:
+            self.optimize(optimize_hyperparameter=self.use_hyper_optimization)
+
+        K = self.K.toarray() if sp.issparse(self.K) else self.K
+        W = self.W.toarray() if sp.issparse(self.W) else self.W
+
+        L = np.linalg.cholesky(K)
+        alpha = cho_solve((L, True), self.F)
+
+        # the posterior covariance is cov - K_*X (I + W K)^-1 W K_X*
+        # where (I + W K)^-1 W = (K + W^-1)^-1 = R R^T is symmetric positive semi-definite
+        C = self.invert_function(np.identity(len(K)) + W @ K) @ W
+        e, U = np.linalg.eigh(0.5 * (C + C.T))
+        keep = e > 1e-12 * max(e[-1], 1e-300)
+        R = U[:,keep] * np.sqrt(e[keep])
+
+        mu = grid.cross_cov_matmul(self.X_train, alpha)
+        V = grid.cross_cov_matmul(self.X_train, R)
+
+        sigma = self.cov_func.cov_diag(X_test) - np.sum(V * V, axis=1)
+        sigma = np.maximum(0, sigma)
+        prior_cov = self.prior_cov_func(X_test)
+        self.set_lazy_cov(lambda: prior_cov() - V @ V.T)
+
+        return mu, sigma
+
+    ## predict_sparse
+    # Predicts the output of the GP at new locations when the covariance function
+    # returns sparse matrices (compactly supported kernels).
+    # Uses the sparse cholesky of K cached by find_mode. W = V^T diag(c) V is kept as
+    # its rank one terms, with B = diag(sqrt(c)) V the posterior covariance is
+    # cov - K_*X B^T (I + B K B^T)^-1 B K_X*, where I + B K B^T is symmetric positive
+    # definite and factored with a sparse cholesky. No dense (n_train, n_train)
+    # matrices are formed.
+    # @param X_test - the input test samples (n,k).
+    # @param X_train - the training samples
+    # @param F - the estimated values of the training samples
+    # @param W - the hessian of the log likelihood of the training samples
+    #
+    # @return an array of output values (n), the variance of each output (n)
+    def predict_sparse(self, X_test, X_train, F, W):
+        K = sp.csc_matrix(self.K)
+        if self.K_factor is None:
+            self.K_factor = SparseCholesky(K)
+
+        covXX_test = sp.csr_matrix(self.cov_func.cov(X_test, X_train))
+        covX_testX = covXX_test.T.toarray()
+
+        ####### calculate the mu of the value
+        alpha = self.K_factor.solve(F)
+        mu = covXX_test @ alpha
+
+        ######### calculate the variance
+        if W is self.W and self.W_terms is not None and np.all(self.W_terms[1] >= 0):
+            if self.S_factor is None:
+                V, c = self.W_terms
+                keep = c > 0
+                self.B = sp.csr_matrix(sp.diags(np.sqrt(c[keep])) @ V[keep])
+                S = sp.identity(self.B.shape[0], format='csc') + self.B @ K @ self.B.T
+                self.S_factor = SparseCholesky(S) if self.B.shape[0] > 0 else None
+
+            Bk = self.B @ covX_testX
+            Z = Bk if self.S_factor is None else self.S_factor.solve(Bk)
+
+            sigma = self.cov_func.cov_diag(X_test) - np.sum(Bk * Z, axis=0)
+            sigma = np.maximum(0, sigma)
+            prior_cov = self.prior_cov_func(X_test)
+            self.set_lazy_cov(lambda: prior_cov() - Bk.T @ Z)
+            return mu, sigma
+
+        # W is not log-concave (negative terms) or was given, so I + W K is not symmetric
+        # tmp2.T = (I + W K)^-T covX_testX
+        W = sp.csc_matrix(W)
+        B = sp.identity(K.shape[0], format='csc') + W @ K
+        tmp2_T = spla.splu(sp.csc_matrix(B.T)).solve(covX_testX)
+        tmp3 = W @ covX_testX
+
+        sigma = self.cov_func.cov_diag(X_test) - np.sum(tmp2_T * tmp3, axis=0)
         sigma = np.maximum(0, sigma)
+        prior_cov = self.prior_cov_func(X_test)
+        self.set_lazy_cov(lambda: prior_cov() - tmp2_T.T @ tmp3)
+
+        return mu, sigma
+
+    ## predict_features
+    # Predicts the output of the GP at new locations using the feature map of the
+    # covariance function (cov(X,Y) = phi(X) @ phi(Y).T). The posterior covariance is
+    # phi(X) A phi(X).T with a (D,D) matrix A, so the mean, variance and the covariance
+    # factor cost time linear in the number of test points.
+    # Only the factor of the covariance is stored (self.cov_factor (n, D)).
+    # @param X - the input test samples (n,k).
+    # @param phi_test - the features of the test samples (n, D)
+    #
+    # @return an array of output values (n), the variance of each output (n)
+    def predict_features(self, X, phi_test, X_train=None, F=None, W=None):
+        D = phi_test.shape[1]
+        if self.X_train is None:
+            self.set_lazy_cov(lambda: phi_test @ phi_test.T, phi_test)
+            return np.zeros(len(X)), np.sum(phi_test * phi_test, axis=1)
+
+        # lazy optimization of GP
+        if not self.optimized:
+            self.optimize(optimize_hyperparameter=self.use_hyper_optimization)
+
+        if X_train is None:
+            X_train = self.X_train
+        if F is None:
+            F = self.F
+        if W is None:
+            W = self.W
+        K = self.K
+
+        phi_train = self.cov_func.features(X_train)
+
+        L = np.linalg.cholesky(K)
+        alpha = cho_solve((L, True), F)
+        mu = phi_test @ (phi_train.T @ alpha)
+
+        # A = I - phi_train.T (I + W K)^-1 W phi_train
+        tmp = self.invert_function(np.identity(len(K)) + np.matmul(W, K))
+        A = np.identity(D) - phi_train.T @ (tmp @ (W @ phi_train))
+        lam, V = np.linalg.eigh(0.5 * (A + A.T))
+        L_A = V * np.sqrt(np.maximum(lam, 0))
+
+        cov_factor = phi_test @ L_A
+        self.set_lazy_cov(lambda: cov_factor @ cov_factor.T, cov_factor)
+        sigma = np.sum(cov_factor * cov_factor, axis=1)
 
         return mu, sigma
 
@@ -194,18 +360,43 @@ class PreferenceGP(PreferenceModel):
         grad_ll = np.zeros(len(F))
         log_likelihood = 0
 
-        for j, probit in enumerate(self.probits):
-            if y[j] is not None:
-                W_local, dpy_df_local, py_local = probit.derivatives(y[j], F)
-                try:
-                    W += W_local
-                except:
-                    pdb.set_trace()
-                grad_ll += dpy_df_local
-                log_likelihood += py_local
+        for probit, y_j in zip(self.probits, y):
+            if y_j is not None:
+                log_likelihood += probit.add_derivatives(y_j, F, W, grad_ll)
 
         return W, grad_ll, log_likelihood
 
+    ## sparse_derivatives
+    # Calculates the derivatives of the log likelihood for a sparse covariance matrix.
+    # W is built as a scipy sparse matrix from the sparse rank one terms of each
+    # probit (W = V^T diag(c) V), so the dense (N,N) W is never allocated.
+    # @param y - the list of labels for each probit
+    # @param F - the input data samples
+    #
+    # @return - W, dpy_df, py, (V, c)
+    #       W - the sparse second order derivative of the probits with respect to F
+    #       dpy_df - the derivative of log P(y|x,theta) with respect to F
+    #       py - log P(y|x,theta) for the given probit
+    #       (V, c) - the stacked rank one terms of W
+    def sparse_derivatives(self, y, F):
+        grad_ll = np.zeros(len(F))
+        log_likelihood = 0
+        Vs = [sp.csr_matrix((0, len(F)))]
+        cs = [np.zeros(0)]
+
+        for probit, y_j in zip(self.probits, y):
+            if y_j is not None:
+                V, c, dpy_df, py = probit.hessian_terms(y_j, F)
+                Vs.append(V)
+                cs.append(c)
+                grad_ll += dpy_df
+                log_likelihood += py
+
+        V = sp.vstack(Vs, format='csr')
+        c = np.concatenate(cs)
+        W = sp.csc_matrix(V.T @ sp.diags(c) @ V)
+
+        return W, grad_ll, log_likelihood, (V, c)
 
     
 
@@ -219,6 +410,10 @@ class PreferenceGP(PreferenceModel):
         X_train = x_train
 
         self.K = self.cov_func.cov(X_train, X_train)
+        is_sparse = sp.issparse(self.K)
+        self.K_factor = None
+        self.W_terms = None
+        self.S_factor = None
 
         F = np.random.random(len(X_train))
         
@@ -227,9 +422,14 @@ class PreferenceGP(PreferenceModel):
         f_err = self.delta_f + 1
 
         try:
-            L = np.linalg.cholesky(self.K)
-            L_inv = np.linalg.inv(L)
-            K_inv = L_inv.T @ L_inv
+            if is_sparse:
+                self.K = sp.csc_matrix(self.K)
+                L = SparseCholesky(self.K)
+                self.K_factor = L
+            else:
+                L = np.linalg.cholesky(self.K)
+                L_inv = np.linalg.inv(L)
+                K_inv = L_inv.T @ L_inv
         except:
             print('inverting covariance matrix failed... Just returning F as random values and trying again')
             np.save('failed_covaraince.npy', {'X_train': X_train, 'y_train': y_train, 'k_params': self.cov_func.get_param()})
@@ -237,22 +437,32 @@ class PreferenceGP(PreferenceModel):
 
         # checking for convergence by optimization amount
         while f_err > self.delta_f:
-            self.W, self.grad_ll, self.log_likelihood = \
+            if is_sparse:
+                self.W, self.grad_ll, self.log_likelihood, self.W_terms = \
+                                            self.sparse_derivatives(y_train, F)
+            else:
+                self.W, self.grad_ll, self.log_likelihood = \
                                             self.derivatives(y_train, F)
-          
-            gradient = self.grad_ll - cho_solve((L,True), F)
 
-            # Hessian:
-            hess = -self.W - K_inv
-
-            F_new = self.newton_update( F, # estimated training values
-                                        gradient, # Gradient input to newton's method
-                                        hess, # The hessian matrix input
+            if is_sparse:
+                F_new = self.sparse_newton_update(F, self.grad_ll, self.W,
                                         self.likli_f,
                                         (x_train, y_train, self.K, L),
-                                        self.invert_function,
-                                        lambda_type="binary", # sets the type of line search or static to perform
                                         line_search_max_itr=3)
+            else:
+                gradient = self.grad_ll - cho_solve((L,True), F)
+
+                # Hessian:
+                hess = -self.W - K_inv
+
+                F_new = self.newton_update( F, # estimated training values
+                                            gradient, # Gradient input to newton's method
+                                            hess, # The hessian matrix input
+                                            self.likli_f,
+                                            (x_train, y_train, self.K, L),
+                                            self.invert_function,
+                                            lambda_type="binary", # sets the type of line search or static to perform
+                                            line_search_max_itr=3)
 
             # normalize F
             if self.normalize_gp:
@@ -284,9 +494,40 @@ class PreferenceGP(PreferenceModel):
 
         self.F = F
         # calculate W with final F
-        self.W, self.grad_ll, self.log_likelihood = \
+        if is_sparse:
+            self.W, self.grad_ll, self.log_likelihood, self.W_terms = \
+                                        self.sparse_derivatives(y_train, self.F)
+        else:
+            self.W, self.grad_ll, self.log_likelihood = \
                                         self.derivatives(y_train, self.F)
 
+    ## sparse_newton_update
+    # The damped newton update for a sparse covariance matrix K.
+    # The newton step (K^-1 + W)^-1 g is solved with conjugate gradients preconditioned
+    # by K, using the sparse cholesky of K to apply K^-1. K^-1 is never formed and there
+    # is no fill-in from the (non-local) preference pairs in W.
+    # @param F - the current estimate of the training values
+    # @param grad_ll - the gradient of the log likelihood with respect to F
+    # @param W - the negative hessian of the log likelihood with respect to F
+    # @param loss_func - the loss function for the line search
+    # @param loss_args - the arguments of the loss function (x, y, K, L)
+    #                   K must be sparse, and L the SparseCholesky of K
+    # @param line_search_max_itr - [opt (3)] line_search_max_itr
+    #
+    # @return F_new after the update function
+    def sparse_newton_update(self, F, grad_ll, W, loss_func, loss_args, line_search_max_itr=3):
+        K = loss_args[2]
+        L = loss_args[3]
+
+        W = sp.csr_matrix(W)
+        gradient = grad_ll - L.solve(F)
+
+        descent = -pcg_solve(lambda x: L.solve(x) + W @ x, gradient, M_mul=lambda r: K @ r)
+
+        lamb = self.binary_line_search(F, descent, loss_func, loss_args, max_itr=line_search_max_itr)
+
+        return F - lamb * descent
+
     def optimize(self, optimize_hyperparameter=False):
         if optimize_hyperparameter and self.X_train is not None:
             k_fold = min(math.floor(len(self.X_train) / 2), 4)
@@ -447,6 +688,12 @@ class PreferenceGP(PreferenceModel):
 
 
 
+    ## param_state
+    # all the parameters of the probits and the covariance function (see Model.param_state)
+    # @return numpy array of the parameters
+    def param_state(self):
+        return np.append(super().param_state(), self.cov_func.get_param())
+
     ## get_hyper
     # get the hyperparameters for the given model.
     # Particularly intended for hyperparameter optimization.
@@ -520,8 +767,7 @@ class PreferenceGP(PreferenceModel):
     # of the function at the same time.
     #
     def grad_likli_f_hyper(self, F, x, y):
-        K = self.cov_func.cov(x, x)
-        dK_param = self.cov_func.cov_gradient(x,x)
+        K, dK_param = self.cov_func.cov_and_grad(x, x)
 
         W, grad_ll, log_py_f = self.derivatives(y, F)
 
@@ -530,18 +776,17 @@ class PreferenceGP(PreferenceModel):
 
         B = np.eye(K.shape[0]) + (K @ W)
         B_inv = self.invert_function(B)
+        B_inv_K = B_inv @ K
 
-        # Calculate derivative of W matrix with respect to the F vecotr (3d np array)
-        dW_f = None
-        for i, probit in enumerate(self.probits):
-            if y[i] is not None:
-                dW_f_local = probit.calc_W_dF(y[i], F)
-                if dW_f is None:
-                    dW_f = dW_f_local
-                else:
-                    dW_f += dW_f_local
+        # trace(B_inv K dW/df_k) for each k, contracted directly from the sparse
+        # derivative of W with respect to the F vector (never forms the (N,N,N) array)
+        # Equation 209
+        trace_dW_f = np.zeros(len(F))
+        for probit, y_i in zip(self.probits, y):
+            if y_i is not None:
+                trace_dW_f += probit.calc_W_dF_sparse(y_i, F).contract(B_inv_K)
+        termB_1 = 0.5 * trace_dW_f
 
-        
 
         # Covariance function deriviatives
         dL_cov_f = np.zeros(len(dK_param))
@@ -553,25 +798,19 @@ class PreferenceGP(PreferenceModel):
 
             # Equation (205)
             termB_2 = B_inv @ dK_param[i] @ grad_ll
-            # Equation 209
-            termB_1 = 0.5 * np.trace(B_inv @ K @ dW_f, axis1=1, axis2=2)
 
             dL_cov_f[i] = termA_1 - termA_2 + np.sum(termB_2 - termB_1)
 
 
         # Liklihood function parameters
         probit_grads = []
-        for i, probit in enumerate(self.probits):
-            if y[i] is not None and probit.optimize_parameters:
-                grad_theta = probit.grad_hyper(y[i], F)
-                dW_hyper = probit.calc_W_dHyper(y[i], F)
-
-                # if i == 2:
-                #     print('grad_theta = ' + str(grad_theta) + ' dW_hyper = ' + str(dW_hyper))
-                #     pdb.set_trace()
+        for probit, y_i in zip(self.probits, y):
+            if y_i is not None and probit.optimize_parameters:
+                grad_theta = probit.grad_hyper(y_i, F)
+                dW_hyper = probit.calc_W_dHyper_sparse(y_i, F)
 
                 # equation (22)
-                term2 = 0.5 * np.trace(B_inv @ K @ dW_hyper, axis1=1, axis2=2)
+                term2 = 0.5 * dW_hyper.contract(B_inv_K)
 
                 probit_grads.append(grad_theta-term2)
 
@@ -601,6 +840,8 @@ class PreferenceGP(PreferenceModel):
     # @return a scalar value as the log liklihood of the model
     def likli_f_hyper(self, F, x, y):
         K = self.cov_func.cov(x, x)
+        if sp.issparse(K):
+            K = K.toarray()
 
          # calculate the log-likelyhood of the data given F
         #log_py_f = self.log_likelyhood_training(F, y)
@@ -636,11 +877,15 @@ class PreferenceGP(PreferenceModel):
         log_py_f = self.log_likelyhood_training(F, y)
         #L = np.linalg.cholesky(K)
 
-        term1 = 0.5*(np.transpose(F) @ cho_solve((L, True), F))
+        if isinstance(L, SparseCholesky):
+            term1 = 0.5*(np.transpose(F) @ L.solve(F))
+            term2 = 0.5*L.logdet()
+        else:
+            term1 = 0.5*(np.transpose(F) @ cho_solve((L, True), F))
 
-        # Determinant of lower tringular matrix is product of diagonals
-        log_det_K = np.sum(np.log(np.diagonal(L)))
-        term2 = log_det_K #np.log(det_K)
+            # Determinant of lower tringular matrix is product of diagonals
+            log_det_K = np.sum(np.log(np.diagonal(L)))
+            term2 = log_det_K #np.log(det_K)
 
         term3 = 0.5*len(F) * np.log(2 * np.pi)
 
@@ -679,19 +924,17 @@ class PreferenceGP(PreferenceModel):
 
         probit_sigmas = np.logspace(0.01, 1.0, 50)
 
-        liklihoods_pro = np.zeros((rbf_sigmas.shape[0], rbf_lengths.shape[0]))
-
         # perform exhastive search of kernel lengthscale + probit parameter
-        for i, pro_sigma in enumerate(probit_sigmas):
-            for j, rbf_length in enumerate(rbf_lengths):
-                self.cov_func.set_param(np.array([0.5, rbf_length]))
-                self.probits[0].set_sigma(pro_sigma)
-
-                #param = np.array([pro_sigma, 0.5, rbf_length])
-                param = np.array([pro_sigma, rbf_length])
-                likli = self.hyperparameter_obj(param, x_train, y_train, x, y)
-
-                liklihoods_pro[i,j] = likli
+        # (probit sigma, rbf sigma, rbf length) with the rbf sigma fixed at 0.5
+        grid = HyperparameterGrid(self, x_train, y_train, x, y, F)
+        axes = [None] * len(self.get_hyper())
+        axes[0] = probit_sigmas
+        if self.hyperparam_only_probit:
+            liklihoods_pro = grid.evaluate_grid(axes, kern_axes=[0.5, rbf_lengths])
+        else:
+            axes[-2] = 0.5
+            axes[-1] = rbf_lengths
+            liklihoods_pro = grid.evaluate_grid(axes)
 
 
         # plot the data
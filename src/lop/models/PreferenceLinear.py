@@ -33,9 +33,10 @@ class PreferenceLinear(PreferenceModel):
     # @param mat_int - [opt] allows specification of different matrix inversion functions
     #                   defaults to the numpy.linalg.pinv invert function
     # @param active_learner - defines if there is an active learner for this model
+    # @param merge_duplicate_pairs - [opt] merges repeated pairs into weighted pairs when added
     def __init__(self, pareto_pairs=False, other_probits={},
-                        mat_inv=np.linalg.pinv, active_learner=None):
-        super(PreferenceLinear, self).__init__(pareto_pairs, other_probits,active_learner)
+                        mat_inv=np.linalg.pinv, active_learner=None, merge_duplicate_pairs=False):
+        super(PreferenceLinear, self).__init__(pareto_pairs, other_probits,active_learner, merge_duplicate_pairs)
 
         self.mat_inv = mat_inv
         self.delta_f = 0.002
@@ -126,13 +127,9 @@ class PreferenceLinear(PreferenceModel):
         W = np.zeros((len(F), len(F)))
         grad_ll = np.zeros(len(F))
         log_likelihood = 0
-        for j, probit in enumerate(self.probits):
-            if self.y_train[j] is not None:
-                W_local, dpy_df_local, py_local = probit.derivatives(y[j], F)
-
-                W += W_local
-                grad_ll += dpy_df_local
-                log_likelihood += py_local
+        for probit, y_j in zip(self.probits, y):
+            if y_j is not None:
+                log_likelihood += probit.add_derivatives(y_j, F, W, grad_ll)
 
 
         # need to multiply by derivative of dl/df * df/dw
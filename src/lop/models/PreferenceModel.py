@@ -30,8 +30,8 @@ if sys.version_info[0] >= 3 and sys.version_info[1] >= 3:
 else:
     from collections import Sequence
 from lop.models import Model
-from lop.utilities import get_dk
-from lop.probits import PreferenceProbit, AbsBoundProbit, OrdinalProbit
+from lop.utilities import get_dk, pad_listwise, merge_pairs
+from lop.probits import PreferenceProbit, AbsBoundProbit, OrdinalProbit, ListwiseProbit
 
 import pdb
 
@@ -41,13 +41,16 @@ class PreferenceModel(Model):
     # @param pareto_pairs - [opt] sets whether adding point should include pareto pairs
     # @param other_probits - [opt] sets additional probit functions for the preference model
     # @param active_learner - [opt] set the active learner for the model.
-    def __init__(self, pareto_pairs=False, other_probits={}, active_learner=None):
+    # @param merge_duplicate_pairs - [opt] merges repeated pairs into weighted pairs
+    #                   (dk, u, v, count) when they are added.
+    def __init__(self, pareto_pairs=False, other_probits={}, active_learner=None, merge_duplicate_pairs=False):
         super(PreferenceModel, self).__init__(active_learner)
         self.optimized = False
 
         self.pareto_pairs = pareto_pairs
-        self.probits = [PreferenceProbit(sigma = 0.5), OrdinalProbit(), AbsBoundProbit()]
-        self.probit_idxs = {'relative_discrete': 0, 'ordinal': 1, 'abs': 2}
+        self.merge_duplicate_pairs = merge_duplicate_pairs
+        self.probits = [PreferenceProbit(sigma = 0.5), OrdinalProbit(), AbsBoundProbit(), ListwiseProbit()]
+        self.probit_idxs = {'relative_discrete': 0, 'ordinal': 1, 'abs': 2, 'listwise': 3}
 
         i = 1
         for key in other_probits:
@@ -167,6 +170,7 @@ class PreferenceModel(Model):
         self.y_train = [None for i in range(len(self.probit_idxs))]
         self.X_train = None
         self.prior_idx = None
+        self.increment_version()
 
     ## add_training
     # adds training data to the gaussian process
@@ -176,11 +180,15 @@ class PreferenceModel(Model):
     #                       dk = -1 if u > v, dk = 1 if v > u
     #                       uk = index of the input (for the input set of points)
     #                       vk = index of the second input
+    #                       pairs may also be weighted (dk, uk, vk, count)
     #                       @NOTE That this function updates the indicies if there
     #                       is already training data.
     #                       If inputing ordinal or abs data, it should be a vector of the same
     #                       length as the input data (one y for each x)
-    # @param type - type of input ['relative_discrete', 'ordinal', 'abs']
+    #                       If inputing listwise data, it should be a list of records
+    #                       [(n_stages, idx_0, ..., idx_k-1), ...] from listwise_choice
+    #                       or listwise_ranking (queries may have different lengths)
+    # @param type - type of input ['relative_discrete', 'ordinal', 'abs', 'listwise']
     # @param training_sigma - [opt] sets the uncertianty in the training data
     #                          accepts scalars or a vector if each sample has
     #                          a different uncertianty.
@@ -188,6 +196,10 @@ class PreferenceModel(Model):
         if not isinstance(training_sigma, Sequence):
             training_sigma = np.ones(len(y)) * training_sigma
 
+        # y_train may have been set without an entry for every probit
+        if len(self.y_train) < len(self.probits):
+            self.y_train = list(self.y_train) + [None] * (len(self.probits) - len(self.y_train))
+
         if self.X_train is None:
             self.X_train = X
             len_X = 0
@@ -198,15 +210,10 @@ class PreferenceModel(Model):
         if type == 'relative_discrete':
             if len_X > 0:
                 # reset index of pairwise comparisons
-                y = [(d, u+len_X, v+len_X) for d, u, v in y]
+                y = [(p[0], p[1]+len_X, p[2]+len_X) + tuple(p[3:]) for p in y]
 
-            if y == []:
-                pass
-            elif self.y_train[self.probit_idxs[type]] is None:
-                self.y_train[self.probit_idxs[type]] = np.array(y)
-            else:
-                self.y_train[self.probit_idxs[type]] = \
-                    np.append(self.y_train[self.probit_idxs[type]], np.array(y), axis=0)
+            if len(y) > 0:
+                self.add_pairs(np.array(y))
         elif type == 'ordinal':
             if not isinstance(y, np.ndarray):
                 y = np.array(y)
@@ -250,6 +257,14 @@ class PreferenceModel(Model):
                 idxs = np.append(self.y_train[self.probit_idxs[type]][1], idxs, axis=0)
 
             self.y_train[self.probit_idxs[type]] = (v, idxs)
+        elif type == 'listwise':
+            if len(y) > 0:
+                new_y = pad_listwise(y)
+                new_y[:,1:] = np.where(new_y[:,1:] >= 0, new_y[:,1:] + len_X, -1)
+
+                if self.y_train[self.probit_idxs[type]] is not None:
+                    new_y = pad_listwise(list(self.y_train[self.probit_idxs[type]]) + list(new_y))
+                self.y_train[self.probit_idxs[type]] = new_y
 
         if self.pareto_pairs and len(self.X_train) > 1:
             pairs = []
@@ -261,22 +276,33 @@ class PreferenceModel(Model):
                 cur_pairs = [(d_better, i+len_X, j) for j in range(len(dominate)) if dominate[j]]
                 pairs += cur_pairs
 
-            if self.y_train[self.probit_idxs['relative_discrete']] is None and len(pairs) > 0:
-                self.y_train[self.probit_idxs['relative_discrete']] = np.array(pairs)
-            else:
-                # only add pairs if there is any pareto pairs to add.
-                if len(pairs) > 0:
-                    self.y_train[self.probit_idxs['relative_discrete']] = \
-                        np.append(self.y_train[self.probit_idxs['relative_discrete']], \
-                                    np.array(pairs), axis=0)
-                else:
-                    pass
-                    #import pdb
-                    #pdb.set_trace()
+            # only add pairs if there is any pareto pairs to add.
+            if len(pairs) > 0:
+                self.add_pairs(np.array(pairs))
         # end if for pareto_pairs
 
 
         self.optimized = False
+        self.increment_version()
+
+    ## add_pairs
+    # appends pairs to the relative discrete training data. If merge_duplicate_pairs
+    # is set, repeated pairs are merged into a single weighted pair (dk, u, v, count).
+    # @param pairs - numpy array of pairs (n,3) or weighted pairs (n,4)
+    def add_pairs(self, pairs):
+        idx = self.probit_idxs['relative_discrete']
+        if self.y_train[idx] is not None:
+            old = self.y_train[idx]
+            # give unweighted pairs a count of 1 if mixing with weighted pairs
+            if old.shape[1] < pairs.shape[1]:
+                old = np.append(old, np.ones((len(old), 1), dtype=old.dtype), axis=1)
+            elif pairs.shape[1] < old.shape[1]:
+                pairs = np.append(pairs, np.ones((len(pairs), 1), dtype=pairs.dtype), axis=1)
+            pairs = np.append(old, pairs, axis=0)
+
+        if self.merge_duplicate_pairs:
+            pairs = merge_pairs(pairs)
+        self.y_train[idx] = pairs
 
 
     # calculate the log_likelyhood of the provided training data.
@@ -288,10 +314,10 @@ class PreferenceModel(Model):
             y = self.y_train
 
         log_p_w = 0.0
-        for j, probit in enumerate(self.probits):
-            if y[j] is not None:
+        for probit, y_j in zip(self.probits, y):
+            if y_j is not None:
                 try:
-                    p_w_local = probit.log_likelihood(y[j], F)
+                    p_w_local = probit.log_likelihood(y_j, F)
                 except:
                     import pdb
                     pdb.set_trace()
@@ -315,6 +341,12 @@ class PreferenceModel(Model):
         self.optimized = True
 
 
+    ## param_state
+    # all the parameters of the probits (see Model.param_state)
+    # @return numpy array of the parameters
+    def param_state(self):
+        return np.concatenate([np.ravel(probit.param_state()) for probit in self.probits])
+
     ## get_hyper
     # get the hyperparameters for the given model.
     # Particularly intended for hyperparameter optimization.
@@ -322,8 +354,8 @@ class PreferenceModel(Model):
     # @return a numpy array of all hyperparameters (N,)
     def get_hyper(self):
         probit_p = np.empty((0,))
-        for i, probit in enumerate(self.probits):
-            if self.y_train[i] is not None:
+        for probit, y_i in zip(self.probits, self.y_train):
+            if y_i is not None:
                 probit_p = np.append(probit_p, probit.get_hyper(),axis=0)
             
         return probit_p
@@ -336,13 +368,14 @@ class PreferenceModel(Model):
     def set_hyper(self, x):
         cur_idx = 0
 
-        for i, probit in enumerate(self.probits):
-            if self.y_train[i] is not None:
+        for probit, y_i in zip(self.probits, self.y_train):
+            if y_i is not None:
                 p = probit.get_hyper()
                 end_idx = cur_idx + len(p)
                 probit.set_hyper(x[cur_idx:end_idx])
 
                 cur_idx = end_idx
+        self.increment_version()
 
     ## grad_hyper
     # get the gradient of the hyperparameters
@@ -353,16 +386,16 @@ class PreferenceModel(Model):
 
     def hyper_liklihood(self):
         liklihood = 0
-        for i, probit in enumerate(self.probits):
-            if self.y_train[i] is not None:
+        for probit, y_i in zip(self.probits, self.y_train):
+            if y_i is not None:
                 liklihood += probit.param_likli()
             
         return liklihood
 
     def grad_hyper_liklihood(self):
         probit_grad = np.empty((0,))
-        for i, probit in enumerate(self.probits):
-            if self.y_train[i] is not None:
+        for probit, y_i in zip(self.probits, self.y_train):
+            if y_i is not None:
                 probit_grad = np.append(probit_grad, probit.grad_param_likli(),axis=0)
             
         return probit_grad
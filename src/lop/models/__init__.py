@@ -2,6 +2,7 @@
 
 from .Model import Model, SimplelestModel
 from .PreferenceModel import PreferenceModel
+from .HyperparameterGrid import HyperparameterGrid
 from .GP import GP
 from .PreferenceGP import PreferenceGP
 from .PreferenceLinear import PreferenceLinear
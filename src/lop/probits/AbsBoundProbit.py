@@ -31,8 +31,8 @@
 import numpy as np
 import scipy.stats as st
 
-from lop.probits import ProbitBase
-from lop.probits import std_norm_pdf, std_norm_cdf
+from lop.probits import ProbitBase, SparseDerivative
+from lop.probits import std_norm_pdf, std_norm_cdf, beta_logpdf
 from lop.utilities import d_log_pdf_gamma, log_pdf_gamma
 
 from scipy.special import digamma, polygamma
@@ -163,6 +163,11 @@ class AbsBoundProbit(ProbitBase):
         else:
             return super().get_hyper()
 
+    ## param_state
+    # Gets all the parameters of the probit (even if they are not optimized)
+    def param_state(self):
+        return np.array([self.sigma, self.v])
+
     ## Performs random sampling using the same liklihood function used by the param
     # liklihood function
     # @return numpy array of independent samples.
@@ -255,41 +260,37 @@ class AbsBoundProbit(ProbitBase):
         return aa, bb
 
 
-    ## derivatives
+    ## derivatives_diag
     # Calculates the derivatives of the probit with the given input data
+    # Each rating only depends on its own sample, so W is diagonal.
     # @param y - the given set of labels for the probit
     # @param F - the input data samples
     #
-    # @return - W, dpy_df, py
-    #       W - is the second order derivative of the probit with respect to F
-    #       dpy_df - the derivative of P(y|x,theta) with respect to F
-    #       py - P(y|x,theta) for the given probit
-    def derivatives(self, y, F):
+    # @return - idx, W_diag, dpy_df, py
+    #       idx - the sample index of each rating
+    #       W_diag - the diagonal of the second order derivative for each rating
+    #       dpy_df - the derivative of log P(y|x,theta) for each rating
+    #       py - log P(y|x,theta) for the given probit
+    def derivatives_diag(self, y, F):
         #y_sel = y[0][y[1]]
         y_sel = y[0]
         f = F[y[1]]
 
         aa, bb = self.get_alpha_beta(f)
 
-        # Trouble with derivatives...
-        dpy_df = self.v*self._isqrt2sig*std_norm_pdf(f*self._isqrt2sig) * (np.log(y_sel) - np.log(1-y_sel) - digamma(aa) + digamma(bb))
-
-        Wdiag = - self.v*self._isqrt2sig*std_norm_pdf(f*self._isqrt2sig) * (
-            f * self._i2var * (np.log(y_sel) - np.log(1.0-y_sel) - digamma(aa) + digamma(bb)) +
-            self.v * self._isqrt2sig * std_norm_pdf(f*self._isqrt2sig) * (polygamma(1, aa) + polygamma(1, bb)) )
-
+        # the derivative of the mean link scaled by v, and the residual in the
+        # digamma terms are shared by dpy_df and W so are only computed once.
+        v_dml = self.v*self._isqrt2sig*std_norm_pdf(f*self._isqrt2sig)
+        resid = np.log(y_sel) - np.log(1.0-y_sel) - digamma(aa) + digamma(bb)
 
-        #py = np.log(beta.pdf(y_sel, aa, bb))
-        py = beta.logpdf(y_sel, aa, bb)
+        dpy_df = v_dml * resid
 
-        # setup the indexing
-        full_W = np.zeros((F.shape[0], F.shape[0]))
-        full_W[y[1],y[1]] = Wdiag
+        Wdiag = - v_dml * (f * self._i2var * resid +
+                            v_dml * (polygamma(1, aa) + polygamma(1, bb)) )
 
-        full_dpy_df = np.zeros(F.shape[0])
-        full_dpy_df[y[1]] = dpy_df
+        py = beta_logpdf(y_sel, aa, bb)
 
-        return -full_W, full_dpy_df, np.sum(py)
+        return y[1], -Wdiag, dpy_df, np.sum(py)
 
 
     ## likelihood
@@ -306,25 +307,21 @@ class AbsBoundProbit(ProbitBase):
         f = F[y[1]]
         aa, bb = self.get_alpha_beta(f)
 
-        py = beta.logpdf(y_selected, aa, bb)
-        full_py = np.zeros(F.shape[0])
-        full_py[y[1]] = py
+        return np.sum(beta_logpdf(y_selected, aa, bb))
 
-        return np.sum(full_py)
 
 
-
-    ## calc_W_dF
+    ## calc_W_dF_sparse
     # Calculate the third derivative of the W matrix.
     # d ln(p(y|F)) / d f_i, f_j, f_k
-    # This returns a 3d matrix of (N x N x N) where N is the length of the F vector.
+    # The third derivative is only non-zero on the diagonal (i = j = k).
     # Equation (65)
     #
     # @param y - the label for the given probit
     # @param F - the vector of F (estimated training sample outputs)
     #
-    # @reutrn 3d matrix
-    def calc_W_dF(self, y, F):
+    # @return SparseDerivative of order 3 (dense shape (N,N,N))
+    def calc_W_dF_sparse(self, y, F):
         y_sel = y[0]
         f = F[y[1]]
 
@@ -353,24 +350,20 @@ class AbsBoundProbit(ProbitBase):
 
         Wdiag = term1_a*term1_b + term2_a*term2_b + term3_a*term3_b
 
-        dW = np.zeros((F.shape[0], F.shape[0], F.shape[0]))
-        dW[y[1],y[1],y[1]] = Wdiag
-
-        return dW
+        return SparseDerivative(Wdiag, y[1], None, len(F), 3)
 
-    ## calc_W_dHyper
+    ## calc_W_dHyper_sparse
     # Calculate the derivative of the W matrix with respect to hyper parameters.
-    # dW / dHyper
-    # This returns a 3d matrix of (N x N x N) where N is the length of the F vector.
+    # dW / dHyper, which is only non-zero on the diagonal.
     # Equation (70)
     #
     # @param y - the label for the given probit
     # @param F - the vector of F (estimated training sample outputs)
     #
-    # @reutrn 2d matrix
-    def calc_W_dHyper(self, y, F):
+    # @return SparseDerivative of order 2 (dense shape (num_hyper,N,N))
+    def calc_W_dHyper_sparse(self, y, F):
         if not self.optimize_parameters:
-            return super().calc_W_dHyper(y, F)
+            return super().calc_W_dHyper_sparse(y, F)
 
         y_sel = y[0]
         f = F[y[1]]
@@ -428,14 +421,11 @@ class AbsBoundProbit(ProbitBase):
         #     pdb.set_trace()
 
         if self.optimize_v_only:
-            dW_dHyper = np.zeros((1, len(F), len(F)))
-            dW_dHyper[0, y[1], y[1]] = dW_dv
+            dW_dHyper = np.array([dW_dv])
         else:
-            dW_dHyper = np.zeros((2, len(F), len(F)))
-            dW_dHyper[1, y[1], y[1]] = dW_dv
-            dW_dHyper[0, y[1], y[1]] = dW_dSigma
+            dW_dHyper = np.array([dW_dSigma, dW_dv])
 
-        return -dW_dHyper
+        return SparseDerivative(-dW_dHyper, y[1], None, len(F), 2)
 
 
     ## grad_hyper
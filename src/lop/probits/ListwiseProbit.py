@@ -0,0 +1,393 @@
+# Copyright 2026 Ian Rankin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE
+# FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+# ListwiseProbit.py
+# Written Ian Rankin - October 2026
+#
+# A listwise likelihood for choosing the best of k options or ranking k options.
+# Each query is stored as a single record instead of being expanded into pairs.
+# The likelihood is the Plackett-Luce model over the latent values,
+# a sequence of softmax choices from the remaining options.
+# Individual choice behavior: a theoretical analysis (1959) R. Duncan Luce
+# The analysis of permutations (1975) R. L. Plackett
+
+import numpy as np
+import scipy.sparse as sp
+from lop.probits import ProbitBase
+
+
+## ListwiseDerivative
+# The derivatives of the W matrix of the listwise probit (dW/dF or dW/dSigma).
+# W is block diagonal over the options of each choice stage, so the derivative is
+# contracted one stage at a time without forming the dense (N,N,N) array.
+# Has the same interface as SparseDerivative.
+class ListwiseDerivative:
+
+    ## constructor
+    # @param idx - (S, k) the option indicies of each stage (0 where masked)
+    # @param p - (S, k) the choice probability of each option (0 where masked)
+    # @param g - (S, k) the latent value of each option minus the expected value of
+    #               the stage (only used for the sigma derivative)
+    # @param sigma - the sigma of the probit
+    # @param N - the number of samples (length of F)
+    # @param order - the order of the tensor (2 for dW/dSigma, 3 for dW/dF)
+    def __init__(self, idx, p, g, sigma, N, order):
+        self.idx = idx
+        self.p = p
+        self.g = g
+        self.sigma = sigma
+        self.N = N
+        self.order = order
+
+    ## contract
+    # contracts the last two dimensions of the tensor with M, trace(M @ T[..., :, :])
+    # @param M - numpy array (N, N)
+    #
+    # @return numpy array (1,) for order 2 tensors, (N,) for order 3 tensors
+    def contract(self, M):
+        p = self.p
+        M_s = M[self.idx[:,:,np.newaxis], self.idx[:,np.newaxis,:]]
+        M_diag = np.diagonal(M_s, axis1=1, axis2=2)
+        Mp = np.einsum('sij,sj->si', M_s, p)
+        pMp = np.sum(p * Mp, axis=1)
+
+        if self.order == 3:
+            # sum_ij M_ij dW_ij / dF_k for each option k of each stage
+            Mtp = np.einsum('sji,sj->si', M_s, p)
+            val = p * (M_diag - np.sum(M_diag*p, axis=1)[:,np.newaxis] - Mp - Mtp + 2*pMp[:,np.newaxis])
+            val /= self.sigma**3
+            return np.bincount(self.idx.ravel(), val.ravel(), minlength=self.N)
+
+        # dW/dSigma = -2 W / sigma + (diag(dp) - dp p^T - p dp^T) / sigma^2
+        dp = -p * self.g / (self.sigma * self.sigma)
+        M_W = np.sum(M_diag * p, axis=1) - pMp
+        M_dW = np.sum(M_diag * dp, axis=1) - np.sum(dp * Mp, axis=1) - \
+                np.einsum('si,sij,sj->s', p, M_s, dp)
+
+        return np.array([np.sum(-2 * M_W / self.sigma + M_dW) / (self.sigma * self.sigma)])
+
+    ## to_dense
+    # @return the dense tensor (1, N, N) for order 2, (N, N, N) for order 3
+    def to_dense(self):
+        p = self.p
+        S, k = p.shape
+        eye = np.eye(k)
+        W_s = (p[:,:,np.newaxis] * eye - p[:,:,np.newaxis] * p[:,np.newaxis,:]) / self.sigma**2
+
+        if self.order == 2:
+            dp = -p * self.g / (self.sigma * self.sigma)
+            dW_s = -2 * W_s / self.sigma + (dp[:,:,np.newaxis] * eye - \
+                    dp[:,:,np.newaxis] * p[:,np.newaxis,:] - \
+                    p[:,:,np.newaxis] * dp[:,np.newaxis,:]) / self.sigma**2
+            T = np.zeros((1, self.N, self.N))
+            np.add.at(T[0], (self.idx[:,:,np.newaxis], self.idx[:,np.newaxis,:]), dW_s)
+            return T
+
+        # d p_i / dF_k = p_i (delta_ik - p_k) / sigma
+        dp = p[:,:,np.newaxis] * (eye - p[:,np.newaxis,:])
+        dW_s = np.einsum('ij,sik->sijk', eye, dp) - \
+                dp[:,:,np.newaxis,:] * p[:,np.newaxis,:,np.newaxis] - \
+                p[:,:,np.newaxis,np.newaxis] * dp[:,np.newaxis,:,:]
+        dW_s /= self.sigma**3
+
+        # stored as [k, i, j] for the derivative with respect to F_k
+        T = np.zeros((self.N, self.N, self.N))
+        np.add.at(T, (self.idx[:,np.newaxis,np.newaxis,:], self.idx[:,:,np.newaxis,np.newaxis],
+                        self.idx[:,np.newaxis,:,np.newaxis]), dW_s)
+        return T
+
+
+## ListwiseProbit
+# A listwise probit for choose 1 of k and ranking queries.
+# Each record is (n_stages, idx_0, idx_1, ..., idx_k-1) with the options ordered
+# from best to worst and padded with -1 to the width of the largest query.
+# Each stage t chooses idx_t from the remaining options idx_t, ..., idx_k-1 with
+# probability softmax(F / sigma), so n_stages = 1 is a choice of the best option and
+# n_stages = k-1 is a full ranking.
+class ListwiseProbit(ProbitBase):
+    type = 'listwise'
+    y_type = 'discrete'
+
+    ## constructor
+    # @param sigma - [opt default 0.5] the noise (temperature) on the latent values
+    # @param optimize_parameters - [opt default True] whether to optimize sigma
+    def __init__(self, sigma=0.5, optimize_parameters=True):
+        self.set_sigma(sigma)
+
+        # parameters for prior on the hyperparameters
+        self.sigma_k = 2.0
+        self.sigma_theta = 0.1
+
+        self.optimize_parameters = optimize_parameters
+
+    ## set_hyper
+    # Sets the hyperparameters for the probit
+    # @param hyper - a sequence with [sigma]
+    def set_hyper(self, hyper):
+        if self.optimize_parameters:
+            self.set_sigma(hyper[0])
+
+    ## get_hyper
+    # Gets a numpy array of hyperparameters for the probit
+    def get_hyper(self):
+        if self.optimize_parameters:
+            return np.array([self.sigma])
+        else:
+            return np.array([])
+
+    ## param_state
+    # Gets all the parameters of the probit (even if they are not optimized)
+    def param_state(self):
+        return np.array([self.sigma])
+
+    ## Performs random sampling using the same liklihood function used by the param
+    # liklihood function
+    # @return numpy array of independent samples.
+    def randomize_hyper(self):
+        if self.optimize_parameters:
+            return np.array([
+                np.random.gamma(self.sigma_k, self.sigma_theta)])
+        else:
+            return np.array([])
+
+    ## set_sigma
+    # Sets the sigma value
+    # @param sigma - the sigma to use
+    def set_sigma(self, sigma):
+        self.sigma = sigma
+
+    ## print_hyperparameters
+    # prints the hyperparameter of the probit
+    def print_hyperparameters(self):
+        print("Probit listwise, softmax on latent. Sigma: {0:0.2f}".format(self.sigma))
+
+    ## param_likli
+    # log liklihood of the parameter (prior)
+    def param_likli(self):
+        if self.optimize_parameters:
+            if self.sigma <= 0:
+                return -5000
+            return 0
+        else:
+            return 0
+
+    ## grad_param_likli
+    # gradient of the log liklihood of the parameter (prior)
+    # @return numpy array of gradient of each parameter
+    def grad_param_likli(self):
+        if self.optimize_parameters:
+            return np.array([0.0])
+        else:
+            return np.array([])
+
+    ## stages
+    # Expands each record into its choice stages. The chosen option of each stage
+    # is in the first column.
+    # @param y - (Q, 1+k) the listwise records
+    #
+    # @return idx, mask, query
+    #       idx - (S, k) the option indicies of each stage (0 where masked)
+    #       mask - (S, k) true for the options of each stage
+    #       query - (S,) the record each stage belongs to
+    def stages(self, y):
+        y = np.asarray(y)
+        n_stages = y[:,0]
+        options = y[:,1:]
+        k = options.shape[1]
+
+        query = np.repeat(np.arange(len(y)), n_stages)
+        t = np.arange(len(query)) - np.repeat(np.cumsum(n_stages) - n_stages, n_stages)
+        cols = t[:,np.newaxis] + np.arange(k)[np.newaxis,:]
+
+        idx = np.where(cols < k, options[query[:,np.newaxis], np.minimum(cols, k-1)], -1)
+        mask = idx >= 0
+
+        return np.where(mask, idx, 0), mask, query
+
+    ## stage_probabilities
+    # Calculates the softmax choice probabilities of each stage
+    # @param idx - (S, k) the option indicies of each stage
+    # @param mask - (S, k) true for the options of each stage
+    # @param F - the input estimates in the latent space
+    #
+    # @return p, log_p0
+    #       p - (S, k) the probability of choosing each option (0 where masked)
+    #       log_p0 - (S,) log probability of the chosen option
+    def stage_probabilities(self, idx, mask, F):
+        z = np.where(mask, F[idx] / self.sigma, -np.inf)
+        z = z - np.max(z, axis=1)[:,np.newaxis]
+        e = np.exp(z)
+        sum_e = np.sum(e, axis=1)
+
+        return e / sum_e[:,np.newaxis], z[:,0] - np.log(sum_e)
+
+    ## derivatives
+    # Calculates the derivatives of the probit with the given input data
+    # @param y - the given set of listwise records
+    # @param F - the input data samples
+    #
+    # @return - W, dpy_df, py
+    #       W - is the second order derivative of the probit with respect to F
+    #       dpy_df - the derivative of log P(y|x,theta) with respect to F
+    #       py - log P(y|x,theta) for the given probit
+    def derivatives(self, y, F):
+        dpy_df = np.zeros(len(F))
+        W = np.zeros((len(F), len(F)))
+        py = self.add_derivatives(y, F, W, dpy_df)
+
+        return W, dpy_df, py
+
+    ## add_derivatives
+    # Adds the derivatives of the probit into W and the gradient.
+    # Each stage adds (e_chosen - p) / sigma to the gradient and the block
+    # (diag(p) - p p^T) / sigma^2 over its options to W.
+    # @param y - the given set of listwise records
+    # @param F - the input data samples
+    # @param W - [in/out] the second order derivative to add to (N,N)
+    # @param grad - [in/out] the derivative of log P(y|x,theta) to add to (N,)
+    #
+    # @return py - log P(y|x,theta) for the given probit
+    def add_derivatives(self, y, F, W, grad):
+        idx, mask, _ = self.stages(y)
+        p, log_p0 = self.stage_probabilities(idx, mask, F)
+
+        d1 = -p
+        d1[:,0] += 1
+        grad += np.bincount(idx[mask], d1[mask] / self.sigma, minlength=len(F))
+
+        W_s = p[:,:,np.newaxis] * np.eye(p.shape[1]) - p[:,:,np.newaxis] * p[:,np.newaxis,:]
+        mask2 = np.logical_and(mask[:,:,np.newaxis], mask[:,np.newaxis,:])
+        rows = np.broadcast_to(idx[:,:,np.newaxis], W_s.shape)[mask2]
+        cols = np.broadcast_to(idx[:,np.newaxis,:], W_s.shape)[mask2]
+        np.add.at(W, (rows, cols), W_s[mask2] / (self.sigma * self.sigma))
+
+        return np.sum(log_p0)
+
+    ## hessian_terms
+    # Calculates the derivatives of the probit with W as a sum of sparse rank one terms.
+    # The block of each stage is diag(p) - p p^T = sum_j p_j (e_j - p)(e_j - p)^T
+    # @param y - the given set of listwise records
+    # @param F - the input data samples
+    #
+    # @return - V, c, dpy_df, py
+    #       V - sparse matrix of the vector e_j - p of each option of each stage (m, N)
+    #       c - the coefficient of each term p_j / sigma^2 (m,)
+    #       dpy_df - the derivative of log P(y|x,theta) with respect to F (N,)
+    #       py - log P(y|x,theta) for the given probit
+    def hessian_terms(self, y, F):
+        idx, mask, _ = self.stages(y)
+        p, log_p0 = self.stage_probabilities(idx, mask, F)
+
+        d1 = -p
+        d1[:,0] += 1
+        dpy_df = np.bincount(idx[mask], d1[mask] / self.sigma, minlength=len(F))
+
+        # [stage, term j, option k] of e_j - p
+        S, k = p.shape
+        vals = np.eye(k)[np.newaxis,:,:] - p[:,np.newaxis,:]
+        mask3 = np.logical_and(mask[:,:,np.newaxis], mask[:,np.newaxis,:])
+        rows = np.broadcast_to(np.arange(S*k).reshape(S, k, 1), vals.shape)[mask3]
+        cols = np.broadcast_to(idx[:,np.newaxis,:], vals.shape)[mask3]
+        V = sp.csr_matrix((vals[mask3], (rows, cols)), shape=(S*k, len(F)))
+
+        c = np.where(mask, p, 0).reshape(-1) / (self.sigma * self.sigma)
+
+        return V, c, dpy_df, np.sum(log_p0)
+
+    ## grad_hyper
+    # Calculates the gradient of log p(y|F) given the parameters of the probit
+    # @param y - the given set of listwise records
+    # @param F - the input data samples
+    #
+    # @return numpy array (gradient of probit with respect to hyper parameters)
+    def grad_hyper(self, y, F):
+        if not self.optimize_parameters:
+            return np.array([])
+        idx, mask, _ = self.stages(y)
+        p, _ = self.stage_probabilities(idx, mask, F)
+
+        # d log p0 / d sigma = -(F_chosen - E_p[F]) / sigma^2
+        F_s = np.where(mask, F[idx], 0)
+        dP_dSigma = -np.sum(F_s[:,0] - np.sum(p * F_s, axis=1)) / (self.sigma * self.sigma)
+
+        return np.array([dP_dSigma])
+
+    ## listwise_derivative
+    # creates the ListwiseDerivative for the given order
+    def listwise_derivative(self, y, F, order):
+        idx, mask, _ = self.stages(y)
+        p, _ = self.stage_probabilities(idx, mask, F)
+        F_s = np.where(mask, F[idx], 0)
+        g = np.where(mask, F_s - np.sum(p * F_s, axis=1)[:,np.newaxis], 0)
+
+        return ListwiseDerivative(idx, p, g, self.sigma, len(F), order)
+
+    ## calc_W_dF_sparse
+    # Calculate the derivative of the W matrix with respect to F.
+    # @param y - the given set of listwise records
+    # @param F - the vector of F (estimated training sample outputs)
+    #
+    # @return ListwiseDerivative of order 3 (dense shape (N,N,N))
+    def calc_W_dF_sparse(self, y, F):
+        return self.listwise_derivative(y, F, 3)
+
+    ## calc_W_dHyper
+    # Calculate the derivative of the W matrix with respect to hyper parameters.
+    # @param y - the given set of listwise records
+    # @param F - the vector of F (estimated training sample outputs)
+    #
+    # @return 3d matrix (1 x N x N)
+    def calc_W_dHyper(self, y, F):
+        if not self.optimize_parameters:
+            return np.empty((0,))
+        return self.calc_W_dHyper_sparse(y, F).to_dense()
+
+    ## calc_W_dHyper_sparse
+    # Calculate the derivative of the W matrix with respect to sigma.
+    # @param y - the given set of listwise records
+    # @param F - the vector of F (estimated training sample outputs)
+    #
+    # @return ListwiseDerivative of order 2 (dense shape (1,N,N))
+    def calc_W_dHyper_sparse(self, y, F):
+        if not self.optimize_parameters:
+            return super().calc_W_dHyper_sparse(y, F)
+        return self.listwise_derivative(y, F, 2)
+
+    ## likelihood
+    # Returns the liklihood of each record
+    # @param y - the given set of listwise records
+    # @param F - the input data samples
+    #
+    # @return P(y|F) for each record
+    def likelihood(self, y, F):
+        idx, mask, query = self.stages(y)
+        _, log_p0 = self.stage_probabilities(idx, mask, F)
+
+        return np.exp(np.bincount(query, log_p0, minlength=len(y)))
+
+    ## log_likelihood
+    # Returns the log liklihood function for the given probit
+    # @param y - the given set of listwise records
+    # @param F - the input data samples
+    #
+    # @return log P(y|F)
+    def log_likelihood(self, y, F):
+        idx, mask, _ = self.stages(y)
+        _, log_p0 = self.stage_probabilities(idx, mask, F)
+
+        return np.sum(log_p0)
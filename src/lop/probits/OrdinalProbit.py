@@ -72,6 +72,11 @@ class OrdinalProbit(ProbitBase):
         else:
             b = self.b
         return np.array([self.sigma, b])
+
+    ## param_state
+    # Gets all the parameters of the probit, including every breakpoint
+    def param_state(self):
+        return np.append(self.sigma, self.b)
     
 
     ## set_b
@@ -118,98 +123,107 @@ class OrdinalProbit(ProbitBase):
             f = F
         return self._isigma*(self.b[y] - f)
 
+    ## norm_pdf
+    # the normal pdf at the breakpoint of each rating
+    # @param y - the labels for the given probit (rating, u) or ratings
+    # @param F - the input estimates in the latent space
+    #
+    # @return the pdf of each rating (0 for the infinite breakpoints)
     def norm_pdf(self, y, F):
         if isinstance(y, tuple):
             f = F[y[1]]
             y = y[0]
         else:
             f = F
+        y = np.asarray(y)
 
-        if isinstance(y, tuple):
-            f = f*np.ones(y.shape, dtype='float')       # This ensures the number of f values matches the number of y
-            out = np.zeros(y.shape, dtype='float')
-            for i in range(out.shape[0]):
-                if y[i] != 0 and y[i] != self.n_ordinals:  # b0 = -Inf -> N(-Inf) = 0
-                    z = self._isigma*(self.b[y[i]] - f[i])
-                    out[i] = std_norm_pdf(z)
-        else:
-            out = 0
-            if y!=0 and y != self.n_ordinals:
-                z = self._isigma*(self.b[y] - f)
-                out = std_norm_pdf(z)
-        return out
+        # b0 = -Inf and bn = Inf -> N(+-Inf) = 0
+        inner = np.logical_and(y != 0, y != self.n_ordinals)
+        z = self._isigma*(self.b[np.where(inner, y, 1)] - f)
+        return np.where(inner, std_norm_pdf(z), 0.0)[()]
 
+    ## norm_cdf
+    # the normal cdf at the breakpoint of each rating
+    # @param y - the labels for the given probit (rating, u) or ratings
+    # @param F - the input estimates in the latent space
+    # @param var_x - [opt] additional variance term
+    #
+    # @return the cdf of each rating
     def norm_cdf(self, y, F, var_x=0.0):
         if isinstance(y, tuple):
             f = F[y[1]]
             y = y[0]
         else:
             f = F
+        y = np.asarray(y)
         ivar = self._isigma + var_x
-        f = f*np.ones(y.shape, dtype='float')
-        out = np.zeros(y.shape, dtype='float')
-        for i in range(out.shape[0]):
-            if y[i] == self.n_ordinals:
-                out[i] = 1.0
-            elif y[i] != 0:
-                z = ivar*(self.b[y[i]] - f[i])
-                out[i] = std_norm_cdf(z)
-        return out
-
-    ## derivatives
+
+        inner = np.logical_and(y != 0, y != self.n_ordinals)
+        z = np.atleast_1d(ivar*(self.b[np.where(inner, y, 1)] - f))
+        out = np.where(inner, std_norm_cdf(z), 0.0)
+        return np.where(y == self.n_ordinals, 1.0, out)
+
+    ## derivatives_diag
     # Calculates the derivatives of the probit with the given input data
+    # Each rating only depends on its own sample, so W is diagonal.
     # @param y - the given set of labels for the probit (rating, u_k)
     # @param F - the input data samples
     #
-    # @return - W, dpy_df, py
-    #       W - is the second order derivative of the probit with respect to F
-    #       dpy_df - the derivative of P(y|x,theta) with respect to F
-    #       py - P(y|x,theta) for the given probit
-    def derivatives(self, y, F):
+    # @return - idx, W_diag, dpy_df, py
+    #       idx - the sample index of each rating
+    #       W_diag - the diagonal of the second order derivative for each rating
+    #       dpy_df - the derivative of log P(y|x,theta) for each rating
+    #       py - log P(y|x,theta) for the given probit
+    def derivatives_diag(self, y, F):
+        l = self.likelihood_each(y, F)
+        py = np.log(l)
+
+        dpy_df, d2py_df2 = self.rating_derivatives(y, F, l)
+
+        return y[1], -d2py_df2, dpy_df, np.sum(py)
+
+    ## rating_derivatives
+    # Calculates the first and second derivative of the log likelihood of each
+    # rating with respect to its own F.
+    # @param y - the given set of labels for the probit (rating, u_k)
+    # @param F - the input data samples
+    # @param l - the likelihood of each rating (from likelihood_each)
+    #
+    # @return dpy_df, d2py_df2 for each rating
+    def rating_derivatives(self, y, F, l):
         f = F[y[1]]
-        y_orig = y
         y = y[0]
-        l = self.likelihood_each(y_orig, F)
-        py = np.log(l)
 
         # First derivative - Chu and Gharamani
-        # Having issues with derivative (likelihood denominator drops to 0)
-        dpy_df = np.zeros(l.shape, dtype='float')
-        d2py_df2 = np.zeros(l.shape, dtype='float')
-        for i in range(l.shape[0]):
-            if l[i] < self.eps:
-                # l2 = self.likelihood(y[i], f[i]+self.delta_f)
-                # l0 = self.likelihood(y[i], f[i]-self.delta_f)
-                # dpy_df[i] = -(l2-l[i])/self.delta_f/l[i]      # (ln(f))' = f'/f
-                # d2py_df2[i] = (l2 - 2*l[i] + l0)/self.delta_f**2/dpy_df[i]/l[i]
-
-                if y[i] == 1:
-                    dpy_df[i] = self._isigma*self.z_k(y[i], f[i])
-                    d2py_df2[i] = -self._ivar
-                elif y[i] == self.n_ordinals:
-                    dpy_df[i] = self._isigma*self.z_k(y[i]-1, f[i])
-                    d2py_df2[i] = -self._ivar
-                else:
-                    z1 = self.z_k(y[i], f[i])
-                    z2 = self.z_k(y[i]-1, f[i])
-                    ep = np.exp(-0.5*(z1**2 - z2**2))
-                    dpy_df[i] = self._isigma*(z1*ep-z2)/(ep - 1.0)
-                    d2py_df2[i] = -(self._ivar*(1.0 - (z1**2 *ep - z2**2)/(ep - 1.0)) + dpy_df[i]**2)
-            else:
-                dpy_df[i] = -self._isigma*(self.norm_pdf(y[i], f[i]) - self.norm_pdf(y[i]-1, f[i])) / l[i]
-                d2py_df2[i] = -(dpy_df[i]**2 + self._ivar*(self.norm_pdf(y[i], f[i]) - self.norm_pdf(y[i]-1, f[i])) / l[i])
-
-        W = np.diagflat(-d2py_df2)
-
-        # setup the indexing to reshape into full gradient of F
-        full_W = np.zeros((F.shape[0], F.shape[0]))
-        idx_grid = np.meshgrid(y_orig[1],y_orig[1])
-        full_W[tuple(idx_grid)] = W
-
-        full_dpy_df = np.zeros(F.shape[0])
-        full_dpy_df[y_orig[1]] = dpy_df
-
-        return full_W, full_dpy_df, np.sum(py)
+        pdf1 = self.norm_pdf(y, f)
+        pdf2 = self.norm_pdf(y-1, f)
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            dpy_df = -self._isigma*(pdf1 - pdf2) / l
+            d2py_df2 = -(dpy_df**2 + self._ivar*(pdf1 - pdf2) / l)
+
+            # Having issues with derivative (likelihood denominator drops to 0)
+            # so use the asymptotic form when the likelihood is small.
+            small = l < self.eps
+            if small.any():
+                y_s = y[small]
+                f_s = f[small]
+                z1 = self.z_k(y_s, f_s)
+                z2 = self.z_k(y_s-1, f_s)
+                ep = np.exp(-0.5*(z1**2 - z2**2))
+
+                d_small = self._isigma*(z1*ep-z2)/(ep - 1.0)
+                d2_small = -(self._ivar*(1.0 - (z1**2 *ep - z2**2)/(ep - 1.0)) + d_small**2)
+
+                lower = y_s == 1
+                upper = y_s == self.n_ordinals
+                d_small[lower] = self._isigma*z1[lower]
+                d_small[upper] = self._isigma*z2[upper]
+                d2_small[np.logical_or(lower, upper)] = -self._ivar
+
+                dpy_df[small] = d_small
+                d2py_df2[small] = d2_small
+
+        return dpy_df, d2py_df2
 
 
     def likelihood_each(self, y, F):
@@ -29,9 +29,10 @@
 
 
 import numpy as np
+import scipy.sparse as sp
 import scipy.special as spec
-from lop.probits import ProbitBase
-from lop.probits import std_norm_pdf, std_norm_cdf, calc_pdf_cdf_ratio
+from lop.probits import ProbitBase, SparseDerivative
+from lop.probits import std_norm_pdf, std_norm_cdf, std_norm_log_cdf, calc_pdf_cdf_ratio
 from lop.utilities import d_log_pdf_gamma, log_pdf_gamma
 
 
@@ -72,6 +73,11 @@ class PreferenceProbit(ProbitBase):
         else:
             return np.array([])
 
+    ## param_state
+    # Gets all the parameters of the probit (even if they are not optimized)
+    def param_state(self):
+        return np.array([self.sigma])
+
     ## Performs random sampling using the same liklihood function used by the param
     # liklihood function
     # @return numpy array of independent samples.
@@ -106,6 +112,18 @@ class PreferenceProbit(ProbitBase):
     def z_k(self, y, F):
         return self._isqrt2sig * y[:,0] * (F[y[:,2]] - F[y[:,1]])
 
+    ## pair_weights
+    # returns the number of times each pair was observed.
+    # Pairs may be given as (dk, u, v) or as weighted pairs (dk, u, v, count)
+    # such as those from merge_pairs.
+    # @param y - the label for the given probit (must be a numpy array)
+    #
+    # @return the count of each pair (n,) or 1 if the pairs are not weighted
+    def pair_weights(self, y):
+        if y.shape[1] > 3:
+            return y[:,3]
+        return 1
+
     ## derv_discrete_loglike
     # Calculates the first derivative of log likelihood.
     # Appendix A.1.1.1.1
@@ -118,7 +136,7 @@ class PreferenceProbit(ProbitBase):
     # @return - the values for the u and v of y numpy (n,2) [[]]
     def derv_log_likelyhood(self, y, F):
         pdf_cdf_ratio, pdf_cdf_ratio2 = calc_pdf_cdf_ratio(self.z_k(y, F))
-        derv_ll_pairs = y[:,0] * pdf_cdf_ratio * self._isqrt2sig
+        derv_ll_pairs = self.pair_weights(y) * y[:,0] * pdf_cdf_ratio * self._isqrt2sig
         derv_ll = np.zeros(len(F))
 
 
@@ -143,7 +161,7 @@ class PreferenceProbit(ProbitBase):
         zk = self.z_k(y, F)
         pdf_cdf_ratio, pdf_cdf_ratio2 = calc_pdf_cdf_ratio(zk)
 
-        dP_dSigma = -np.sum(zk * pdf_cdf_ratio) / self.sigma
+        dP_dSigma = -np.sum(self.pair_weights(y) * zk * pdf_cdf_ratio) / self.sigma
 
         return np.array([dP_dSigma])
 
@@ -182,11 +200,7 @@ class PreferenceProbit(ProbitBase):
     # @param F - the vector of f (estimated training sample outputs)
     def calc_W(self, y, F):
         z = self.z_k(y, F)
-        pdf_cdf_ratio, pdf_cdf_ratio2 = calc_pdf_cdf_ratio(z)
-
-        paren_pairs = np.where(np.logical_and(z < 0, np.isinf(pdf_cdf_ratio)), 0, \
-                        (z * pdf_cdf_ratio) + pdf_cdf_ratio2)
-        d2_ll_pairs = -(y[:,0]*y[:,0])*paren_pairs*self._i2var
+        _, d2_ll_pairs = self.pair_derivatives(y, z, *calc_pdf_cdf_ratio(z))
 
         W = np.zeros((len(F), len(F)))
 
@@ -203,78 +217,91 @@ class PreferenceProbit(ProbitBase):
 
         return W
 
-    ## calc_W_dF
+    ## pair_derivatives
+    # Calculates the first and second derivative of the log likelihood of each pair
+    # with respect to F(v) given the already computed z and pdf / cdf ratios.
+    # Weighted pairs are scaled by their count.
+    # @param y - the label for the given probit (dk, u, v) (must be a numpy array)
+    # @param z - the z_k values of each pair
+    # @param pdf_cdf_ratio - pdf(z) / cdf(z)
+    # @param pdf_cdf_ratio2 - (pdf(z) / cdf(z))^2
+    #
+    # @return d1_pairs, d2_pairs
+    def pair_derivatives(self, y, z, pdf_cdf_ratio, pdf_cdf_ratio2):
+        w = self.pair_weights(y)
+        d1_pairs = w * y[:,0] * pdf_cdf_ratio * self._isqrt2sig
+
+        paren_pairs = np.where(np.logical_and(z < 0, np.isinf(pdf_cdf_ratio)), 0, \
+                        (z * pdf_cdf_ratio) + pdf_cdf_ratio2)
+        d2_pairs = -w*(y[:,0]*y[:,0])*paren_pairs*self._i2var
+
+        return d1_pairs, d2_pairs
+
+    ## calc_W_dF_sparse
     # Calculate the third derivative of the W matrix.
     # d ln(p(dk|F(u), F(v))) / d f_i, f_j, f_k
-    # This returns a 3d matrix of (N x N x N) where N is the length of the F vector.
+    # Each pair adds c (e_u - e_v) (x) (e_u - e_v) (x) (e_u - e_v) (8 non-zeros).
     # Equation (65)
     #
     # @param y - the label for the given probit (dk, u, v) (must be a numpy array)
     # @param F - the vector of F (estimated training sample outputs)
     #
-    # @reutrn 3d matrix
-    def calc_W_dF(self, y, F):
+    # @return SparseDerivative of order 3 (dense shape (N,N,N))
+    def calc_W_dF_sparse(self, y, F):
         z = self.z_k(y, F)
         pdf_cdf_ratio, pdf_cdf_ratio2 = calc_pdf_cdf_ratio(z)
 
         paren_pairs = np.where(np.logical_and(z < 0, np.isinf(pdf_cdf_ratio)), 0, \
                         pdf_cdf_ratio - z*z*pdf_cdf_ratio - 3*z*pdf_cdf_ratio2 - 2 * pdf_cdf_ratio2 * std_norm_pdf(z))
-        paren_pairs *= y[:,0]*y[:,0]*y[:,0]
+        paren_pairs *= self.pair_weights(y)*y[:,0]*y[:,0]*y[:,0]
         paren_pairs *= -1 / (2 * np.sqrt(2) * self.sigma * self.sigma * self.sigma)
 
-
-        N = len(F)
-        dW = np.zeros((N, N, N))
-        dW = add_up_W_partial(y, paren_pairs, dW)
-
-        return dW
+        return SparseDerivative(paren_pairs, y[:,1], y[:,2], len(F), 3)
 
     ## calc_W_dHyper
     # Calculate the derivative of the W matrix with respect to hyper parameters.
     # dW / dSigma
-    # This returns a 3d matrix of (N x N x N) where N is the length of the F vector.
+    # This returns a 3d matrix of (1 x N x N) where N is the length of the F vector.
     # Equation (70)
     #
     # @param y - the label for the given probit (dk, u, v) (must be a numpy array)
     # @param F - the vector of F (estimated training sample outputs)
     #
-    # @reutrn 2d matrix
+    # @reutrn 3d matrix
     def calc_W_dHyper(self, y, F):
         if not self.optimize_parameters:
             return np.empty((0,))
+        return self.calc_W_dHyper_sparse(y, F).to_dense()
+
+    ## calc_W_dHyper_sparse
+    # Calculate the derivative of the W matrix with respect to sigma.
+    # Each pair adds -c (e_u - e_v) (x) (e_u - e_v).
+    # Equation (70)
+    #
+    # @param y - the label for the given probit (dk, u, v) (must be a numpy array)
+    # @param F - the vector of F (estimated training sample outputs)
+    #
+    # @return SparseDerivative of order 2 (dense shape (1,N,N))
+    def calc_W_dHyper_sparse(self, y, F):
+        if not self.optimize_parameters:
+            return super().calc_W_dHyper_sparse(y, F)
 
         z = self.z_k(y, F)
         pdf_cdf_ratio, pdf_cdf_ratio2 = calc_pdf_cdf_ratio(z)
-        pdf = std_norm_pdf(z)
-        cdf = std_norm_cdf(z)
 
         paren_pairs = np.where(np.logical_and(z < 0, np.isinf(pdf_cdf_ratio)), 0, \
                         (z * pdf_cdf_ratio) + pdf_cdf_ratio2)
         term1 = (y[:,0] * y[:,0] / (self.sigma * self.sigma * self.sigma)) * paren_pairs
-        term2a = (1 / (2 * self.sigma * self.sigma * self.sigma)) * y[:,0] * y[:,0] * z * pdf / (cdf * cdf * cdf)
-        term2b = -(cdf*cdf) + z*z*cdf*cdf + 3*z*pdf*cdf + 2 * pdf*pdf
+        # z pdf / cdf^3 * (-cdf^2 + z^2 cdf^2 + 3 z pdf cdf + 2 pdf^2) written with
+        # the ratio r = pdf / cdf, so it stays finite when the cdf underflows.
+        term2a = (1 / (2 * self.sigma * self.sigma * self.sigma)) * y[:,0] * y[:,0] * z * pdf_cdf_ratio
+        term2b = -1 + z*z + 3*z*pdf_cdf_ratio + 2 * pdf_cdf_ratio2
 
-        term2 = np.where((cdf * cdf * cdf) == 0, 0, term2a*term2b)
-
-        dw_pairs = term1 - term2
-
-        dW = np.zeros((len(F), len(F)))
-
-        # vectorized versions of summation
-        idx1 = np.array([y[:,1], y[:,1]]).T
-        idx2 = np.array([y[:,1], y[:,2]]).T
-        idx3 = np.array([y[:,2], y[:,1]]).T
-        idx4 = np.array([y[:,2], y[:,2]]).T
+        term2 = np.where(np.isinf(pdf_cdf_ratio), 0, term2a*term2b)
 
-        dW = add_up_mat(idx1, -dw_pairs, dW)
-        dW = add_up_mat(idx2,  dw_pairs, dW)
-        dW = add_up_mat(idx3,  dw_pairs, dW)
-        dW = add_up_mat(idx4, -dw_pairs, dW)
+        dw_pairs = self.pair_weights(y) * (term1 - term2)
 
-        if np.isnan(dW).any():
-            pdb.set_trace()
-
-        return dW[np.newaxis, :, :]
+        return SparseDerivative(-dw_pairs[np.newaxis, :], y[:,1], y[:,2], len(F), 2)
 
 
     ## derivatives
@@ -288,23 +315,97 @@ class PreferenceProbit(ProbitBase):
     #       dpy_df - the derivative of log P(y|x,theta) with respect to F
     #       py - log P(y|x,theta) for the given probit
     def derivatives(self, y, F):
-        py = self.log_likelihood(y, F)
-        dpy_df = self.derv_log_likelyhood(y, F)
-        W = self.calc_W(y, F)
+        dpy_df = np.zeros(len(F))
+        W = np.zeros((len(F), len(F)))
+        py = self.add_derivatives(y, F, W, dpy_df)
 
         return W, dpy_df, py
 
+    ## add_derivatives
+    # Adds the derivatives of the probit into W and the gradient.
+    # z and the pdf / cdf ratio are shared by all three terms, so they are computed
+    # once and the gradient and W are scattered in a single pass over the pairs.
+    # @param y - the given set of labels for the probit
+    #              this is given as a list of [(dk, u, v), ...]
+    # @param F - the input data samples
+    # @param W - [in/out] the second order derivative to add to (N,N)
+    # @param grad - [in/out] the derivative of log P(y|x,theta) to add to (N,)
+    #
+    # @return py - log P(y|x,theta) for the given probit
+    def add_derivatives(self, y, F, W, grad):
+        z = self.z_k(y, F)
+        py = np.sum(self.pair_weights(y) * std_norm_log_cdf(z))
+        d1_pairs, d2_pairs = self.pair_derivatives(y, z, *calc_pdf_cdf_ratio(z))
+
+        add_up_pairs(y[:,1], y[:,2], d1_pairs, d2_pairs, grad, W)
+
+        return py
+
+    ## hessian_terms
+    # Calculates the derivatives of the probit with W as a sum of sparse rank one terms.
+    # Each pair adds -d2 (e_u - e_v)(e_u - e_v)^T to W.
+    # @param y - the given set of labels for the probit
+    #              this is given as a list of [(dk, u, v), ...]
+    # @param F - the input data samples
+    #
+    # @return - V, c, dpy_df, py
+    #       V - sparse matrix of the vector e_u - e_v of each pair (m, N)
+    #       c - the coefficient of each pair (m,)
+    #       dpy_df - the derivative of log P(y|x,theta) with respect to F (N,)
+    #       py - log P(y|x,theta) for the given probit
+    def hessian_terms(self, y, F):
+        z = self.z_k(y, F)
+        py = np.sum(self.pair_weights(y) * std_norm_log_cdf(z))
+        d1_pairs, d2_pairs = self.pair_derivatives(y, z, *calc_pdf_cdf_ratio(z))
+
+        u = y[:,1].astype(int)
+        v = y[:,2].astype(int)
+        rows = np.arange(len(y))
+        V = sp.csr_matrix((np.append(np.ones(len(y)), -np.ones(len(y))),
+                            (np.append(rows, rows), np.append(u, v))), shape=(len(y), len(F)))
+
+        dpy_df = np.bincount(v, d1_pairs, minlength=len(F)) - np.bincount(u, d1_pairs, minlength=len(F))
+
+        return V, -d2_pairs, dpy_df, py
+
     ## likelihood_all_pairs
     # This function calculates the pairwise likelihood function of the probit for all pairs in F
     # @param F - the estimated reward values numpy (n,)
+    # @param idx - [opt] the subset of indicies of F to calculate the pairs over
+    # @param dtype - [opt default float64] the dtype of the output (np.float32 halves memory)
     #
     # @return a matrix of pairwise probabilities p[0,1] indicates the P(F(0) > F(1))
-    def likelihood_all_pairs(self, F):
-        #F_pairs = np.array(np.meshgrid(F,F)).T.reshape(-1,2)
-        z_k = np.repeat(F[:,np.newaxis], len(F), axis=1) - np.repeat(F[np.newaxis, :], len(F), axis=0)
-        z_k *= self._isqrt2sig
-        
-        return std_norm_cdf(z_k)
+    def likelihood_all_pairs(self, F, idx=None, dtype=np.float64):
+        return self.likelihood_all_pairs_batch(F[np.newaxis], idx, dtype)[0]
+
+    ## likelihood_all_pairs_batch
+    # Calculates the pairwise likelihood for all pairs of each sample of F
+    # Only the upper triangle is evaluated as p[j,i] = 1 - p[i,j]. The less likely
+    # direction is evaluated with the cdf so small probabilities keep their precision.
+    # @param F - the sampled reward values numpy (M, n)
+    # @param idx - [opt] the subset of indicies of F to calculate the pairs over
+    # @param dtype - [opt default float64] the dtype of the output (np.float32 halves memory)
+    #
+    # @return (M, n, n) pairwise probabilities p[k,0,1] indicates P(F_k(0) > F_k(1))
+    def likelihood_all_pairs_batch(self, F, idx=None, dtype=np.float64):
+        F = np.asarray(F, dtype=dtype)
+        if idx is not None:
+            F = F[:, idx]
+        M, n = F.shape
+        isqrt2sig = F.dtype.type(self._isqrt2sig)
+
+        P = np.empty((M, n, n), dtype=F.dtype)
+        P[:, np.arange(n), np.arange(n)] = 0.5
+        for i in range(n-1):
+            z = (F[:, i, np.newaxis] - F[:, i+1:]) * isqrt2sig
+            # clipped the same as std_norm_cdf, so probabilities never reach 0
+            p_small = spec.ndtr(-np.minimum(np.abs(z), 30))
+            greater = z > 0
+
+            P[:, i, i+1:] = np.where(greater, 1 - p_small, p_small)
+            P[:, i+1:, i] = np.where(greater, p_small, 1 - p_small)
+
+        return P
 
 
     ## likelihood
@@ -312,10 +413,10 @@ class PreferenceProbit(ProbitBase):
     # @param y - the given set of labels for the probit
     # @param F - the input data samples
     #
-    # @return P(y|F)
+    # @return P(y|F) of each pair (weighted pairs are raised to their count)
     def likelihood(self, y, F):
         z = self.z_k(y, F)
-        return std_norm_cdf(z)
+        return std_norm_cdf(z) ** self.pair_weights(y)
 
     ## log_likelihood
     # Returns the log liklihood function for the given probit
@@ -325,8 +426,7 @@ class PreferenceProbit(ProbitBase):
     # @return log P(y|F)
     def log_likelihood(self, y, F):
         z = self.z_k(y, F)
-        x = np.clip(z, -30, 100 )
-        return np.sum(spec.log_ndtr(x))
+        return np.sum(self.pair_weights(y) * std_norm_log_cdf(z))
 
 
 
@@ -362,29 +462,26 @@ try:
 
         return M
 
-    ## add_up_W_partial
-    # add and place the y inidicies into the appropriate locations.
-    # @param y - numpy array of labels
-    # @param v - the values going with the labels (paren pairs)
-    # @param dW - the derivative of W np array to add the value pairs to.
+    ## add_up_pairs
+    # scatter the pair derivatives into the gradient and W in a single pass
+    # grad[u] -= d1, grad[v] += d1, W[u,u] -= d2, W[u,v] += d2, W[v,u] += d2, W[v,v] -= d2
+    # @param u - (n,) the u index of each pair
+    # @param v - (n,) the v index of each pair
+    # @param d1 - (n,) the first derivative of each pair
+    # @param d2 - (n,) the second derivative of each pair
+    # @param grad - [in/out] the gradient vector to add up
+    # @param W - [in/out] the W matrix to add up
     @numba.jit
-    def add_up_W_partial(y, v, dW):
-        for i, y_i in enumerate(y):
-            dW[y_i[1], y_i[1], y_i[1]] += v[i]
-            dW[y_i[2], y_i[1], y_i[1]] += -v[i]
-
-            dW[y_i[1], y_i[1], y_i[2]] += -v[i]
-            dW[y_i[2], y_i[1], y_i[2]] += v[i]
-
-            dW[y_i[1], y_i[2], y_i[1]] += -v[i]
-            dW[y_i[2], y_i[2], y_i[1]] += v[i]
-
-            dW[y_i[1], y_i[2], y_i[2]] += v[i]
-            dW[y_i[2], y_i[2], y_i[2]] += -v[i]
-
-        return dW
+    def add_up_pairs(u, v, d1, d2, grad, W):
+        for i in range(len(d1)):
+            grad[u[i]] -= d1[i]
+            grad[v[i]] += d1[i]
+            W[u[i], u[i]] -= d2[i]
+            W[u[i], v[i]] += d2[i]
+            W[v[i], u[i]] += d2[i]
+            W[v[i], v[i]] -= d2[i]
 except ImportError:
-    print('Failed to import numba, add_up_mat and add_up_vec will be slower')
+    print('Failed to import numba, add_up_mat, add_up_vec, and add_up_pairs will be slower')
 
     ## add_up_mat
     # add the values in v to the M matrix indexed by the indicies matrix
@@ -408,26 +505,22 @@ except ImportError:
 
         return M
 
-    ## add_up_W_partial
-    # add and place the y inidicies into the appropriate locations.
-    # @param y - numpy array of labels
-    # @param v - the values going with the labels (paren pairs)
-    # @param dW - the derivative of W np array to add the value pairs to.
-    def add_up_W_partial(y, v, dW):
-        for i, y_i in enumerate(y):
-            dW[y_i[1], y_i[1], y_i[1]] += v[i]
-            dW[y_i[2], y_i[1], y_i[1]] += -v[i]
-
-            dW[y_i[1], y_i[1], y_i[2]] += -v[i]
-            dW[y_i[2], y_i[1], y_i[2]] += v[i]
-
-            dW[y_i[1], y_i[2], y_i[1]] += -v[i]
-            dW[y_i[2], y_i[2], y_i[1]] += v[i]
-
-            dW[y_i[1], y_i[2], y_i[2]] += v[i]
-            dW[y_i[2], y_i[2], y_i[2]] += -v[i]
-
-        return dW
+    ## add_up_pairs
+    # scatter the pair derivatives into the gradient and W
+    # grad[u] -= d1, grad[v] += d1, W[u,u] -= d2, W[u,v] += d2, W[v,u] += d2, W[v,v] -= d2
+    # @param u - (n,) the u index of each pair
+    # @param v - (n,) the v index of each pair
+    # @param d1 - (n,) the first derivative of each pair
+    # @param d2 - (n,) the second derivative of each pair
+    # @param grad - [in/out] the gradient vector to add up
+    # @param W - [in/out] the W matrix to add up
+    def add_up_pairs(u, v, d1, d2, grad, W):
+        np.add.at(grad, u, -d1)
+        np.add.at(grad, v, d1)
+        np.add.at(W, (u, u), -d2)
+        np.add.at(W, (u, v), d2)
+        np.add.at(W, (v, u), d2)
+        np.add.at(W, (v, v), -d2)
 
 
 
@@ -26,42 +26,196 @@
 
 
 import numpy as np
+import scipy.sparse as sp
 import scipy.stats as st
 import scipy.special as spec
+import math
 
 
 _sqrt_2pi = np.sqrt(2*np.pi)
-def std_norm_pdf(x):
-    #x = np.clip(x,-1e150,1e150)
-    #return st.norm.pdf(x)
-    return np.exp(-(x**2)/2)/_sqrt_2pi
+_log_sqrt_2pi = 0.5*np.log(2*np.pi)
+_isqrt2 = 1.0 / np.sqrt(2)
+_sqrt_2_pi = np.sqrt(2 / np.pi)
 
+# below this z the cdf of the standard normal is replaced by its asymptotic expansion
+_z_asymptotic = -30.0
 
-def std_norm_cdf(x):
-    x_clip = np.empty(x.shape)
-    np.clip(x, -30, 100, out=x_clip)
-    return spec.ndtr(x_clip)
-    #return st.norm.cdf(x)
+try:
+    import numba
 
+    ## _asymptotic_cdf_pdf
+    # the asymptotic expansion of -z Phi(z) / phi(z) for large negative z
+    # 1 - 1/z^2 + 3/z^4 - 15/z^6 + 105/z^8
+    @numba.njit
+    def _asymptotic_cdf_pdf(z):
+        iz2 = 1.0 / (z*z)
+        return 1.0 - iz2*(1.0 - 3.0*iz2*(1.0 - 5.0*iz2*(1.0 - 7.0*iz2)))
 
+    ## _pdf_cdf_ratio
+    # the inverse Mills ratio phi(z) / Phi(z) of a single value
+    @numba.njit
+    def _pdf_cdf_ratio(z):
+        if z < _z_asymptotic:
+            return -z / _asymptotic_cdf_pdf(z)
+        return math.exp(-0.5*z*z) / _sqrt_2pi / (0.5*math.erfc(-z*_isqrt2))
 
-def calc_pdf_cdf_ratio(z):
-    # as zk -> -infinity then pdf_zk / cdf_zk goes to infinity
-    # https://www.wolframalpha.com/input/?i2d=true&i=Limit%5BDivide%5BPower%5B%5C%2840%29Exp%5B-Divide%5BPower%5Bx%2C2%5D%2C2%5D%5D%5C%2841%29%2C2%5D%2CPower%5Berfc%5C%2840%29-Divide%5Bx%2CSqrt%5B2%5D%5D%5C%2841%29%2C2%5D%5D%2Cx-%3E-%E2%88%9E%5D
-    # As zk -> infinity then pdf_zk / cdf_zk goes to 0
-    # https://www.wolframalpha.com/input/?i2d=true&i=Limit%5BDivide%5BPower%5B%5C%2840%29Exp%5B-Divide%5BPower%5Bx%2C2%5D%2C2%5D%5D%5C%2841%29%2C2%5D%2CPower%5Berfc%5C%2840%29-Divide%5Bx%2CSqrt%5B2%5D%5D%5C%2841%29%2C2%5D%5D%2Cx-%3E%E2%88%9E%5D
-    # this code checks for those states and inputs the appropriate values
-    pdf_z = std_norm_pdf(z)
-    cdf_z = std_norm_cdf(z)
+    ## _calc_pdf_cdf_ratio
+    # fills the ratio and squared ratio for each z
+    # @param z - (n,) the input values
+    # @param ratio - [out] (n,) phi(z) / Phi(z)
+    # @param ratio2 - [out] (n,) (phi(z) / Phi(z))^2, 0 where the ratio is infinite
+    @numba.njit
+    def _calc_pdf_cdf_ratio(z, ratio, ratio2):
+        for i in range(z.shape[0]):
+            r = _pdf_cdf_ratio(z[i])
+            ratio[i] = r
+            ratio2[i] = 0.0 if math.isinf(r) else r*r
 
-    pdf_cdf_z = np.where(cdf_z == 0, \
-                    np.where(pdf_z < 0.5, float('inf'), 0), \
-                    pdf_z / cdf_z)
+    @numba.vectorize(['float64(float64)'])
+    def std_norm_pdf(x):
+        return math.exp(-0.5*x*x) / _sqrt_2pi
 
-    pdf_cdf_2 = np.where(np.isinf(pdf_cdf_z), 0,  pdf_cdf_z*pdf_cdf_z)
+    @numba.vectorize(['float64(float64)'])
+    def std_norm_cdf(x):
+        x = min(max(x, -30.0), 100.0)
+        return 0.5*math.erfc(-x*_isqrt2)
 
-    return pdf_cdf_z, pdf_cdf_2
+    ## std_norm_log_cdf
+    # log Phi(x) of the standard normal, using the asymptotic expansion for large
+    # negative x where Phi(x) underflows.
+    @numba.vectorize(['float64(float64)'])
+    def std_norm_log_cdf(x):
+        if x < _z_asymptotic:
+            return -0.5*x*x - _log_sqrt_2pi - math.log(-x) + math.log(_asymptotic_cdf_pdf(x))
+        elif x > 5.0:
+            return math.log1p(-0.5*math.erfc(x*_isqrt2))
+        return math.log(0.5*math.erfc(-x*_isqrt2))
 
+    ## calc_pdf_cdf_ratio
+    # Calculates the inverse Mills ratio phi(z) / Phi(z) and its square.
+    # As z -> -infinity the ratio goes to -z, as z -> infinity the ratio goes to 0.
+    # @param z - numpy array of input values
+    #
+    # @return pdf_cdf_z, pdf_cdf_2
+    def calc_pdf_cdf_ratio(z):
+        z = np.asarray(z, dtype=float)
+        pdf_cdf_z = np.empty(z.shape)
+        pdf_cdf_2 = np.empty(z.shape)
+        _calc_pdf_cdf_ratio(z.reshape(-1), pdf_cdf_z.reshape(-1), pdf_cdf_2.reshape(-1))
+
+        return pdf_cdf_z, pdf_cdf_2
+
+except ImportError:
+    print('Failed to import numba, the normal pdf and cdf functions will be slower')
+
+    def std_norm_pdf(x):
+        #x = np.clip(x,-1e150,1e150)
+        #return st.norm.pdf(x)
+        return np.exp(-(x**2)/2)/_sqrt_2pi
+
+
+    def std_norm_cdf(x):
+        x_clip = np.empty(x.shape)
+        np.clip(x, -30, 100, out=x_clip)
+        return spec.ndtr(x_clip)
+        #return st.norm.cdf(x)
+
+    ## std_norm_log_cdf
+    # log Phi(x) of the standard normal
+    def std_norm_log_cdf(x):
+        return spec.log_ndtr(x)
+
+    ## calc_pdf_cdf_ratio
+    # Calculates the inverse Mills ratio phi(z) / Phi(z) and its square.
+    # phi(z) / Phi(z) = sqrt(2/pi) / erfcx(-z / sqrt(2)) which is stable for all z.
+    # @param z - numpy array of input values
+    #
+    # @return pdf_cdf_z, pdf_cdf_2
+    def calc_pdf_cdf_ratio(z):
+        pdf_cdf_z = _sqrt_2_pi / spec.erfcx(-z*_isqrt2)
+        pdf_cdf_2 = np.where(np.isinf(pdf_cdf_z), 0,  pdf_cdf_z*pdf_cdf_z)
+
+        return pdf_cdf_z, pdf_cdf_2
+
+
+
+## beta_logpdf
+# log pdf of the beta distribution, equivalent to scipy.stats.beta.logpdf
+# without the per call overhead of the scipy distribution object.
+# @param x - the values to evaluate (0,1)
+# @param a - the alpha parameter
+# @param b - the beta parameter
+#
+# @return log Beta(x; a, b)
+def beta_logpdf(x, a, b):
+    return spec.xlogy(a - 1.0, x) + spec.xlog1py(b - 1.0, -x) - spec.betaln(a, b)
+
+
+## SparseDerivative
+# A sparse representation of the derivatives of the W matrix of a probit
+# (dW/dF or dW/dHyper) as a sum of rank one terms, one for each label
+#   T = sum_p coef[..., p] * d_p (x) ... (x) d_p    (order times)
+# where d_p = e_{a_p} - e_{b_p} for labels on pairs of samples, and d_p = e_{a_p} for
+# labels on single samples. Leading dimensions of coef are separate tensors
+# (such as one for each hyperparameter).
+# Consumers contract the tensor directly without forming the dense (N,N,N) array.
+class SparseDerivative:
+
+    ## constructor
+    # @param coef - the coefficient of each term (..., P)
+    # @param a - the first sample index of each term (P,)
+    # @param b - the second sample index of each term (P,) or None for single samples
+    # @param N - the number of samples (length of F)
+    # @param order - the order of the tensor (2 for dW/dHyper, 3 for dW/dF)
+    def __init__(self, coef, a, b, N, order):
+        self.coef = np.asarray(coef, dtype=float)
+        self.a = np.asarray(a, dtype=int)
+        self.b = None if b is None else np.asarray(b, dtype=int)
+        self.N = N
+        self.order = order
+
+    ## quad_form
+    # d_p^T M d_p for each term
+    # @param M - numpy array (N, N)
+    #
+    # @return numpy array (P,)
+    def quad_form(self, M):
+        q = M[self.a, self.a]
+        if self.b is not None:
+            q = q - M[self.a, self.b] - M[self.b, self.a] + M[self.b, self.b]
+        return q
+
+    ## contract
+    # contracts the last two dimensions of the tensor with M, trace(M @ T[..., :, :])
+    # @param M - numpy array (N, N)
+    #
+    # @return numpy array (...) for order 2 tensors, (..., N) for order 3 tensors
+    def contract(self, M):
+        w = self.coef * self.quad_form(M)
+        if self.order == 2:
+            return np.sum(w, axis=-1)
+
+        # sum_p w_p d_p
+        w_flat = np.reshape(w, (-1, len(self.a)))
+        out = np.empty((w_flat.shape[0], self.N))
+        for i, w_i in enumerate(w_flat):
+            out[i] = np.bincount(self.a, weights=w_i, minlength=self.N)
+            if self.b is not None:
+                out[i] -= np.bincount(self.b, weights=w_i, minlength=self.N)
+        return np.reshape(out, w.shape[:-1] + (self.N,))
+
+    ## to_dense
+    # @return the dense tensor (..., N, ..., N)
+    def to_dense(self):
+        D = np.zeros((len(self.a), self.N))
+        np.add.at(D, (np.arange(len(self.a)), self.a), 1)
+        if self.b is not None:
+            np.add.at(D, (np.arange(len(self.a)), self.b), -1)
+
+        if self.order == 2:
+            return np.einsum('...p,pi,pj->...ij', self.coef, D, D, optimize=True)
+        else:
+            return np.einsum('...p,pi,pj,pk->...ijk', self.coef, D, D, D, optimize=True)
 
 
 ## ProbitBase
@@ -82,6 +236,12 @@ class ProbitBase:
     def get_hyper(self):
         return np.array([])
 
+    ## param_state
+    # Gets all the parameters of the probit, including ones not optimized by get_hyper,
+    # used to tell when the probit has been changed.
+    def param_state(self):
+        return self.get_hyper()
+
     ## param_likli
     # log liklihood of the parameter (prior)
     def param_likli(self):
@@ -114,7 +274,74 @@ class ProbitBase:
     #       dpy_df - the derivative of P(y|x,theta) with respect to F
     #       py - P(y|x,theta) for the given probit
     def derivatives(self, y, F):
-        raise NotImplementedError('derivatives not implemented')
+        diag = self.derivatives_diag(y, F)
+        if diag is None:
+            raise NotImplementedError('derivatives not implemented')
+        idx, W_diag, dpy_df, py = diag
+
+        W = np.zeros((len(F), len(F)))
+        W[np.diag_indices(len(F))] = np.bincount(idx, W_diag, minlength=len(F))
+        return W, np.bincount(idx, dpy_df, minlength=len(F)), py
+
+    ## derivatives_diag
+    # Calculates the derivatives of the probit for probits where each label only
+    # depends on a single sample, so W is diagonal.
+    # @param y - the given set of labels for the probit
+    # @param F - the input data samples
+    #
+    # @return - idx, W_diag, dpy_df, py (or None if W is not diagonal)
+    #       idx - the sample index of each label
+    #       W_diag - the diagonal of W for each label
+    #       dpy_df - the derivative of log P(y|x,theta) for each label
+    #       py - log P(y|x,theta) for the given probit
+    def derivatives_diag(self, y, F):
+        return None
+
+    ## add_derivatives
+    # Adds the derivatives of the probit into W and the gradient of a model
+    # summing over several probits, without allocating a dense W for the probit.
+    # @param y - the given set of labels for the probit
+    # @param F - the input data samples
+    # @param W - [in/out] the second order derivative to add to (N,N)
+    # @param grad - [in/out] the derivative of log P(y|x,theta) to add to (N,)
+    #
+    # @return py - log P(y|x,theta) for the given probit
+    def add_derivatives(self, y, F, W, grad):
+        diag = self.derivatives_diag(y, F)
+        if diag is None:
+            W_local, dpy_df, py = self.derivatives(y, F)
+            W += W_local
+            grad += dpy_df
+            return py
+        idx, W_diag, dpy_df, py = diag
+
+        np.add.at(W, (idx, idx), W_diag)
+        np.add.at(grad, idx, dpy_df)
+        return py
+
+    ## hessian_terms
+    # Calculates the derivatives of the probit with W as a sum of sparse rank one terms
+    # W = V^T diag(c) V, so models with sparse covariance matrices never form a dense W.
+    # @param y - the given set of labels for the probit
+    # @param F - the input data samples
+    #
+    # @return - V, c, dpy_df, py
+    #       V - sparse matrix of the vector of each term (m, N)
+    #       c - the coefficient of each term (m,)
+    #       dpy_df - the derivative of log P(y|x,theta) with respect to F (N,)
+    #       py - log P(y|x,theta) for the given probit
+    def hessian_terms(self, y, F):
+        diag = self.derivatives_diag(y, F)
+        if diag is None:
+            # no structure to use, decompose the dense W
+            W, dpy_df, py = self.derivatives(y, F)
+            c, U = np.linalg.eigh(W)
+            keep = np.abs(c) > 0
+            return sp.csr_matrix(U[:,keep].T), c[keep], dpy_df, py
+        idx, W_diag, dpy_df, py = diag
+
+        V = sp.csr_matrix((np.ones(len(idx)), (np.arange(len(idx)), idx)), shape=(len(idx), len(F)))
+        return V, W_diag, np.bincount(idx, dpy_df, minlength=len(F)), py
 
     ## calc_W_dF
     # Calculate the third derivative of the W matrix.
@@ -127,7 +354,16 @@ class ProbitBase:
     #
     # @reutrn 3d matrix
     def calc_W_dF(self, y, F):
-        raise NotImplementedError("calc_W_dF is not implmented")
+        return self.calc_W_dF_sparse(y, F).to_dense()
+
+    ## calc_W_dF_sparse
+    # Calculate the third derivative of the W matrix as a SparseDerivative (order 3).
+    # @param y - the label for the given probit
+    # @param F - the vector of F (estimated training sample outputs)
+    #
+    # @return SparseDerivative
+    def calc_W_dF_sparse(self, y, F):
+        raise NotImplementedError("calc_W_dF_sparse is not implmented")
 
     ## calc_W_dHyper
     # Calculate the derivative of the W matrix with respect to hyper parameters.
@@ -140,8 +376,17 @@ class ProbitBase:
     #
     # @reutrn 2d matrix
     def calc_W_dHyper(self, y, F):
-        return np.zeros((0, len(F), len(F)))
-        raise NotImplementedError("calc_W_dHyper is not implemented")
+        return self.calc_W_dHyper_sparse(y, F).to_dense()
+
+    ## calc_W_dHyper_sparse
+    # Calculate the derivative of the W matrix with respect to hyper parameters
+    # as a SparseDerivative (order 2) with a leading dimension for each hyperparameter.
+    # @param y - the label for the given probit
+    # @param F - the vector of F (estimated training sample outputs)
+    #
+    # @return SparseDerivative
+    def calc_W_dHyper_sparse(self, y, F):
+        return SparseDerivative(np.zeros((0, 0)), np.zeros(0, dtype=int), None, len(F), 2)
 
     ## grad_hyper
     # Calculates the gradient of p(y|F) given the parameters of the probit
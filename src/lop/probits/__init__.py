@@ -1,6 +1,7 @@
 # init the probits subfolder
 
-from .ProbitBase import std_norm_pdf, std_norm_cdf, calc_pdf_cdf_ratio, ProbitBase
+from .ProbitBase import std_norm_pdf, std_norm_cdf, std_norm_log_cdf, calc_pdf_cdf_ratio, beta_logpdf, ProbitBase, SparseDerivative
 from .AbsBoundProbit import AbsBoundProbit #, numba_beta_pdf, numba_beta_pdf1, numba_beta_pdf2, numba_beta_pdf3, numba_beta_pdf4
 from .OrdinalProbit import OrdinalProbit
 from .PreferenceProbit import PreferenceProbit
+from .ListwiseProbit import ListwiseProbit, ListwiseDerivative
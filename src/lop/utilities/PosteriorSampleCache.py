@@ -0,0 +1,120 @@
+# Copyright 2026 Ian Rankin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE
+# FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+# PosteriorSampleCache.py
+# Written Ian Rankin - October 2026
+#
+# A cache of posterior samples drawn from a model, shared by the active learners.
+
+import numpy as np
+import hashlib
+from collections import OrderedDict
+
+
+## array_fingerprint
+# A hashable fingerprint of the contents of a numpy array, for use as a cache key.
+# @param X - the numpy array
+#
+# @return tuple (shape, dtype, hash of the data)
+def array_fingerprint(X):
+    X = np.ascontiguousarray(X)
+    return (X.shape, X.dtype.str, hashlib.blake2b(X.data, digest_size=16).hexdigest())
+
+## as_arrays
+# @param value - numpy array or tuple of numpy arrays
+#
+# @return tuple of numpy arrays
+def as_arrays(value):
+    return value if isinstance(value, tuple) else (value,)
+
+
+## PosteriorSampleCache
+# Stores posterior samples of a model (numpy arrays or tuples of numpy arrays)
+# for a single model version. Any get or put with a different version than the
+# stored samples clears the cache, so samples are never reused after the model
+# is changed. The least recently used entries are evicted when the samples
+# would use more than max_bytes.
+# Cached arrays are set to read only, as they are shared between callers.
+class PosteriorSampleCache:
+
+    ## constructor
+    # @param max_bytes - [opt default 256 MB] the maximum memory of the cached samples
+    def __init__(self, max_bytes=256*1024*1024):
+        self.max_bytes = max_bytes
+        self.version = None
+        self.entries = OrderedDict()
+        self.num_bytes = 0
+
+    ## clear
+    # removes all samples from the cache
+    def clear(self):
+        self.entries = OrderedDict()
+        self.num_bytes = 0
+
+    ## check_version
+    # clears the cache if the samples are from a different model version
+    # @param version - the current version of the model
+    def check_version(self, version):
+        if version != self.version:
+            self.clear()
+            self.version = version
+
+    ## get
+    # @param version - the current version of the model
+    # @param key - the key of the samples
+    #
+    # @return the cached samples or None if they are not in the cache
+    def get(self, version, key):
+        self.check_version(version)
+
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    ## put
+    # adds samples to the cache, evicting the least recently used samples if needed.
+    # @param version - the version of the model the samples are from
+    # @param key - the key of the samples
+    # @param value - numpy array or tuple of numpy arrays
+    #
+    # @return the (read only) value
+    def put(self, version, key, value):
+        self.check_version(version)
+
+        for arr in as_arrays(value):
+            arr.setflags(write=False)
+        size = sum(arr.nbytes for arr in as_arrays(value))
+
+        if key in self.entries:
+            old = self.entries.pop(key)
+            self.num_bytes -= sum(arr.nbytes for arr in as_arrays(old))
+        if size > self.max_bytes:
+            return value
+
+        self.entries[key] = value
+        self.num_bytes += size
+
+        while self.num_bytes > self.max_bytes:
+            _, old = self.entries.popitem(last=False)
+            self.num_bytes -= sum(arr.nbytes for arr in as_arrays(old))
+
+        return value
+
+    def __len__(self):
+        return len(self.entries)
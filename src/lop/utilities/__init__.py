@@ -1,13 +1,16 @@
 # init the utilities subfolder
 
-from .preference_pairs import get_dk, gen_pairs_from_idx, ranked_pairs_from_fake, generate_fake_pairs, generate_ranking_pairs, preference
+from .preference_pairs import get_dk, gen_pairs_from_idx, ranked_pairs_from_fake, generate_fake_pairs, generate_ranking_pairs, preference, merge_pairs, listwise_choice, listwise_ranking, pad_listwise
 from .training_utility import k_fold_x_y, get_y_with_idx, normalize_0_1
 from .human_choice_model import p_human_choice, sample_human_choice
 from .pareto import get_pareto
 from .FakeFunction import FakeFunction, FakeLinear, FakeSquared, FakeLogistic, FakeSinExp, FakeWeightedMax, FakeWeightedMin, FakeSquaredMinMax, FakeStaticSin, FakeMixtureGaussian, FakeIntegrate, FakeMinLog
 from .mcmc_sampling import metropolis_hastings, normal_prop_dist
 from .gamma_dist import pdf_gamma, log_pdf_gamma, d_log_pdf_gamma
-from .probability_utility import calc_cdf
+from .probability_utility import calc_cdf, calc_cdf_batch, genz_orthant_batch
 from .sample_utility import sample_unique_sets, sample_nonunique_sets
 from .synthetic_user import SyntheticUser, PerfectUser, HumanChoiceUser, sigmoid
 from .HumanChoiceUser2 import HumanChoiceUser2
+from .sparse_utility import SparseCholesky, pcg_solve
+from .structured_grid import StructuredGrid
+from .PosteriorSampleCache import PosteriorSampleCache, array_fingerprint
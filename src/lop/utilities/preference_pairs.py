@@ -71,6 +71,67 @@ def gen_pairs_from_idx(best_idx, indicies):
 
     return pairs
 
+## merge_pairs
+# Collapses repeated pairs into a single weighted record (dk, u, v, count).
+# (dk, u, v) and (-dk, v, u) are the same observation, so they are merged as well.
+# @param pairs - the pairs [(dk, u, v), ...] or weighted pairs [(dk, u, v, count), ...]
+#
+# @return numpy array (n, 4) of int of the unique pairs with their count
+def merge_pairs(pairs):
+    pairs = np.asarray(pairs, dtype=int)
+    if len(pairs) == 0:
+        return np.empty((0, 4), dtype=int)
+    if pairs.shape[1] > 3:
+        counts = pairs[:,3]
+    else:
+        counts = np.ones(len(pairs), dtype=int)
+
+    # order each pair so u < v
+    swap = pairs[:,1] > pairs[:,2]
+    key = np.empty((len(pairs), 3), dtype=int)
+    key[:,0] = np.where(swap, -pairs[:,0], pairs[:,0])
+    key[:,1] = np.where(swap, pairs[:,2], pairs[:,1])
+    key[:,2] = np.where(swap, pairs[:,1], pairs[:,2])
+
+    unique, inverse = np.unique(key, axis=0, return_inverse=True)
+    merged = np.empty((len(unique), 4), dtype=int)
+    merged[:,:3] = unique
+    merged[:,3] = np.bincount(inverse.reshape(-1), weights=counts, minlength=len(unique))
+
+    return merged
+
+## listwise_choice
+# Generates a listwise record of the best option chosen from the shown options,
+# to be passed to a preference GP with type='listwise' instead of the pairs from
+# gen_pairs_from_idx.
+# @param best_idx - the index that was determined to be best of the given indicies
+# @param indicies - the list of indicies shown (best_idx is allowed to be in indicies)
+#
+# @return - the listwise record (1, best_idx, other indicies...)
+def listwise_choice(best_idx, indicies):
+    return (1, best_idx) + tuple(idx for idx in indicies if idx != best_idx)
+
+## listwise_ranking
+# Generates a listwise record of a full ranking of the options
+# @param sorted_idx - the list of indicies sorted from best to worst
+#
+# @return - the listwise record (k-1, sorted_idx...)
+def listwise_ranking(sorted_idx):
+    return (len(sorted_idx)-1,) + tuple(sorted_idx)
+
+## pad_listwise
+# Converts listwise records of different lengths to a numpy array padded with -1
+# @param records - list of listwise records [(n_stages, idx_0, ..., idx_k-1), ...]
+#
+# @return numpy array (Q, 1+k) of int
+def pad_listwise(records):
+    width = max(len(r) for r in records)
+    y = np.full((len(records), width), -1, dtype=int)
+    for i, r in enumerate(records):
+        y[i,:len(r)] = r
+
+    return y
+
 ## ranked_pairs_from_fake
 # generates a all of the ranked pairs from fake inputs
 #
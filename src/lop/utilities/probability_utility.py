@@ -4,12 +4,19 @@
 # utility funcion for functions to handle probabilistic models.
 # In this approximate CDF of gaussian models.
 #
-# This uses the approxcdf library
+# The default method is an in-package randomized quasi-Monte Carlo
+# implementation of Genz's separation of variables algorithm.
+# Numerical Computation of Multivariate Normal Probabilities (1992)
+# Alan Genz
+#
+# The 'mvn' method uses the approxcdf library
 # https://approxcdf.readthedocs.io/en/latest/
 
+import math
 import numpy as np
 
 from scipy.stats import multivariate_normal
+from scipy.stats import qmc
 import scipy.special as spec
 
 # https://approxcdf.readthedocs.io/en/latest/
@@ -19,15 +26,172 @@ import scipy.special as spec
 try:
     import approxcdf
 except:
-    print('Cannot import approxcdf, any function which uses this, will not work')
+    print('Cannot import approxcdf, the mvn method of calc_cdf will not work')
+
+# smallest and largest probabilities passed to the inverse normal cdf
+_min_p = 1e-300
+_max_p = 1.0 - 1e-16
+
+try:
+    import numba
+
+    ## _norm_cdf
+    # the cdf of the standard normal of a single value
+    @numba.njit
+    def _norm_cdf(x):
+        return 0.5*math.erfc(-x*0.7071067811865476)
+
+    ## _norm_ppf
+    # the inverse cdf of the standard normal of a single value (0 < p < 1)
+    # Algorithm AS 241 (1988) Michael Wichura, accurate to about 1e-16
+    @numba.njit
+    def _norm_ppf(p):
+        q = p - 0.5
+        if abs(q) <= 0.425:
+            r = 0.180625 - q*q
+            return q * (((((((2509.0809287301226727*r + 33430.575583588128105)*r
+                        + 67265.770927008700853)*r + 45921.953931549871457)*r
+                        + 13731.693765509461125)*r + 1971.5909503065514427)*r
+                        + 133.14166789178437745)*r + 3.387132872796366608) \
+                    / (((((((5226.495278852545925*r + 28729.085735721942674)*r
+                        + 39307.89580009271061)*r + 21213.794301586595867)*r
+                        + 5394.1960214247511077)*r + 687.1870074920579083)*r
+                        + 42.313330701600911252)*r + 1.0)
+
+        r = p if q < 0 else 1.0 - p
+        r = math.sqrt(-math.log(r))
+        if r <= 5.0:
+            r -= 1.6
+            val = (((((((7.7454501427834140764e-4*r + 0.0227238449892691845833)*r
+                        + 0.24178072517745061177)*r + 1.27045825245236838258)*r
+                        + 3.64784832476320460504)*r + 5.7694972214606914055)*r
+                        + 4.6303378461565452959)*r + 1.42343711074968357734) \
+                    / (((((((1.05075007164441684324e-9*r + 5.475938084995344946e-4)*r
+                        + 0.0151986665636164571966)*r + 0.14810397642748007459)*r
+                        + 0.68976733498510000455)*r + 1.6763848301838038494)*r
+                        + 2.05319162663775882187)*r + 1.0)
+        else:
+            r -= 5.0
+            val = (((((((2.01033439929228813265e-7*r + 2.71155556874348757815e-5)*r
+                        + 0.0012426609473880784386)*r + 0.026532189526576123093)*r
+                        + 0.29656057182850489123)*r + 1.7848265399172913358)*r
+                        + 5.4637849111641143699)*r + 6.6579046435011037772) \
+                    / (((((((2.04426310338993978564e-15*r + 1.4215117583164458887e-7)*r
+                        + 1.8463183175100546818e-5)*r + 7.868691311456132591e-4)*r
+                        + 0.0148753612908506148525)*r + 0.13692988092273580531)*r
+                        + 0.59983220655588793769)*r + 1.0)
+
+        return -val if q < 0 else val
+
+    ## _genz_orthant
+    # Genz's separation of variables estimate of P(L z <= b), z ~ N(0, I)
+    # averaged over the given quasi-random points.
+    # @param b - (n, d) the upper limits of each problem
+    # @param L - (n, d, d) the cholesky factor of the covariance of each problem
+    # @param W - (S, d-1) the quasi-random points in [0,1) shared by all problems
+    # @param out - [out] (n,) the probability of each problem
+    @numba.njit
+    def _genz_orthant(b, L, W, out):
+        n, d = b.shape
+        S = W.shape[0]
+        y = np.empty(d)
+        for k in range(n):
+            e_0 = _norm_cdf(b[k,0] / L[k,0,0])
+            total = 0.0
+            for s in range(S):
+                e = e_0
+                f = e_0
+                for i in range(1, d):
+                    if f == 0.0:
+                        break
+                    y[i-1] = _norm_ppf(min(max(W[s,i-1] * e, _min_p), _max_p))
+                    acc = 0.0
+                    for j in range(i):
+                        acc += L[k,i,j] * y[j]
+                    e = _norm_cdf((b[k,i] - acc) / L[k,i,i])
+                    f *= e
+                total += f
+            out[k] = total / S
+
+except ImportError:
+    print('Failed to import numba, the genz method of calc_cdf will be slower')
+
+    ## _genz_orthant
+    # Genz's separation of variables estimate of P(L z <= b), z ~ N(0, I)
+    # averaged over the given quasi-random points.
+    # @param b - (n, d) the upper limits of each problem
+    # @param L - (n, d, d) the cholesky factor of the covariance of each problem
+    # @param W - (S, d-1) the quasi-random points in [0,1) shared by all problems
+    # @param out - [out] (n,) the probability of each problem
+    def _genz_orthant(b, L, W, out):
+        n, d = b.shape
+        y = np.empty((n, W.shape[0], d))
+
+        e = np.repeat(spec.ndtr(b[:,0] / L[:,0,0])[:,np.newaxis], W.shape[0], axis=1)
+        f = np.copy(e)
+        for i in range(1, d):
+            y[:,:,i-1] = spec.ndtri(np.clip(W[np.newaxis,:,i-1] * e, _min_p, _max_p))
+            acc = np.einsum('nsj,nj->ns', y[:,:,:i], L[:,i,:i])
+            e = spec.ndtr((b[:,i,np.newaxis] - acc) / L[:,i,i,np.newaxis])
+            f *= e
+
+        out[:] = np.mean(f, axis=1)
+
+
+## genz_orthant_batch
+# Calculates the probability that each of a batch of normal random vectors are all
+# below 0 using randomized quasi-Monte Carlo integration of Genz's separation of variables.
+# The variables of each problem are ordered most restrictive first, and all problems
+# share one set of scrambled Sobol points.
+# @param mus - the means of the normal random distributions (n, d)
+# @param covs - the covariances of the normal random distributions (n, d, d)
+# @param num_pts - [opt default 1024] the number of quasi-random points (a power of 2)
+# @param seed - [opt default 0] the seed of the Sobol point scrambling, fixed by default so
+#               the same problems always give the same probabilities. None to re-randomize.
+#
+# @return numpy array of the probabilities (n,)
+def genz_orthant_batch(mus, covs, num_pts=1024, seed=0):
+    mus = np.asarray(mus, dtype=float)
+    covs = np.asarray(covs, dtype=float)
+    n, d = mus.shape
+    if d == 0:
+        return np.ones(n)
+
+    # order the variables by the probability of each being below 0 alone
+    std = np.sqrt(np.diagonal(covs, axis1=1, axis2=2))
+    order = np.argsort(-mus / std, axis=1)
+    b = -np.take_along_axis(mus, order, axis=1)
+    covs = covs[np.arange(n)[:,np.newaxis,np.newaxis], order[:,:,np.newaxis], order[:,np.newaxis,:]]
+
+    try:
+        L = np.linalg.cholesky(covs)
+    except np.linalg.LinAlgError:
+        jitter = 1e-10 * np.mean(np.diagonal(covs, axis1=1, axis2=2), axis=1)
+        L = np.linalg.cholesky(covs + jitter[:,np.newaxis,np.newaxis] * np.eye(d))
 
+    if d == 1:
+        return spec.ndtr(b[:,0] / L[:,0,0])
+
+    W = qmc.Sobol(d-1, scramble=True, seed=seed).random(num_pts)
+
+    p = np.empty(n)
+    _genz_orthant(np.ascontiguousarray(b), np.ascontiguousarray(L), W, p)
+    return p
+
+
+## calc_cdf
+# Calculates the probability that a normal random vector is all below 0.
 # @param mu - the mean of the normal random distribution
 # @param cov - the covariance of the normal random distribtuion
-# @param method - [opt - default 'auto'] the method to calculate the cdf [auto, full, independent] 
-# 
-def calc_cdf(mu, cov, method='mvn'):
+# @param method - [opt - default 'auto'] the method to calculate the cdf [auto, genz, full, independent, switch, mvn]
+#
+# @return the probability
+def calc_cdf(mu, cov, method='auto'):
     if method == 'auto':
-        method = 'mvn'
+        method = 'genz'
+
+    if method == 'genz':
+        return genz_orthant_batch(mu[np.newaxis], cov[np.newaxis])[0]
     
     if method == 'full':
         rv = multivariate_normal(mean=mu, cov=cov)
@@ -42,38 +206,51 @@ def calc_cdf(mu, cov, method='mvn'):
 
 
     elif method == 'switch':
+        # pairs of the most correlated remaining variables are eliminated together.
+        # eliminated rows and columns are masked with -1 rather than deleted.
         p = 1.0
-        cov = np.copy(cov)
-        mu = np.copy(mu)
-        mod_cov = np.abs(np.copy(cov))
-        np.fill_diagonal(mod_cov, 0)
-
-        while cov.shape[0] > 1:
-            idx = np.unravel_index(np.argmax(mod_cov), cov.shape)
-
-            #pdb.set_trace()
-
-            small_cov = np.array([  [cov[idx[0], idx[0]], cov[idx[0], idx[1]]], \
-                                    [cov[idx[1], idx[0]], cov[idx[1], idx[1]]]])
+        mod_cov = np.abs(cov).astype(float)
+        np.fill_diagonal(mod_cov, -1)
+        remaining = np.ones(len(mu), dtype=bool)
 
-            small_mu = np.array([mu[idx[0]], mu[idx[1]]])
+        while np.count_nonzero(remaining) > 1:
+            idx = np.unravel_index(np.argmax(mod_cov), mod_cov.shape)
 
+            small_cov = cov[np.ix_(idx, idx)]
+            small_mu = mu[list(idx)]
 
             rv = multivariate_normal(mean=small_mu, cov=small_cov)
             p *= rv.cdf(np.array([0,0]))
 
-            cov = np.delete(cov, idx, 0)
-            cov = np.delete(cov, idx, 1)
+            mod_cov[idx,:] = -1
+            mod_cov[:,idx] = -1
+            remaining[list(idx)] = False
 
-            mod_cov = np.delete(mod_cov, idx, 0)
-            mod_cov = np.delete(mod_cov, idx, 1)
-            mu = np.delete(mu, idx, 0)
-
-        if cov.shape[0] == 1:
-            p *= spec.ndtr((0 - mu[0]) / cov[0,0])
+        if np.count_nonzero(remaining) == 1:
+            i = np.flatnonzero(remaining)[0]
+            p *= spec.ndtr((0 - mu[i]) / cov[i,i])
 
         return p
-    
+
     elif method == 'mvn':
         return approxcdf.mvn_cdf(-mu, cov)
 
+
+## calc_cdf_batch
+# Calculates the probability that each of a batch of normal random vectors are all below 0.
+# The genz and independent methods are evaluated for the whole batch at once, the others per vector.
+# @param mus - the means of the normal random distributions (n, d)
+# @param covs - the covariances of the normal random distributions (n, d, d)
+# @param method - [opt - default 'auto'] the method to calculate the cdf [auto, genz, full, independent, switch, mvn]
+#
+# @return numpy array of the probabilities (n,)
+def calc_cdf_batch(mus, covs, method='auto'):
+    if method == 'auto':
+        method = 'genz'
+
+    if method == 'genz':
+        return genz_orthant_batch(mus, covs)
+    elif method == 'independent':
+        return np.prod(spec.ndtr((0 - mus) / np.diagonal(covs, axis1=1, axis2=2)), axis=1)
+
+    return np.array([calc_cdf(mus[i], covs[i], method=method) for i in range(len(mus))])
@@ -0,0 +1,127 @@
+# Copyright 2026 Ian Rankin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE
+# FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+# sparse_utility.py
+# Written Ian Rankin - October 2026
+#
+# Utility functions for sparse symmetric positive definite matrices (sparse covariance
+# matrices from compactly supported kernels).
+# The factorization uses CHOLMOD from scikit-sparse if it is installed, otherwise falls
+# back to the scipy sparse LU (SuperLU) with a symmetric ordering and no pivoting.
+
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+
+try:
+    from sksparse.cholmod import cholesky as cholmod_cholesky
+except ImportError:
+    cholmod_cholesky = None
+
+
+## SparseCholesky
+# Factors a sparse symmetric positive definite matrix K once, then allows
+# solving K x = b and calculating log det(K) from the factor.
+class SparseCholesky:
+
+    ## constructor
+    # @param K - the sparse symmetric positive definite matrix (n,n)
+    # @param backend - [opt default 'auto'] the backend to factor K with
+    #                   ['auto', 'cholmod', 'splu'], auto uses cholmod if installed.
+    def __init__(self, K, backend='auto'):
+        K = sp.csc_matrix(K)
+
+        if backend == 'auto':
+            backend = 'splu' if cholmod_cholesky is None else 'cholmod'
+        self.backend = backend
+
+        if backend == 'cholmod':
+            if cholmod_cholesky is None:
+                raise ImportError('SparseCholesky cholmod backend requires scikit-sparse')
+            self.factor = cholmod_cholesky(K)
+        elif backend == 'splu':
+            # K is SPD, so no pivoting is needed and the ordering is kept symmetric.
+            self.factor = spla.splu(K, permc_spec='MMD_AT_PLUS_A', diag_pivot_thresh=0.0,
+                                    options={'SymmetricMode': True})
+            if (self.factor.U.diagonal() <= 0).any():
+                raise np.linalg.LinAlgError('SparseCholesky matrix is not positive definite')
+        else:
+            raise ValueError('SparseCholesky given an unknown backend: ' + str(backend))
+
+    ## solve
+    # solves K x = b
+    # @param b - the right hand side (n,) or (n,m)
+    #
+    # @return x with the same shape as b
+    def solve(self, b):
+        if self.backend == 'cholmod':
+            return self.factor(b)
+        else:
+            return self.factor.solve(b)
+
+    ## logdet
+    # @return log det(K)
+    def logdet(self):
+        if self.backend == 'cholmod':
+            return self.factor.logdet()
+        else:
+            # L has a unit diagonal, so the determinant is the product of U's diagonal
+            return np.sum(np.log(self.factor.U.diagonal()))
+
+
+## pcg_solve
+# Solves A x = b with the preconditioned conjugate gradient method, where A is a
+# symmetric positive definite matrix only given by its product with a vector.
+# @param A_mul - function computing A @ x
+# @param b - the right hand side (n,)
+# @param M_mul - [opt default None] function applying the (SPD) preconditioner M^-1 @ r
+# @param tol - [opt default 1e-8] relative tolerance of the residual norm to stop at
+# @param max_itr - [opt default None (n)] maximum number of iterations
+#
+# @return x (n,)
+def pcg_solve(A_mul, b, M_mul=None, tol=1e-8, max_itr=None):
+    if M_mul is None:
+        M_mul = lambda r: r
+    if max_itr is None:
+        max_itr = len(b)
+
+    x = np.zeros(len(b))
+    r = np.array(b, dtype=float)
+    b_norm = np.linalg.norm(b)
+    if b_norm == 0:
+        return x
+
+    z = M_mul(r)
+    p = z
+    rz = r @ z
+
+    for i in range(max_itr):
+        Ap = A_mul(p)
+        step = rz / (p @ Ap)
+        x = x + step * p
+        r = r - step * Ap
+
+        if np.linalg.norm(r) <= tol * b_norm:
+            break
+
+        z = M_mul(r)
+        rz_new = r @ z
+        p = z + (rz_new / rz) * p
+        rz = rz_new
+
+    return x
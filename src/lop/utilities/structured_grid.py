@@ -0,0 +1,172 @@
+# Copyright 2026 Ian Rankin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE
+# FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+# structured_grid.py
+# Written Ian Rankin - October 2026
+#
+# Structured kernel interpolation (KISS-GP) on a regular grid.
+# The covariance of a stationary kernel between the points of a regular grid is a
+# (multi-level) Toeplitz matrix, so products with it are computed with FFTs in
+# O(M log M) for M grid points. The cross covariance to off-grid points is approximated
+# by local (multilinear) interpolation of the grid, K_UX ~= K_UU W^T.
+# Kernel Interpolation for Scalable Structured Gaussian Processes (KISS-GP) (2015)
+# Andrew Gordon Wilson, Hannes Nickisch
+
+import numpy as np
+import scipy.sparse as sp
+import scipy.fft
+
+
+## StructuredGrid
+# A regular grid of points (the cartesian product of evenly spaced axes), with fast
+# products with the covariance matrix of a stationary kernel over the grid.
+# The grid points are ordered as np.meshgrid(*axes, indexing='ij') flattened.
+class StructuredGrid:
+
+    ## constructor
+    # @param cov_func - the stationary covariance function (KernelFunc)
+    # @param axes - list of evenly spaced 1D numpy arrays, one for each dimension
+    #               (a single 1D array is treated as a 1D grid)
+    # @param max_cols - [opt default 64] the max number of columns multiplied at a time
+    #                   by matmul (bounds the memory used by the FFTs)
+    def __init__(self, cov_func, axes, max_cols=64):
+        if not getattr(cov_func, 'stationary', False):
+            raise ValueError('StructuredGrid requires a stationary kernel function')
+
+        if isinstance(axes, np.ndarray) and len(axes.shape) == 1:
+            axes = [axes]
+        self.axes = [np.asarray(ax, dtype=float) for ax in axes]
+        self.shape = tuple(len(ax) for ax in self.axes)
+        self.max_cols = max_cols
+
+        self.step = np.empty(len(self.axes))
+        for k, ax in enumerate(self.axes):
+            if len(ax) > 1:
+                diff = np.diff(ax)
+                if diff[0] <= 0 or not np.allclose(diff, diff[0]):
+                    raise ValueError('StructuredGrid axes must be increasing and evenly spaced')
+                self.step[k] = diff[0]
+            else:
+                self.step[k] = 1.0
+
+        self.points = np.stack([g.ravel() for g in np.meshgrid(*self.axes, indexing='ij')], axis=1)
+
+        ##### kernel values at each offset between grid points
+        # the offsets are laid out in FFT order [0, 1, ..., n-1, 0, ..., 0, -(n-1), ..., -1]
+        # along each axis, embedding the Toeplitz matrix in a circulant of size >= (2n-1)
+        # per axis (padded to a fast FFT length).
+        self.embed_shape = tuple(scipy.fft.next_fast_len(2*n - 1, real=True) for n in self.shape)
+        offset_idx = [np.append(np.arange(n), np.arange(L-n+1, L)) \
+                                for n, L in zip(self.shape, self.embed_shape)]
+        offset_axes = [np.append(np.arange(n), -np.arange(n-1, 0, -1)) * h \
+                                for n, h in zip(self.shape, self.step)]
+        offsets = np.stack([g.ravel() for g in np.meshgrid(*offset_axes, indexing='ij')], axis=1)
+
+        # the kernel is evaluated between the offsets and a single zero point, so
+        # no noise is added (the covariance is not square)
+        k_offsets = cov_func.cov(offsets, np.zeros((1, len(self.axes))))
+        if sp.issparse(k_offsets):
+            k_offsets = k_offsets.toarray()
+
+        k_embed = np.zeros(self.embed_shape)
+        k_embed[np.ix_(*offset_idx)] = np.reshape(k_offsets, tuple(len(o) for o in offset_axes))
+
+        self.fft_axes = tuple(range(len(self.axes)))
+        self.k_fft = scipy.fft.rfftn(k_embed, axes=self.fft_axes)
+
+    def __len__(self):
+        return self.points.shape[0]
+
+    ## matmul
+    # the product of the covariance matrix of the grid points with V, K_UU @ V
+    # @param V - numpy array (M,) or (M, m)
+    #
+    # @return K_UU @ V with the same shape as V
+    def matmul(self, V):
+        V = np.asarray(V, dtype=float)
+        if len(V.shape) == 1:
+            return self.matmul(V[:,np.newaxis])[:,0]
+
+        out = np.empty(V.shape)
+        slices = tuple(slice(0, n) for n in self.shape)
+        for start in range(0, V.shape[1], self.max_cols):
+            stop = min(V.shape[1], start + self.max_cols)
+
+            V_grid = np.reshape(V[:,start:stop], self.shape + (stop - start,))
+            V_fft = scipy.fft.rfftn(V_grid, s=self.embed_shape, axes=self.fft_axes, workers=-1)
+            KV = scipy.fft.irfftn(V_fft * self.k_fft[..., np.newaxis], s=self.embed_shape,
+                                    axes=self.fft_axes, workers=-1)
+
+            out[:,start:stop] = np.reshape(KV[slices], (len(self), stop - start))
+        return out
+
+    ## interp_weights
+    # the sparse multilinear interpolation weights from the grid to the samples X.
+    # Samples outside of the grid are clamped to the closest edge of the grid.
+    # @param X - samples (n,k) numpy array
+    #
+    # @return W - scipy.sparse.csr_matrix (n, M), where f(X) ~= W @ f(grid)
+    def interp_weights(self, X):
+        if len(X.shape) == 1:
+            X = X[:,np.newaxis]
+        n = X.shape[0]
+
+        lower = []
+        frac = []
+        for k, ax in enumerate(self.axes):
+            if len(ax) == 1:
+                lower.append(np.zeros(n, dtype=int))
+                frac.append(np.zeros(n))
+                continue
+            pos = np.clip((X[:,k] - ax[0]) / self.step[k], 0, len(ax) - 1)
+            idx = np.minimum(np.floor(pos).astype(int), len(ax) - 2)
+            lower.append(idx)
+            frac.append(pos - idx)
+
+        rows = []
+        cols = []
+        vals = []
+        # each sample is interpolated from the 2^k corners of its grid cell
+        for corner in range(2**len(self.axes)):
+            idx = []
+            weight = np.ones(n)
+            for k in range(len(self.axes)):
+                upper = (corner >> k) & 1
+                if self.shape[k] == 1 and upper:
+                    weight = np.zeros(n)
+                    idx.append(lower[k])
+                    continue
+                idx.append(lower[k] + upper)
+                weight = weight * (frac[k] if upper else 1 - frac[k])
+
+            rows.append(np.arange(n))
+            cols.append(np.ravel_multi_index(idx, self.shape))
+            vals.append(weight)
+
+        return sp.csr_matrix((np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+                            shape=(n, len(self)))
+
+    ## cross_cov_matmul
+    # the product of the (interpolated) cross covariance between the grid
+    # points and the samples X with V, K_UX @ V ~= K_UU @ (W^T @ V)
+    # @param X - samples (n,k) numpy array
+    # @param V - numpy array (n,) or (n, m)
+    #
+    # @return K_UX @ V, (M,) or (M, m)
+    def cross_cov_matmul(self, X, V):
+        return self.matmul(self.interp_weights(X).T @ V)
@@ -55,6 +55,13 @@ def k_fold_x_y(X, y, k):
             conn[pair[1]].add(pair[2])
             conn[pair[2]].add(pair[1])
 
+    # listwise records connect all of the options of the query
+    if len(y) > 3 and y[3] is not None:
+        for record in y[3]:
+            options = record[1:][record[1:] >= 0]
+            for u in options:
+                conn[u].update(options[options != u])
+
     
 
     conn = [list(conn[i]) for i in range(N)]
@@ -97,14 +104,14 @@ def get_y_with_idx(y, indicies):
     for i in range(len(indicies)):
         idx_mapping[indicies[i]] = i
 
-    y_new = [None, None, None]
+    y_new = [None] * len(y)
 
     if y[0] is not None:
         for pair in y[0]:
             if pair[1] in idx_set and pair[2] in idx_set:
                 if y_new[0] is None:
                     y_new[0] = []
-                y_new[0].append(np.array([pair[0], idx_mapping[pair[1]], idx_mapping[pair[2]]]))
+                y_new[0].append(np.array([pair[0], idx_mapping[pair[1]], idx_mapping[pair[2]]] + list(pair[3:])))
 
         if y_new[0] is not None:
             y_new[0] = np.array(y_new[0])
@@ -132,6 +139,17 @@ def get_y_with_idx(y, indicies):
         if len(y_new_1) > 0:
             y_new[2] = (np.array(y_new_0), np.array(y_new_1))
 
+    # listwise records are kept if all of the options are in the indicies
+    if len(y) > 3 and y[3] is not None:
+        y_new_3 = []
+        for record in y[3]:
+            options = record[1:]
+            if all(u in idx_set for u in options if u >= 0):
+                y_new_3.append([record[0]] + [idx_mapping[u] if u >= 0 else -1 for u in options])
+
+        if len(y_new_3) > 0:
+            y_new[3] = np.array(y_new_3, dtype=int)
+
 
     return y_new
 
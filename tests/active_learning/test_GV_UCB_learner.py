@@ -108,3 +108,18 @@ def test_GV_UCB_learner_trains_preference_GP():
 
     assert (np.abs(y_pred - y_test) < 0.5).all()
 
+
+def test_GV_UCB_generalized_variance_matches_det():
+    al = lop.GV_UCBLearner()
+    A = np.random.random((8, 8))
+    cov = A @ A.T + np.eye(8) * 0.1
+
+    indicies = [0, 2, 5, 6, 7]
+    assert np.allclose(al.generalized_variance(cov, [], indicies), cov[indicies, indicies])
+
+    for prev in [[1], [1, 4], [3, 1, 4]]:
+        GV = al.generalized_variance(cov, prev, indicies)
+        GV_det = [np.linalg.det(cov[np.ix_(prev+[idx], prev+[idx])]) for idx in indicies]
+
+        assert GV.shape == (len(indicies),)
+        assert np.allclose(GV, GV_det)
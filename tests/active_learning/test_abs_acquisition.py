@@ -53,3 +53,44 @@ def test_acquisition_selection_basic():
     sel_idx = al.select_greedy(x_canidiates, mu, None, {2,3,4,5}, [0,1])
 
     assert sel_idx > 0 and sel_idx < len(x_canidiates)
+
+
+def test_fast_sum_Q():
+    from lop.active_learning.AbsAcquisition import fast_sum_Q
+    rng = np.random.default_rng(0)
+    M = 20
+    f = rng.random((M, M))
+    p_q_w = rng.random((M, 6))
+    p_q = np.mean(p_q_w, axis=0)
+
+    expected = np.einsum('ij,ia,ja->a', f, p_q_w, p_q_w) / p_q / (M * M)
+
+    assert np.allclose(fast_sum_Q(p_q_w, p_q, f, M), expected)
+
+def test_gauss_legendre_01():
+    from lop.active_learning.AbsAcquisition import gauss_legendre_01
+    nodes, weights = gauss_legendre_01(10, 0.2, 0.7)
+
+    assert np.all(nodes > 0.2) and np.all(nodes < 0.7)
+    assert np.isclose(np.sum(weights), 0.5)
+    assert np.isclose(weights @ nodes**5, (0.7**6 - 0.2**6) / 6)
+
+def test_abs_acquisition_fixed_quadrature_matches_adaptive():
+    from scipy.integrate import quad_vec
+    from lop.active_learning.AbsAcquisition import pq_integrand
+    rng = np.random.default_rng(0)
+    M = 100
+    F = rng.normal(size=(M, 8))
+    aa, bb = lop.AbsBoundProbit().get_alpha_beta(F)
+    f = np.corrcoef(rng.normal(size=(M, 5)))
+
+    expected, _ = quad_vec(pq_integrand, 0.0001, 0.9999, epsrel=1e-6, args=(aa, bb, f))
+
+    al = lop.AbsAcquisition(num_nodes=200)
+    integ = al.integrate_p_q_fixed(aa, bb, f)
+    assert integ.shape == (8,)
+    assert np.allclose(integ, expected, rtol=1e-4)
+
+    # force chunks of a few nodes
+    al.max_batch_elements = 3 * M * 8
+    assert np.allclose(al.integrate_p_q_fixed(aa, bb, f), integ)
@@ -87,6 +87,8 @@ def test_acquisition_selection_basic():
     
     sel_idx = np.empty(10)
     for i in range(10):
+        # draw new posterior samples for each repeat
+        model.sample_cache.clear()
         mu, sigma = model.predict(x_canidiates)
         sel_idx[i] = al.select_greedy(x_canidiates, mu, None, {2,3,4,5}, [0,1])
 
@@ -265,3 +267,35 @@ def test_acquisition_selection_trains_linear():
     assert np.argmax(y_pred) == np.argmax(y_test)
 
 
+
+
+def test_quick_calculation_sum_align_q():
+    from lop.active_learning.AcquisitionSelection import quick_calculation_sum_align_q
+    rng = np.random.default_rng(0)
+    f = rng.random((20, 20))
+    p_q = rng.random((20, 5, 5))
+
+    expected = np.einsum('ij,iab,jab->ab', f, p_q, p_q)
+
+    assert np.allclose(quick_calculation_sum_align_q(f, p_q), expected)
+
+## the [w, w', q, Q_new] tensor expansion select_greedy used before the bilinear form
+def expanded_sum_align_q(f, p_q):
+    M = p_q.shape[0]
+    f_expand = np.repeat(np.repeat(f[:,:,np.newaxis], p_q.shape[1],axis=2)[:,:,:,np.newaxis], p_q.shape[2], axis=3)
+    p_q_w0 = np.repeat(p_q[np.newaxis, :,:,:], M, axis=0)
+    p_q_w1 = np.repeat(p_q[:, np.newaxis,:,:], M, axis=1)
+    return np.sum(p_q_w0 * p_q_w1 * f_expand, axis=(0,1))
+
+@pytest.mark.parametrize('M, q, N', [(12, 3, 1), (9, 2, 7), (15, 4, 3), (1, 3, 5)])
+def test_quick_calculation_sum_align_q_matches_expansion(M, q, N):
+    from lop.active_learning.AcquisitionSelection import quick_calculation_sum_align_q
+    rng = np.random.default_rng(M * 100 + q * 10 + N)
+    # the alignment is not symmetric in general
+    f = rng.standard_normal((M, M))
+    p_q = rng.random((M, q, N))
+
+    result = quick_calculation_sum_align_q(f, p_q)
+
+    assert result.shape == (q, N)
+    assert np.allclose(result, expanded_sum_align_q(f, p_q))
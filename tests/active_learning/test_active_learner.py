@@ -280,3 +280,100 @@ def test_select_return_not_selected_with_pareto_pref():
     sel_idxs, not_selected = al.select(pts, 5, return_not_selected=True, prefer_pts='pareto')
     assert (sel_idxs == np.array([3,5,2,0,1])).all()
     assert (not_selected == np.array([])).all()
+
+
+def test_sample_posterior_cache():
+    al = lop.UCBLearner()
+    model = lop.PreferenceGP(lop.RBF_kern(0.5, 0.7), active_learner=al)
+    model.add(np.array([0, 1, 2, 3]), [lop.preference(2, 0), lop.preference(2, 1), lop.preference(3, 2)])
+
+    x_canidiates = np.array([0.5, 1.5, 2.5])
+    samples = al.sample_posterior(x_canidiates, 50)
+
+    assert samples.shape == (50, 3)
+    assert al.sample_posterior(x_canidiates, 50) is samples
+    assert al.sample_posterior(x_canidiates, 20) is not samples
+    assert al.sample_posterior(x_canidiates[:2], 50) is not samples
+
+    # changing the model draws new samples
+    model.add(np.array([4, 5]), [lop.preference(0, 1)])
+    assert al.sample_posterior(x_canidiates, 50) is not samples
+
+    samples = al.sample_posterior(x_canidiates, 50)
+    model.set_hyper(model.get_hyper())
+    assert al.sample_posterior(x_canidiates, 50) is not samples
+
+    # parameters set directly on the kernel or probits (without set_hyper)
+    samples = al.sample_posterior(x_canidiates, 50)
+    model.cov_func.set_param(model.cov_func.get_param() * 2)
+    assert al.sample_posterior(x_canidiates, 50) is not samples
+
+    samples = al.sample_posterior(x_canidiates, 50)
+    model.probits[0].set_sigma(model.probits[0].sigma * 2)
+    assert al.sample_posterior(x_canidiates, 50) is not samples
+
+    # a probit whose parameters are not optimized (not part of get_hyper)
+    samples = al.sample_posterior(x_canidiates, 50)
+    model.probits[model.probit_idxs['abs']].set_sigma(3.0)
+    assert al.sample_posterior(x_canidiates, 50) is not samples
+    assert al.sample_posterior(x_canidiates, 50) is al.sample_posterior(x_canidiates, 50)
+
+
+def test_sample_linear_weights_cache_probit_changed():
+    al = lop.UCBLearner()
+    model = lop.PreferenceLinear(active_learner=al)
+    X = np.array([[0.0, 1.0], [1.0, 0.0], [0.5, 0.5]])
+    model.add(X, [lop.preference(1, 0), lop.preference(1, 2)])
+
+    w_samples = al.sample_linear_weights(2, 20)
+    assert al.sample_linear_weights(2, 20) is w_samples
+
+    model.probits[0].set_sigma(model.probits[0].sigma * 2)
+    assert al.sample_linear_weights(2, 20) is not w_samples
+
+def test_best_difference_dists_matches_loop():
+    al = lop.ActiveLearner()
+    N = 6
+    A = np.random.random((N, N))
+    K = A @ A.T + np.eye(N)
+    mu = np.random.random(N)
+
+    mu_star, K_star = al.best_difference_dists(mu, K)
+    assert mu_star.shape == (N, N-1)
+    assert K_star.shape == (N, N-1, N-1)
+
+    for i in range(N):
+        idx_i = [j for j in range(N) if j != i]
+        K_star_i = np.zeros((N-1, N-1))
+        for j in range(N-1):
+            for k in range(N-1):
+                K_star_i[j,k] = K[i, i] + K[idx_i[j], idx_i[k]] - K[i, idx_i[j]] - K[i, idx_i[k]]
+
+        assert np.allclose(K_star[i], K_star_i)
+        assert np.allclose(mu_star[i], mu[idx_i] - mu[i])
+
+    mu_star_sub, K_star_sub = al.best_difference_dists(mu, K, [4, 1])
+    assert np.allclose(K_star_sub, K_star[[4, 1]])
+    assert np.allclose(mu_star_sub, mu_star[[4, 1]])
+
+def test_p_B_pref_gp_sampled_matches_cdf():
+    al = lop.UCBLearner()
+    model = lop.PreferenceGP(lop.RBF_kern(0.5, 0.7), active_learner=al)
+    model.add(np.array([0, 1, 2, 3]), [lop.preference(2, 0), lop.preference(2, 1), lop.preference(3, 2)])
+
+    x_canidiates = np.array([0.5, 1.5, 2.5, 3.0])
+    mu, _ = model.predict(x_canidiates)
+
+    p_full = al.p_B_pref_gp(x_canidiates, mu, cdf_method='full')
+    assert p_full.shape == (4,)
+    assert np.isclose(np.sum(p_full), 1.0)
+
+    # blocks of a single candidate give the same result
+    al.max_batch_elements = 1
+    assert np.allclose(al.p_B_pref_gp(x_canidiates, mu, cdf_method='full'), p_full, atol=1e-3)
+
+    al.p_B_method = 'sampled'
+    al.p_B_num_samples = 20000
+    p_sampled = al.p_B_pref_gp(x_canidiates, mu)
+    assert np.isclose(np.sum(p_sampled), 1.0)
+    assert np.allclose(p_sampled, p_full, atol=0.05)
@@ -61,3 +61,55 @@ def test_bayes_info_gain_basic():
     uni, counts = np.unique(sel_idx, return_counts=True)
     count_dict = dict(zip(uni, counts))
     assert count_dict[3] > 5
+
+
+def test_bayes_info_gain_H_B_Q_batch():
+    try:
+        al = lop.BayesInfoGain(p_q_B_method='99')
+    except:
+        print('approxcdf not on this machine, cannot properly test this.')
+        return
+
+    rng = np.random.default_rng(0)
+    N = 20
+    probit_mat = lop.PreferenceProbit(0.5).likelihood_all_pairs(rng.standard_normal(N))
+    p_B = rng.random(N)
+    p_B = p_B / np.sum(p_B)
+
+    Qs = np.array([[3, 7, i] for i in range(N) if i not in (3, 7)])
+    H_B_Q = al.calc_H_B_Q_batch(Qs, p_B, probit_mat)
+
+    # force small chunks
+    al.max_batch_elements = 100
+    H_B_Q_chunked = al.calc_H_B_Q_batch(Qs, p_B, probit_mat)
+
+    assert H_B_Q.shape == (len(Qs),)
+    assert np.allclose(H_B_Q, H_B_Q_chunked)
+    for i, Q in enumerate(Qs):
+        assert np.isclose(al.calc_H_B_Q(Q, p_B, probit_mat), H_B_Q[i])
+
+
+def test_bayes_info_gain_H_B_q_pairs_chunked():
+    try:
+        al = lop.BayesInfoGain()
+    except:
+        print('approxcdf not on this machine, cannot properly test this.')
+        return
+
+    rng = np.random.default_rng(0)
+    N = 15
+    probit_mat = lop.PreferenceProbit(0.5).likelihood_all_pairs(rng.standard_normal(N))
+    p_B = rng.random(N)
+    p_B = p_B / np.sum(p_B)
+
+    H_B_q = al.calc_H_B_q_pairs(p_B, probit_mat)
+
+    # force blocks of a couple rows
+    al.max_batch_elements = 2 * N * N
+    H_B_q_chunked = al.calc_H_B_q_pairs(p_B, probit_mat)
+
+    assert H_B_q.shape == (N, N)
+    assert np.allclose(H_B_q, H_B_q_chunked)
+    # the same item shown twice gives no information
+    H_B = -np.sum(p_B * np.log(p_B))
+    assert np.allclose(np.diagonal(H_B_q), H_B)
@@ -105,3 +105,43 @@ def test_mutual_info_trains_linear():
     assert np.argmax(y_pred) == np.argmax(y_test)
 
 
+
+def test_mutual_info_batch_matches_single():
+    al = lop.MutualInfoLearner()
+    all_w = np.random.normal(size=(al.M, 10)) * 3
+
+    Qs = np.array([[1, 4, i] for i in [0, 2, 3, 5, 9]])
+    info_gain = al.calc_info_gain_batch(Qs, all_w)
+
+    assert info_gain.shape == (len(Qs),)
+    for i, Q in enumerate(Qs):
+        p = lop.p_human_choice(all_w[:,Q], al.peakiness)
+        sum_p_over_w = np.sum(p, axis=0)
+        expected = np.sum(p * np.log2(al.M * p / sum_p_over_w)) / al.M
+
+        assert np.isclose(info_gain[i], expected)
+        assert np.isclose(al.calc_info_gain(list(Q), all_w), expected)
+
+    # force small chunks
+    al.max_batch_elements = 1
+    assert np.allclose(al.calc_info_gain_batch(Qs, all_w), info_gain)
+
+def test_mutual_info_large_rewards_stable():
+    al = lop.MutualInfoLearner()
+    all_w = np.random.normal(size=(al.M, 6)) * 1000
+
+    info_gain = al.calc_info_gain_batch(np.array([[0, i] for i in range(1, 6)]), all_w)
+    assert np.all(np.isfinite(info_gain))
+
+def test_mutual_info_zero_probability_choice():
+    al = lop.MutualInfoLearner()
+    # choice 0 of the first query has probability 0 for every sample
+    all_w = np.array([[0, 1000, 0], [0, 1000, 1000]], dtype=float)
+
+    with np.errstate(divide='raise', invalid='raise'):
+        info_gain = al.calc_info_gain_batch(np.array([[0, 1], [0, 2]]), all_w)
+
+    # p of the second query is [[0.5, 0.5], [0, 1]]
+    expected = (0.5 * np.log2(2) + 0.5 * np.log2(2 * 0.5 / 1.5) + np.log2(2 / 1.5)) / 2
+    assert np.isclose(info_gain[0], 0)
+    assert np.isclose(info_gain[1], expected)
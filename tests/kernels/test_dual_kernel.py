@@ -113,5 +113,3 @@ def test_combined_grad_param_liklihood():
     d_liklihood = rbf.grad_param_likli()
     assert not np.isnan(d_liklihood).any()
     assert len(d_liklihood) == 8
-
-
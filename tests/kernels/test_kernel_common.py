@@ -0,0 +1,82 @@
+# Copyright 2022 Ian Rankin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE
+# FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+# test_kernel_common.py
+# Written Ian Rankin - October 2026
+#
+# Checks shared by every kernel function: the fused covariance and gradient
+# against a finite difference, and the covariance diagonal.
+
+import pytest
+
+import lop
+import numpy as np
+import scipy.sparse as sp
+
+
+X_1d = np.array([1,3,4,5,6,7])
+Y_1d = np.array([-1,-0.5,0,1,2,3])
+X_2d = np.array([[0,1],[1,3],[4,2],[2,2]])
+Y_2d = np.array([[1,1],[0.5,2],[3,3]])
+
+# (name, kernel constructor, X, Y)
+kernels = [
+    ('rbf', lambda: lop.RBF_kern(1.3, 0.7), X_2d, Y_2d),
+    ('rbf_zeroed', lambda: lop.RBF_kern_zeroed(1.4, 0.9), X_1d, Y_1d),
+    ('rbf_rff', lambda: lop.RBF_kern_rff(1.3, 0.7, num_features=50, seed=3), X_2d, Y_2d),
+    ('periodic', lambda: lop.PeriodicKern(1.2, 0.8, 3.1), X_1d, Y_1d),
+    ('linear', lambda: lop.LinearKern(1.1, 0.7, 0.3), X_1d, Y_1d),
+    ('dual', lambda: lop.RBF_kern(1.3,0.7) * lop.PeriodicKern(1.2,0.8,3.1) + lop.LinearKern(1.1,0.7,0.3), X_1d, Y_1d),
+    ('wendland_0', lambda: lop.WendlandKern(1.3, 1.7, k=0), X_2d, Y_2d),
+    ('wendland_1', lambda: lop.WendlandKern(1.3, 1.7, k=1), X_2d, Y_2d),
+    ('wendland_2', lambda: lop.WendlandKern(1.3, 1.7, k=2), X_2d, Y_2d),
+]
+kernel_ids = [k[0] for k in kernels]
+
+
+def dense(cov):
+    return cov.toarray() if sp.issparse(cov) else cov
+
+
+@pytest.mark.parametrize('name, make_kern, X, Y', kernels, ids=kernel_ids)
+def test_cov_and_grad(name, make_kern, X, Y):
+    kern = make_kern()
+
+    cov, grad = kern.cov_and_grad(X,Y)
+
+    assert grad.shape == (len(kern), len(X), len(Y))
+    assert np.allclose(cov, dense(kern.cov(X,Y)))
+
+    # compare against a finite difference of the covariance matrix
+    eps = 1e-6
+    theta = kern.get_param()
+    for i in range(len(theta)):
+        theta_p = theta.copy()
+        theta_p[i] += eps
+        kern.set_param(theta_p)
+        cov_p = dense(kern.cov(X,Y))
+        kern.set_param(theta)
+
+        assert np.allclose(grad[i], (cov_p - cov) / eps, atol=1e-4)
+
+
+@pytest.mark.parametrize('name, make_kern, X, Y', kernels, ids=kernel_ids)
+def test_cov_diag(name, make_kern, X, Y):
+    kern = make_kern()
+
+    assert np.allclose(kern.cov_diag(X), np.diagonal(dense(kern.cov(X,X))))
@@ -87,4 +87,3 @@ def test_periodic_grad_param_liklihood():
     d_liklihood = rbf.grad_param_likli()
     assert not np.isnan(d_liklihood).any()
     assert len(d_liklihood) == 3
-
@@ -99,4 +99,4 @@ def test_rbf_kern_cov():
     assert c[-1,0] < 0.0001
     assert c[0,-1] < 0.0001
 
-    assert np.linalg.det(c) > 0
\ No newline at end of file
+    assert np.linalg.det(c) > 0
@@ -0,0 +1,50 @@
+# Copyright 2026 Ian Rankin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE
+# FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+# test_rbf_kernel_rff.py
+# Written Ian Rankin - October 2026
+#
+# 
+
+import pytest
+
+import lop
+import numpy as np
+
+
+
+def test_rff_approximates_rbf():
+    rbf = lop.RBF_kern(1.0, 0.8)
+    rff = lop.RBF_kern_rff(1.0, 0.8, num_features=4000, seed=3)
+
+    X = np.array([1,3,4,5,6,7])
+    Y = np.array([-1,-0.5,0,1,2,3])
+
+    assert np.abs(rff.cov(X,Y) - rbf.cov(X,Y)).max() < 0.1
+    assert np.abs(rff.cov(X,X) - rbf.cov(X,X)).max() < 0.1
+
+def test_rff_features():
+    rff = lop.RBF_kern_rff(1.0, 0.8, num_features=100, seed=3)
+
+    X = np.array([[0,1],[1,3],[4,2],[5,5]])
+
+    phi = rff.features(X)
+
+    assert phi.shape == (len(X), 100)
+    assert np.allclose(phi @ phi.T + np.eye(len(X))*rff.sigma_noise, rff.cov(X,X))
+    assert np.isclose(rff(X[0], X[1]), rff.cov(X,X)[0,1])
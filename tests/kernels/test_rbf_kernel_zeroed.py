@@ -98,4 +98,27 @@ def test_rbf_kern_cov():
     assert c[-1,0] < 0.0001
     assert c[0,-1] < 0.0001
 
-    assert np.linalg.det(c) > 0
\ No newline at end of file
+    assert np.linalg.det(c) > 0
+
+def test_rbf_zeroed_gradient_matches_grad():
+    rbf = lop.RBF_kern_zeroed(1.4, 0.9)
+
+    X = np.array([0,1,3,4,5,6,7])
+    Y = np.array([-1,-0.5,0,1,2,3])
+
+    cov, grad = rbf.cov_and_grad(X,Y)
+
+    for i,x1 in enumerate(X):
+        for j,x2 in enumerate(Y):
+            assert np.isclose(rbf(x1, x2), cov[i,j])
+            assert np.allclose(rbf.gradient(x1, x2), grad[:,i,j])
+
+
+def test_rbf_zeroed_modified_input_not_cached():
+    kern = lop.RBF_kern_zeroed(1, 1)
+    X = np.array([[1.],[2.]])
+    kern.cov(X,X)
+
+    X[0,0] = 5.
+    assert np.allclose(kern.cov(X,X), lop.RBF_kern_zeroed(1, 1).cov(X,X))
+    assert np.allclose(kern.cov_diag(X), lop.RBF_kern_zeroed(1, 1).cov_diag(X))
@@ -0,0 +1,70 @@
+# Copyright 2026 Ian Rankin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE
+# FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+# test_wendland_kernel.py
+# Written Ian Rankin - October 2026
+#
+# 
+
+import pytest
+
+import lop
+import numpy as np
+import scipy.sparse as sp
+
+
+
+def test_wendland_compact_support():
+    kern = lop.WendlandKern(1.0, 1.5)
+
+    X = np.array([0, 1, 2, 4, 8])
+    cov = kern.cov(X, X)
+
+    assert sp.issparse(cov)
+    cov = cov.toarray()
+    assert np.allclose(cov, cov.T)
+    assert cov[0,3] == 0 and cov[0,4] == 0 and cov[3,4] == 0
+    assert cov[0,1] > 0
+    assert np.allclose(np.diagonal(cov), kern.cov_diag(X))
+    assert np.all(np.linalg.eigvalsh(cov) > 0)
+
+@pytest.mark.parametrize('k', [0, 1, 2])
+def test_wendland_sparse_matches_dense(k):
+    kern = lop.WendlandKern(1.2, 0.9, k=k)
+    kern_dense = lop.WendlandKern(1.2, 0.9, k=k, sparse=False)
+
+    rng = np.random.default_rng(0)
+    X = rng.random((40, 2)) * 3
+    Y = rng.random((15, 2)) * 3
+
+    assert np.allclose(kern.cov(X,Y).toarray(), kern_dense.cov(X,Y))
+    assert np.allclose(kern.cov_and_grad(X,Y)[0], kern_dense.cov(X,Y))
+    assert np.isclose(kern(X[0], Y[3]), kern_dense.cov(X,Y)[0,3])
+
+@pytest.mark.parametrize('k', [0, 1, 2])
+def test_wendland_gradient_matches_grad(k):
+    kern = lop.WendlandKern(1.3, 1.7, k=k)
+
+    X = np.array([[0,1],[1,3],[4,2],[2,2]])
+    Y = np.array([[1,1],[0.5,2],[3,3]])
+
+    cov, grad = kern.cov_and_grad(X,Y)
+
+    for i in range(len(X)):
+        for j in range(len(Y)):
+            assert np.allclose(kern.gradient(X[i], Y[j]), grad[:,i,j])
@@ -72,3 +72,50 @@ def f_lin(x, data=None):
     return x[:,0]*x[:,1]
 
 
+
+
+def test_gp_variance_matches_cov():
+    X_train = np.array([0,1,2,3,6,7])
+    X = np.arange(-3, 12, 0.1)
+    y_train = np.array([1, 0.5,0, -1, 1, 2])
+
+    gp = lop.GP(lop.RBF_kern(1,1)+lop.LinearKern(3,1,0.3))
+    gp.add(X_train, y_train)
+
+    mu, sigma = gp.predict(X)
+
+    assert gp.cov.shape == (len(X), len(X))
+    assert np.allclose(sigma, np.maximum(0, np.diagonal(gp.cov)))
+
+    # the lazy covariance is of the prediction, not the current hyperparameters
+    mu, sigma = gp.predict(X)
+    gp.cov_func.set_param(gp.cov_func.get_param() * 5)
+    assert np.allclose(sigma, np.maximum(0, np.diagonal(gp.cov)))
+
+
+def test_gp_predict_grid_matches_predict():
+    rng = np.random.default_rng(0)
+    X_train = rng.random((15, 2)) * 3
+    y_train = np.sin(X_train[:,0]) + np.cos(X_train[:,1])
+
+    gp = lop.GP(lop.RBF_kern(1,1))
+    gp.add(X_train, y_train)
+
+    x = np.linspace(-0.5, 3.5, 60)
+    y = np.linspace(-0.5, 3.5, 50)
+    mu_grid, sigma_grid = gp.predict_grid([x, y])
+    assert np.allclose(sigma_grid, np.maximum(0, np.diagonal(gp.cov)))
+
+    X, Y = np.meshgrid(x, y, indexing='ij')
+    mu, sigma = gp.predict(np.stack([X.ravel(), Y.ravel()], axis=1))
+
+    assert mu_grid.shape == (len(x)*len(y),)
+    assert np.abs(mu - mu_grid).max() < 0.01
+    assert np.abs(sigma - sigma_grid).max() < 0.01
+
+def test_gp_predict_grid_non_stationary():
+    gp = lop.GP(lop.LinearKern(3,1,0.3))
+    gp.add(np.array([0,1,2]), np.array([1,0.5,0]))
+
+    with pytest.raises(ValueError):
+        gp.predict_grid([np.linspace(0, 2, 10)])
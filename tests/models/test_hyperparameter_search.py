@@ -6,6 +6,7 @@
 import pytest
 import numpy as np
 import random
+import copy
 import pdb
 
 import lop
@@ -267,3 +268,101 @@ def test_hyperparameter_search_somewhat_converges_abs_bound_pairs():
 
 
 
+
+
+@pytest.mark.parametrize('kern', [lop.RBF_kern(0.5, 0.7),
+                                  lop.RBF_kern(0.5, 0.7) * lop.RBF_kern(1.0, 2.0),
+                                  lop.RBF_kern(0.5, 0.7) + lop.PeriodicKern(0.5, 0.7, 3.0),
+                                  lop.RBF_kern_zeroed(0.5, 0.7, zero_pt=np.array([1.0]))])
+def test_hyperparameter_grid_matches_obj(kern):
+    m = lop.PreferenceGP(kern, hyperparam_only_probit=False)
+
+    X_train = np.array([0,1,2,3,4.2,6,7])
+    pairs = lop.generate_fake_pairs(X_train, f_sin, 0) + \
+            lop.generate_fake_pairs(X_train, f_sin, 2) + \
+            lop.generate_fake_pairs(X_train, f_sin, 4)
+    m.add(X_train, pairs)
+    m.optimize()
+
+    x0 = m.get_hyper()
+    thetas = np.array([x0, x0 * 0.7, x0 * 1.6])
+
+    grid = lop.HyperparameterGrid(m)
+    obj = grid.evaluate(thetas)
+    assert np.allclose(m.get_hyper(), x0)
+
+    expected = [m.hyperparameter_obj(theta, m.X_train, m.y_train, m.X_train, m.y_train, None) \
+                    for theta in thetas]
+    assert np.allclose(obj, expected)
+
+def test_hyperparameter_grid_shape():
+    m = lop.PreferenceGP(lop.RBF_kern(0.5, 0.7), hyperparam_only_probit=False)
+
+    X_train = np.array([0,1,2,3,4.2,6,7])
+    m.add(X_train, lop.generate_fake_pairs(X_train, f_sin, 0))
+
+    grid = lop.HyperparameterGrid(m)
+    probit_sigmas = np.linspace(0.1, 2.0, 4)
+    rbf_lengths = np.linspace(0.2, 3.0, 5)
+    obj = grid.evaluate_grid([probit_sigmas, 0.5, rbf_lengths])
+
+    assert obj.shape == (4, 5)
+    assert np.isclose(obj[1,2], grid.evaluate([probit_sigmas[1], 0.5, rbf_lengths[2]])[0])
+
+    with pytest.raises(ValueError):
+        grid.evaluate_grid([probit_sigmas, rbf_lengths])
+
+def test_hyperparameter_grid_each_does_not_mutate_model(monkeypatch):
+    m = lop.PreferenceGP(lop.PeriodicKern(0.5, 0.7, 10.0), hyperparam_only_probit=False)
+
+    X_train = np.array([0,1,2,3,4.2,6,7])
+    m.add(X_train, lop.generate_fake_pairs(X_train, f_sin, 0))
+
+    grid = lop.HyperparameterGrid(m)
+    x0 = m.get_hyper()
+    kern_param = m.cov_func.get_param()
+
+    def failing_obj(self, x, *args):
+        self.set_hyper(x)
+        raise RuntimeError('failed objective')
+    monkeypatch.setattr(lop.PreferenceGP, 'hyperparameter_obj', failing_obj)
+
+    with pytest.raises(RuntimeError):
+        grid.evaluate_each(np.array([x0 * 1.6]))
+    assert np.allclose(m.get_hyper(), x0)
+    assert np.allclose(m.cov_func.get_param(), kern_param)
+
+@pytest.mark.parametrize('kern', [lop.RBF_kern(0.5, 0.7), lop.PeriodicKern(0.5, 0.7, 10.0)])
+def test_hyperparameter_grid_kernel_axes_only_probit(kern):
+    m = lop.PreferenceGP(kern)
+
+    X_train = np.array([0,1,2,3,4.2,6,7])
+    pairs = lop.generate_fake_pairs(X_train, f_sin, 0) + \
+            lop.generate_fake_pairs(X_train, f_sin, 2)
+    m.add(X_train, pairs)
+    m.optimize()
+
+    grid = lop.HyperparameterGrid(m)
+    probit_sigmas = np.array([0.3, 1.0])
+    lengths = np.array([0.4, 0.9, 2.0])
+    kern_x0 = m.cov_func.get_param()
+    kern_axes = [None] * len(kern_x0)
+    kern_axes[1] = lengths
+    obj = grid.evaluate_grid([probit_sigmas], kern_axes=kern_axes)
+    assert obj.shape == (2, 3)
+    assert np.allclose(m.cov_func.get_param(), kern_x0)
+
+    model = copy.deepcopy(m)
+    for i, pro_sigma in enumerate(probit_sigmas):
+        for j, length in enumerate(lengths):
+            kern_param = np.copy(kern_x0)
+            kern_param[1] = length
+            model.cov_func.set_param(kern_param)
+            expected = model.hyperparameter_obj(np.array([pro_sigma]), m.X_train, m.y_train,
+                                                m.X_train, m.y_train, None)
+            assert np.isclose(obj[i,j], expected)
+    # the lengthscale changes the objective
+    assert not np.allclose(obj[:,0], obj[:,1])
+
+    with pytest.raises(ValueError):
+        grid.evaluate_grid([probit_sigmas], kern_axes=[lengths])
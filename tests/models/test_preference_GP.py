@@ -8,6 +8,7 @@ import pytest
 import lop
 
 import numpy as np
+import scipy.sparse as sp
 
 import pdb
 
@@ -245,3 +246,168 @@ def test_pref_GP_pref_ordinal_does_not_crash():
     assert not np.isnan(y).any()
 
 
+
+
+def test_pref_GP_rff_matches_rbf():
+    X_train = np.array([0,1,2,3,4.2,6,7])
+    pairs = lop.generate_fake_pairs(X_train, f_sin, 0) + \
+            lop.generate_fake_pairs(X_train, f_sin, 1) + \
+            lop.generate_fake_pairs(X_train, f_sin, 2) + \
+            lop.generate_fake_pairs(X_train, f_sin, 3) + \
+            lop.generate_fake_pairs(X_train, f_sin, 4)
+
+    np.random.seed(0)
+    gp = lop.PreferenceGP(lop.RBF_kern(0.5, 0.7))
+    gp.add(X_train, pairs)
+
+    np.random.seed(0)
+    gp_rff = lop.PreferenceGP(lop.RBF_kern_rff(0.5, 0.7, num_features=4000, seed=1))
+    gp_rff.add(X_train, pairs)
+
+    X = np.arange(-0.5, 8, 0.1)
+    mu, sigma = gp.predict(X)
+    mu_rff, sigma_rff = gp_rff.predict(X)
+
+    assert gp_rff.cov_factor.shape == (len(X), 4000)
+    assert np.allclose(np.diagonal(gp_rff.cov), sigma_rff)
+    assert np.abs(mu - mu_rff).max() < 0.1
+    assert np.abs(sigma - sigma_rff).max() < 0.05
+
+
+def test_pref_GP_wendland_sparse_matches_dense():
+    X_train = np.array([0,1,2,3,4.2,6,7])
+    pairs = lop.generate_fake_pairs(X_train, f_sin, 0) + \
+            lop.generate_fake_pairs(X_train, f_sin, 1) + \
+            lop.generate_fake_pairs(X_train, f_sin, 2) + \
+            lop.generate_fake_pairs(X_train, f_sin, 3)
+
+    gp = lop.PreferenceGP(lop.WendlandKern(0.5, 2.5))
+    gp.add(X_train, pairs)
+
+    gp_dense = lop.PreferenceGP(lop.WendlandKern(0.5, 2.5, sparse=False))
+    gp_dense.add(X_train, pairs)
+
+    X = np.arange(-0.5, 8, 0.1)
+    mu, sigma = gp.predict(X)
+    mu_dense, sigma_dense = gp_dense.predict(X)
+
+    assert np.allclose(mu, mu_dense, atol=1e-5)
+    assert np.allclose(sigma, sigma_dense, atol=1e-5)
+    assert np.allclose(np.diagonal(gp.cov), sigma)
+
+    # W is kept sparse and the factors are cached between predictions
+    assert sp.issparse(gp.W)
+    assert np.allclose(gp.W.toarray(), gp_dense.W, atol=1e-5)
+    K_factor, S_factor = gp.K_factor, gp.S_factor
+    assert K_factor is not None and S_factor is not None
+    mu2, sigma2 = gp.predict(X[::2])
+    assert gp.K_factor is K_factor and gp.S_factor is S_factor
+    assert np.allclose(sigma2, sigma[::2])
+
+
+def test_pref_GP_wendland_sparse_matches_dense_abs_bound():
+    X_train = np.array([0,1,2,3,4.2,6,7])
+    pairs = lop.generate_fake_pairs(X_train, f_sin, 0) + \
+            lop.generate_fake_pairs(X_train, f_sin, 2)
+
+    gps = []
+    for sparse in [True, False]:
+        gp = lop.PreferenceGP(lop.WendlandKern(0.5, 2.5, sparse=sparse))
+        gp.add(X_train, pairs)
+        gp.add(np.array([1.5, 5.0]), np.array([0.9, 0.1]), type='abs')
+        gps.append(gp)
+
+    X = np.arange(-0.5, 8, 0.1)
+    mu, sigma = gps[0].predict(X)
+    mu_dense, sigma_dense = gps[1].predict(X)
+
+    assert np.allclose(mu, mu_dense, atol=1e-5)
+    assert np.allclose(sigma, sigma_dense, atol=1e-5)
+
+    # a given W falls back to the LU of I + W K
+    mu_W, sigma_W = gps[0].predict(X, W=gps[0].W.copy())
+    assert np.allclose(mu_W, mu)
+    assert np.allclose(sigma_W, sigma)
+
+
+def test_pref_GP_predict_grid_matches_predict():
+    X_train = np.array([0,1,2,3,4.2,6,7])
+    pairs = lop.generate_fake_pairs(X_train, f_sin, 0) + \
+            lop.generate_fake_pairs(X_train, f_sin, 1) + \
+            lop.generate_fake_pairs(X_train, f_sin, 3)
+
+    gp = lop.PreferenceGP(lop.RBF_kern(0.5, 0.7))
+    gp.add(X_train, pairs)
+
+    X = np.linspace(-1, 8, 400)
+    mu, sigma = gp.predict(X)
+    mu_grid, sigma_grid = gp.predict_grid([X])
+
+    assert np.allclose(np.diagonal(gp.cov), sigma_grid)
+    assert np.abs(mu - mu_grid).max() < 1e-3
+    assert np.abs(sigma - sigma_grid).max() < 1e-3
+
+
+def test_pref_GP_variance_matches_cov():
+    X_train = np.array([0,1,2,3,4.2,6,7])
+    pairs = lop.generate_fake_pairs(X_train, f_sin, 0) + \
+            lop.generate_fake_pairs(X_train, f_sin, 1) + \
+            lop.generate_fake_pairs(X_train, f_sin, 2)
+
+    gp = lop.PreferenceGP(lop.RBF_kern_zeroed(0.5, 0.7))
+
+    X = np.arange(-0.5, 8, 0.1)
+    mu, sigma = gp.predict(X)
+    assert np.allclose(sigma, np.diagonal(gp.cov))
+
+    gp.add(X_train, pairs)
+    mu, sigma = gp.predict(X)
+
+    assert gp.cov.shape == (len(X), len(X))
+    assert np.allclose(sigma, np.maximum(0, np.diagonal(gp.cov)))
+
+    # the lazy covariance is of the prediction, not the current hyperparameters
+    mu, sigma = gp.predict(X)
+    gp.cov_func.set_param(gp.cov_func.get_param() * 5)
+    assert np.allclose(sigma, np.maximum(0, np.diagonal(gp.cov)))
+
+
+def test_pref_GP_listwise():
+    gp = lop.PreferenceGP(lop.RBF_kern(1.0, 1.0))
+
+    X_train = np.array([0,1,2,3,4.2,6,7])
+    f = f_sin(X_train)
+    records = [lop.listwise_ranking(np.argsort(-f)),
+                lop.listwise_choice(int(np.argmax(f)), [0,1,2])]
+    gp.add(X_train, records, type='listwise')
+
+    assert gp.y_train[gp.probit_idxs['listwise']].shape == (2, 8)
+
+    mu = gp(X_train)
+    assert not np.isnan(mu).any()
+    assert np.argmax(mu) == np.argmax(f)
+    assert np.corrcoef(mu, f)[0,1] > 0.8
+
+
+def test_pref_GP_merge_duplicate_pairs():
+    X_train = np.array([0,1,2,3,4.2,6,7])
+    pairs = lop.generate_fake_pairs(X_train, f_sin, 0) + \
+            lop.generate_fake_pairs(X_train, f_sin, 1) + \
+            lop.generate_fake_pairs(X_train, f_sin, 0)
+
+    gp = lop.PreferenceGP(lop.RBF_kern(1.0, 1.0))
+    gp.add(X_train, pairs)
+    gp_merged = lop.PreferenceGP(lop.RBF_kern(1.0, 1.0), merge_duplicate_pairs=True)
+    gp_merged.add(X_train, pairs)
+
+    assert len(gp_merged.y_train[0]) < len(gp.y_train[0])
+    assert gp_merged.y_train[0][:,3].sum() == len(pairs)
+
+    X = np.array([1.5,1.7,3.2])
+    assert np.allclose(gp(X), gp_merged(X), atol=1e-5)
+
+    # adding the same pairs again only increases the counts
+    n = len(gp_merged.y_train[0])
+    gp_merged.add_pairs(np.array(pairs))
+    assert len(gp_merged.y_train[0]) == n
+    assert gp_merged.y_train[0][:,3].sum() == 2*len(pairs)
@@ -278,3 +278,21 @@ def test_preference_model_get_set_hyperparameters_multiple_y_trains():
 
     assert len(p) == 2
 
+
+def test_preference_model_short_y_train():
+    m = lop.PreferenceModel()
+
+    X_train = np.array([0,1,2,3,4.2,6,7])
+    F = f_sin(X_train)
+    pairs = np.array(lop.generate_fake_pairs(X_train, f_sin, 0))
+
+    # y_train built by hand without an entry for the listwise probit
+    m.X_train = X_train
+    m.y_train = [pairs, None, (np.array([0.5]), np.array([3]))]
+
+    assert len(m.get_hyper()) == 2
+    assert np.isfinite(m.log_likelyhood_training(F))
+
+    m.add(np.array([8.0, 9.0]), [lop.listwise_choice(1, [0, 2])], type='listwise')
+    assert len(m.y_train) == len(m.probits)
+    assert m.y_train[m.probit_idxs['listwise']] is not None
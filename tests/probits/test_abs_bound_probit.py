@@ -91,6 +91,41 @@ def test_get_alpha_beta_3d():
     assert aa.shape[1] == 2
     assert aa.shape[2] == 1
 
+def test_beta_logpdf():
+    from scipy.stats import beta
+
+    x = np.array([0.01, 0.2, 0.5, 0.93])
+    aa = np.array([0.5, 3.0, 40.0, 1.0])
+    bb = np.array([2.0, 0.7, 40.0, 1.0])
+
+    assert np.allclose(lop.beta_logpdf(x, aa, bb), beta.logpdf(x, aa, bb))
+
+def test_abs_bound_add_derivatives_diagonal():
+    probit = lop.AbsBoundProbit()
+
+    F = np.array([0.4, -0.3, 0.6, -0.2, 1.1])
+    v = np.array([0.1, 0.2, 0.5, 0.8])
+    idxs = np.array([0, 1, 3, 1])
+
+    idx, W_diag, dpy_df, py = probit.derivatives_diag((v, idxs), F)
+    assert (idx == idxs).all()
+
+    W_dense, dpy_df_dense, py_dense = probit.derivatives((v, idxs), F)
+
+    W = np.ones((len(F), len(F)))
+    grad = np.ones(len(F))
+    py_add = probit.add_derivatives((v, idxs), F, W, grad)
+
+    assert np.allclose(W - 1, W_dense)
+    assert np.allclose(grad - 1, dpy_df_dense)
+    assert np.isclose(py_add, py_dense)
+    assert np.isclose(py, probit.log_likelihood((v, idxs), F))
+
+    # repeated ratings of sample 1 add up
+    assert np.isclose(W_dense[1,1], W_diag[1] + W_diag[3])
+    assert np.isclose(dpy_df_dense[1], dpy_df[1] + dpy_df[3])
+    assert np.allclose(W_dense, np.diag(np.diag(W_dense)))
+
 # @pytest.mark.skipif('numba' not in sys.modules, reason='requires the numba library')
 # def test_numba_beta_pdf():
 #     res1 = lop.numba_beta_pdf(0.5, 0.5, 0.5)
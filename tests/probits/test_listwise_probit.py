@@ -0,0 +1,108 @@
+# Copyright 2026 Ian Rankin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE
+# FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+# test_listwise_probit.py
+# Written Ian Rankin - October 2026
+#
+# Tests for the listwise (Plackett-Luce) probit, checked against finite differences.
+
+import pytest
+import lop
+
+import numpy as np
+
+
+def listwise_setup():
+    rng = np.random.default_rng(0)
+    N = 7
+    F = rng.standard_normal(N)
+    # a choice of 1 over (3,0,5), a full ranking of 5, and a choice of 2 over (0,4)
+    y = np.array([[1,3,0,5,-1],[3,2,6,1,4],[1,2,0,4,-1]])
+    return N, F, y
+
+
+def test_listwise_probit_gradient_and_hessian():
+    N, F, y = listwise_setup()
+    probit = lop.ListwiseProbit(0.7)
+    h = 1e-6
+
+    W, grad, py = probit.derivatives(y, F)
+    assert np.isclose(py, probit.log_likelihood(y, F))
+    assert np.allclose(W, W.T)
+
+    grad_fd = np.array([(probit.log_likelihood(y, F+h*np.eye(N)[k]) - py) / h for k in range(N)])
+    assert np.allclose(grad, grad_fd, atol=1e-4)
+
+    W_fd = np.array([(probit.derivatives(y, F+h*np.eye(N)[k])[1] - grad) / h for k in range(N)])
+    assert np.allclose(W, -W_fd, atol=1e-4)
+
+    W2 = np.zeros((N,N))
+    grad2 = np.zeros(N)
+    py2 = probit.add_derivatives(y, F, W2, grad2)
+    assert np.isclose(py, py2)
+    assert np.allclose(W, W2)
+    assert np.allclose(grad, grad2)
+
+    V, c, grad3, py3 = probit.hessian_terms(y, F)
+    assert np.isclose(py, py3)
+    assert np.all(c >= 0)
+    assert np.allclose(W, V.T @ np.diag(c) @ V)
+    assert np.allclose(grad, grad3)
+
+
+def test_listwise_probit_W_derivatives():
+    N, F, y = listwise_setup()
+    probit = lop.ListwiseProbit(0.7)
+    h = 1e-6
+    W = probit.derivatives(y, F)[0]
+    M = np.random.default_rng(1).random((N,N))
+
+    dW_dF = probit.calc_W_dF(y, F)
+    dW_dF_fd = np.array([(probit.derivatives(y, F+h*np.eye(N)[k])[0] - W) / h for k in range(N)])
+    assert np.allclose(dW_dF, dW_dF_fd, atol=1e-4)
+    assert np.allclose(probit.calc_W_dF_sparse(y, F).contract(M),
+                        np.trace(M @ dW_dF, axis1=1, axis2=2))
+
+    dW_dH = probit.calc_W_dHyper(y, F)
+    dW_dH_fd = (lop.ListwiseProbit(0.7+h).derivatives(y, F)[0] - W) / h
+    assert np.allclose(dW_dH[0], dW_dH_fd, atol=1e-4)
+    assert np.allclose(probit.calc_W_dHyper_sparse(y, F).contract(M),
+                        np.trace(M @ dW_dH, axis1=1, axis2=2))
+
+    grad_h_fd = (lop.ListwiseProbit(0.7+h).log_likelihood(y, F) - probit.log_likelihood(y, F)) / h
+    assert np.allclose(probit.grad_hyper(y, F), grad_h_fd, atol=1e-4)
+
+
+def test_listwise_probit_likelihood():
+    N, F, y = listwise_setup()
+    probit = lop.ListwiseProbit(0.7)
+
+    p = probit.likelihood(y, F)
+    assert p.shape == (3,)
+    assert np.all(p > 0) and np.all(p < 1)
+    assert np.isclose(np.prod(p), np.exp(probit.log_likelihood(y, F)))
+
+    # a choice of 2 options is the logistic of the difference
+    y_pair = np.array([[1, 4, 2]])
+    p_pair = probit.likelihood(y_pair, F)[0]
+    assert np.isclose(p_pair, 1.0 / (1.0 + np.exp(-(F[4]-F[2])/0.7)))
+
+    # probabilities of each choice over a set of options sum to one
+    total = sum(probit.likelihood(np.array([[1, a] + [b for b in (0,3,5) if b != a]]), F)[0]
+                    for a in (0,3,5))
+    assert np.isclose(total, 1.0)
@@ -191,3 +191,64 @@ def test_ordinal_probit_param_likli():
 
     assert not np.isnan(grad_likli).any()
     assert len(grad_likli) == 2
+
+
+def test_preference_probit_sparse_derivatives():
+    pp = lop.PreferenceProbit(0.7)
+
+    F = np.array([1,0.5,3,4,5,6,7])
+    pairs = np.array([[1, 0, 1], [-1, 2, 4], [1, 3, 6], [1, 6, 5], [-1, 0, 6]])
+
+    dW_sparse = pp.calc_W_dF_sparse(pairs, F)
+    dW = pp.calc_W_dF(pairs, F)
+
+    # each pair adds c (e_u - e_v)^3
+    dW_expected = np.zeros((len(F), len(F), len(F)))
+    for c, (_, u, v) in zip(dW_sparse.coef, pairs):
+        d = np.zeros(len(F))
+        d[u] += 1
+        d[v] -= 1
+        dW_expected += c * np.einsum('i,j,k->ijk', d, d, d)
+    assert np.allclose(dW, dW_expected)
+
+    M = np.random.default_rng(0).random((len(F), len(F)))
+    assert np.allclose(dW_sparse.contract(M), np.trace(M @ dW, axis1=1, axis2=2))
+
+    dW_hyper_sparse = pp.calc_W_dHyper_sparse(pairs, F)
+    dW_hyper = pp.calc_W_dHyper(pairs, F)
+    assert dW_hyper.shape == (1, len(F), len(F))
+    assert np.allclose(dW_hyper_sparse.contract(M), np.trace(M @ dW_hyper, axis1=1, axis2=2))
+
+def test_abs_bound_probit_sparse_derivatives():
+    pro = lop.AbsBoundProbit(optimize_v_only=False)
+
+    F = np.array([0.4, 0.3, 0.6, -0.2])
+    v = np.array([0.1,0.2,0.5])
+    idxs = np.array([0, 1, 3])
+
+    dW = pro.calc_W_dF((v, idxs), F)
+    diag = pro.calc_W_dF_sparse((v, idxs), F).coef
+
+    assert dW.shape == (len(F), len(F), len(F))
+    assert np.allclose(dW[idxs, idxs, idxs], diag)
+    assert np.count_nonzero(dW) == np.count_nonzero(diag)
+
+    M = np.random.default_rng(0).random((len(F), len(F)))
+    dW_hyper = pro.calc_W_dHyper((v, idxs), F)
+    assert np.allclose(pro.calc_W_dHyper_sparse((v, idxs), F).contract(M),
+                        np.trace(M @ dW_hyper, axis1=1, axis2=2))
+
+def test_probit_hessian_terms():
+    F = np.array([0.4, 0.3, 0.6, -0.2, 0.1])
+    probits = [(lop.PreferenceProbit(0.7), np.array([[1, 0, 1], [-1, 2, 4], [1, 3, 0]])),
+               (lop.AbsBoundProbit(), (np.array([0.1,0.2,0.5]), np.array([0, 1, 3]))),
+               (lop.OrdinalProbit(), (np.array([1, 2]), np.array([2, 4])))]
+
+    for probit, y in probits:
+        W, grad, py = probit.derivatives(y, F)
+        V, c, grad_terms, py_terms = probit.hessian_terms(y, F)
+
+        assert V.shape == (len(c), len(F))
+        assert np.allclose((V.T @ np.diag(c) @ V), W)
+        assert np.allclose(grad_terms, grad)
+        assert np.isclose(py_terms, py)
@@ -30,6 +30,34 @@ import pdb
 def f_sin(x, data=None):
     return 2 * np.cos(np.pi * (x-2)) * np.exp(-(0.9*x))
 
+def test_pdf_cdf_ratio_and_log_cdf():
+    import scipy.special as spec
+
+    z = np.array([-500, -60, -31, -29, -10, -1, 0, 0.5, 3, 10, 40])
+
+    ratio, ratio2 = lop.calc_pdf_cdf_ratio(z)
+    expected = np.sqrt(2 / np.pi) / spec.erfcx(-z / np.sqrt(2))
+
+    assert np.allclose(ratio, expected, rtol=1e-10, atol=0)
+    assert np.allclose(ratio2, expected*expected, rtol=1e-10, atol=0)
+    assert np.allclose(lop.std_norm_log_cdf(z), spec.log_ndtr(z), rtol=1e-10, atol=0)
+
+    ratio_2d, _ = lop.calc_pdf_cdf_ratio(z.reshape(1, -1))
+    assert np.allclose(ratio_2d[0], ratio)
+
+def test_preference_probit_gradient_far_from_data():
+    pp = lop.PreferenceProbit(0.1)
+
+    # a pair that is strongly against the current F still gives a gradient
+    y = np.array([[1, 0, 1]])
+    F = np.array([0.0, -10.0])
+
+    _, dpy_df, py = pp.derivatives(y, F)
+
+    assert np.isfinite(py) and py < -1000
+    assert dpy_df[1] > 100 and dpy_df[0] < -100
+
+
 ## Preference probit checks
 
 def test_preference_probit_likelihood():
@@ -74,6 +102,45 @@ def test_preference_probit_likelihood_all_pairs():
     assert probit_mat[3,0] > 0.5
     assert probit_mat[0,1] == (1 - probit_mat[1,0])
 
+def test_preference_probit_likelihood_all_pairs_batch():
+    pp = lop.PreferenceProbit(0.5)
+
+    F = np.random.default_rng(2).normal(size=(7, 5)) * 3
+    F[0,1] = 15.0
+
+    P = pp.likelihood_all_pairs_batch(F)
+    assert P.shape == (7, 5, 5)
+
+    z = (F[:,:,np.newaxis] - F[:,np.newaxis,:]) * pp._isqrt2sig
+    assert np.allclose(P, lop.std_norm_cdf(z), atol=1e-15)
+    assert np.allclose(P + np.swapaxes(P, 1, 2), 1.0)
+
+    # the small tail probabilities are kept rather than rounding to 0
+    assert (P[0,:,1][[0,2,3,4]] > 0).all()
+
+    idx = np.array([4, 0, 2])
+    P_sub = pp.likelihood_all_pairs_batch(F, idx=idx, dtype=np.float32)
+    assert P_sub.dtype == np.float32
+    assert np.allclose(P_sub, P[:, idx][:, :, idx], atol=1e-6)
+    assert np.allclose(pp.likelihood_all_pairs(F[3]), P[3])
+
+
+def test_preference_probit_derivatives_match_separate():
+    pp = lop.PreferenceProbit(0.7)
+
+    rng = np.random.default_rng(3)
+    F = rng.standard_normal(20)
+    u = rng.integers(0, 20, 60)
+    v = (u + 1 + rng.integers(0, 19, 60)) % 20
+    y = np.stack([rng.choice([-1, 1], 60), u, v], axis=1)
+
+    W, dpy_df, py = pp.derivatives(y, F)
+
+    assert np.allclose(W, pp.calc_W(y, F))
+    assert np.allclose(dpy_df, pp.derv_log_likelyhood(y, F))
+    assert np.isclose(py, pp.log_likelihood(y, F))
+
+
 def test_preference_hyper_modification():
     probit = lop.PreferenceProbit()
 
@@ -240,6 +307,35 @@ def test_ordinal_not_all_indicies_in_training():
 
 
 
+def test_ordinal_derivatives_vectorized():
+    probit = lop.OrdinalProbit(0.5, 1.0)
+
+    F = np.array([0.1, 0.6, -0.4, 1.2, 40.0, -40.0])
+    v = np.array([2, 3, 1, 5, 1, 4, 2], dtype=int)
+    idxs = np.array([0, 1, 2, 3, 4, 5, 0])
+
+    W, dpy_df, py = probit.derivatives((v, idxs), F)
+
+    # W is diagonal, repeated ratings of the same sample add up
+    assert np.allclose(W, np.diag(np.diag(W)))
+    assert np.isfinite(W).all()
+    assert np.isfinite(dpy_df).all()
+
+    # first derivative matches finite differences where the likelihood is not tiny
+    h = 1e-6
+    sel = idxs < 4
+    py_sel = np.sum(np.log(probit.likelihood_each((v[sel], idxs[sel]), F)))
+    for i in range(4):
+        F_h = F.copy()
+        F_h[i] += h
+        py_h = np.sum(np.log(probit.likelihood_each((v[sel], idxs[sel]), F_h)))
+        assert np.isclose((py_h - py_sel) / h, dpy_df[i], rtol=1e-3, atol=1e-4)
+
+    # asymptotic branch for small likelihoods (rating 1 with large F)
+    assert np.isclose(dpy_df[4], probit._isigma * probit._isigma * (probit.b[1] - F[4]))
+    assert np.isclose(W[4,4], probit._ivar)
+
+
 def test_ordinal_hyper_modification():
     probit = lop.OrdinalProbit()
 
@@ -254,3 +350,21 @@ def test_ordinal_hyper_modification():
 
     assert param[0] == 0.1
     assert param[1] == 4.23
+
+
+def test_preference_probit_weighted_pairs_match_duplicates():
+    probit = lop.PreferenceProbit(sigma=0.5)
+    rng = np.random.default_rng(3)
+    F = rng.standard_normal(6)
+    y = np.array([[-1, 0, 1], [1, 1, 0], [-1, 0, 1], [1, 2, 4], [-1, 3, 5], [1, 2, 4]])
+    y_w = lop.merge_pairs(y)
+
+    assert y_w.shape == (3, 4)
+
+    for a, b in zip(probit.derivatives(y, F), probit.derivatives(y_w, F)):
+        assert np.allclose(a, b)
+    assert np.isclose(probit.log_likelihood(y, F), probit.log_likelihood(y_w, F))
+    assert np.isclose(np.prod(probit.likelihood(y, F)), np.prod(probit.likelihood(y_w, F)))
+    assert np.allclose(probit.grad_hyper(y, F), probit.grad_hyper(y_w, F))
+    assert np.allclose(probit.calc_W_dF_sparse(y, F).to_dense(), probit.calc_W_dF_sparse(y_w, F).to_dense())
+    assert np.allclose(probit.calc_W_dHyper(y, F), probit.calc_W_dHyper(y_w, F))
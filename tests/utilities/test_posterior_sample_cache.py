@@ -0,0 +1,53 @@
+# test_posterior_sample_cache.py
+# Written Ian Rankin - October 2026
+#
+# Tests of the model versioned cache of posterior samples.
+
+import pytest
+
+import lop
+import numpy as np
+
+
+def test_posterior_sample_cache_version():
+    cache = lop.PosteriorSampleCache()
+    samples = np.ones((10, 3))
+
+    cache.put(0, 'a', samples)
+    assert cache.get(0, 'a') is samples
+    assert cache.get(0, 'b') is None
+
+    # samples are shared, so they can't be modified
+    with pytest.raises(ValueError):
+        samples[0,0] = 2.0
+
+    # a new version of the model clears the cache
+    assert cache.get(1, 'a') is None
+    assert len(cache) == 0
+
+
+def test_posterior_sample_cache_eviction():
+    cache = lop.PosteriorSampleCache(max_bytes=3 * 800)
+
+    for i in range(3):
+        cache.put(0, i, np.zeros(100))
+    cache.get(0, 0)
+    cache.put(0, 3, (np.zeros(50), np.zeros(50)))
+
+    # least recently used entry is evicted
+    assert cache.get(0, 1) is None
+    assert cache.get(0, 0) is not None
+    assert cache.get(0, 3) is not None
+    assert cache.num_bytes <= cache.max_bytes
+
+    # samples larger than the cache are not stored
+    cache.put(0, 4, np.zeros(1000))
+    assert cache.get(0, 4) is None
+
+
+def test_array_fingerprint():
+    X = np.arange(12.0).reshape(4, 3)
+
+    assert lop.array_fingerprint(X) == lop.array_fingerprint(X.copy())
+    assert lop.array_fingerprint(X) != lop.array_fingerprint(X + 1)
+    assert lop.array_fingerprint(X) != lop.array_fingerprint(X.reshape(3, 4))
@@ -80,3 +80,27 @@ def test_gen_pairs_from_idx():
     assert y_pairs[2][2] == 2
     
 
+
+
+def test_listwise_records():
+    assert lop.listwise_choice(3, [0,1,2,3]) == (1, 3, 0, 1, 2)
+    assert lop.listwise_ranking([2,0,1]) == (2, 2, 0, 1)
+
+    y = lop.pad_listwise([lop.listwise_choice(1, [0,1]), lop.listwise_ranking([2,0,1])])
+
+    assert y.shape == (2, 4)
+    assert (y[0] == [1, 1, 0, -1]).all()
+    assert (y[1] == [2, 2, 0, 1]).all()
+
+
+def test_merge_pairs():
+    pairs = [(-1, 0, 1, 1), (1, 1, 0, 1), (1, 0, 1, 1), (-1, 0, 1, 1), (-1, 2, 3, 4)]
+    merged = lop.merge_pairs(pairs)
+
+    assert merged.shape == (3, 4)
+    counts = {tuple(p[:3]): p[3] for p in merged}
+    assert counts[(-1, 0, 1)] == 3
+    assert counts[(1, 0, 1)] == 1
+    assert counts[(-1, 2, 3)] == 4
+
+    assert (lop.merge_pairs([(1, 2, 0), (-1, 0, 2)]) == [[-1, 0, 2, 2]]).all()
@@ -0,0 +1,66 @@
+# test_probability_utility.py
+# Written Ian Rankin - October 2026
+
+import pytest
+
+import numpy as np
+import lop
+
+
+def random_batch(n, d):
+    A = np.random.random((n, d, d))
+    covs = A @ np.transpose(A, (0, 2, 1)) + np.eye(d)
+    mus = np.random.normal(size=(n, d))
+    return mus, covs
+
+def test_calc_cdf_batch_independent():
+    mus, covs = random_batch(5, 3)
+
+    p = lop.calc_cdf_batch(mus, covs, method='independent')
+    assert p.shape == (5,)
+    for i in range(5):
+        assert np.isclose(p[i], lop.calc_cdf(mus[i], covs[i], method='independent'))
+
+def test_calc_cdf_batch_full():
+    mus, covs = random_batch(4, 3)
+
+    p = lop.calc_cdf_batch(mus, covs, method='full')
+    assert p.shape == (4,)
+    for i in range(4):
+        assert np.isclose(p[i], lop.calc_cdf(mus[i], covs[i], method='full'), atol=1e-3)
+
+def test_calc_cdf_genz_matches_full():
+    mus, covs = random_batch(6, 5)
+
+    p = lop.calc_cdf_batch(mus, covs, method='genz')
+    assert p.shape == (6,)
+    for i in range(6):
+        assert np.isclose(p[i], lop.calc_cdf(mus[i], covs[i], method='full'), atol=2e-3)
+        assert np.isclose(p[i], lop.calc_cdf(mus[i], covs[i]))
+
+def test_calc_cdf_genz_small_dims():
+    mus, covs = random_batch(3, 1)
+    p = lop.calc_cdf_batch(mus, covs, method='genz')
+    assert np.allclose(p, lop.calc_cdf_batch(mus, covs, method='full'))
+
+    # no variables is always inside the orthant
+    assert np.allclose(lop.genz_orthant_batch(np.zeros((2, 0)), np.zeros((2, 0, 0))), 1.0)
+
+def test_calc_cdf_genz_independent():
+    mus = np.array([[0.0, 0.0, 0.0], [1.0, -2.0, 0.5]])
+    covs = np.repeat(np.eye(3)[np.newaxis], 2, axis=0)
+
+    p = lop.genz_orthant_batch(mus, covs)
+    assert np.allclose(p, lop.calc_cdf_batch(mus, covs, method='independent'), atol=1e-6)
+
+def test_calc_cdf_switch_matches_pairs():
+    # two independent blocks of correlated pairs are calculated exactly
+    cov = np.array([[1.0, 0.6, 0.0, 0.0],
+                    [0.6, 1.0, 0.0, 0.0],
+                    [0.0, 0.0, 2.0, -0.5],
+                    [0.0, 0.0, -0.5, 1.0]])
+    mu = np.array([0.2, -0.3, 0.5, 0.1])
+
+    p = lop.calc_cdf(mu, cov, method='switch')
+    p_pairs = lop.calc_cdf(mu[:2], cov[:2,:2], method='full') * lop.calc_cdf(mu[2:], cov[2:,2:], method='full')
+    assert np.isclose(p, p_pairs, atol=1e-4)
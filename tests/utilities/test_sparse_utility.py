@@ -0,0 +1,52 @@
+# Copyright 2026 Ian Rankin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE
+# FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+# test_sparse_utility.py
+# Written Ian Rankin - October 2026
+#
+# 
+
+import pytest
+
+import lop
+import numpy as np
+
+
+
+def test_sparse_cholesky_solve_logdet():
+    X = np.linspace(0, 10, 60)
+    K = lop.WendlandKern(1.0, 1.3).cov(X, X)
+    K_dense = K.toarray()
+
+    L = lop.SparseCholesky(K)
+    b = np.sin(X)
+
+    assert np.allclose(L.solve(b), np.linalg.solve(K_dense, b))
+    assert np.isclose(L.logdet(), np.linalg.slogdet(K_dense)[1])
+
+def test_pcg_solve():
+    rng = np.random.default_rng(1)
+    A = rng.random((30, 30))
+    A = A @ A.T + np.eye(30)
+    b = rng.random(30)
+
+    x = lop.pcg_solve(lambda v: A @ v, b, tol=1e-12)
+    assert np.allclose(x, np.linalg.solve(A, b))
+
+    x = lop.pcg_solve(lambda v: A @ v, b, M_mul=lambda r: r / np.diagonal(A), tol=1e-12)
+    assert np.allclose(x, np.linalg.solve(A, b))
@@ -0,0 +1,62 @@
+# Copyright 2026 Ian Rankin
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software, and to permit persons
+# to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or
+# substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE
+# FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+
+# test_structured_grid.py
+# Written Ian Rankin - October 2026
+#
+# 
+
+import pytest
+
+import lop
+import numpy as np
+
+
+
+@pytest.mark.parametrize('kern', [lop.RBF_kern(1.2, 0.7), lop.PeriodicKern(1, 1, 2),
+                                  lop.WendlandKern(1.0, 0.8)])
+def test_structured_grid_matmul(kern):
+    grid = lop.StructuredGrid(kern, [np.linspace(0, 3, 20), np.linspace(-1, 2, 15)])
+
+    assert grid.points.shape == (20*15, 2)
+    K = kern.cov(grid.points, grid.points + 0.0)
+    K = K.toarray() if hasattr(K, 'toarray') else K
+    # cov adds noise on the diagonal of the grid's covariance
+    K = K - np.diag(np.diagonal(K) - kern.cov_diag(grid.points[:1])[0] + \
+                    getattr(kern, 'sigma_noise', 0))
+
+    V = np.random.default_rng(0).random((len(grid), 3))
+    assert np.allclose(grid.matmul(V), K @ V)
+    assert np.allclose(grid.matmul(V[:,0]), K @ V[:,0])
+
+def test_structured_grid_interp_weights():
+    grid = lop.StructuredGrid(lop.RBF_kern(1, 1), [np.linspace(0, 3, 7), np.linspace(-1, 2, 4)])
+
+    X = np.array([[0.1, 0.3], [2.9, -1.0], [1.5, 1.5], [0, 2]])
+    W = grid.interp_weights(X)
+
+    assert W.shape == (len(X), len(grid))
+    assert np.allclose(W.sum(axis=1), 1)
+    # linear functions are interpolated exactly
+    assert np.allclose(W @ grid.points, X)
+
+def test_structured_grid_errors():
+    with pytest.raises(ValueError):
+        lop.StructuredGrid(lop.LinearKern(1, 1, 0), [np.linspace(0, 1, 5)])
+    with pytest.raises(ValueError):
+        lop.StructuredGrid(lop.RBF_kern(1, 1), [np.array([0, 1, 3])])